@@ -2,7 +2,9 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
-from .models import Action, Permission, Post, Resource, Role, UserRole
+from .models import (Action, Permission, Post, Resource, Role, RoleParent,
+                     UserRole)
+from .search import search_posts
 
 User = get_user_model()
 
@@ -51,11 +53,19 @@ class RoleAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+@admin.register(RoleParent)
+class RoleParentAdmin(admin.ModelAdmin):
+    """Админка для наследования ролей"""
+    list_display = ('role', 'parent')
+    list_filter = ('parent',)
+    search_fields = ('role__name', 'parent__name')
+
+
 @admin.register(Permission)
 class PermissionAdmin(admin.ModelAdmin):
     """Админка для разрешений"""
-    list_display = ('role', 'resource', 'action', 'created_at')
-    list_filter = ('role', 'resource', 'action')
+    list_display = ('role', 'resource', 'action', 'scope', 'created_at')
+    list_filter = ('role', 'resource', 'action', 'scope')
     search_fields = ('role__name', 'resource__name', 'action__name')
     readonly_fields = ('created_at',)
 
@@ -74,5 +84,15 @@ class PostAdmin(admin.ModelAdmin):
     """Админка для постов"""
     list_display = ('text', 'author', 'pub_date')
     list_filter = ('pub_date', 'author')
-    search_fields = ('text', 'author__email')
+    search_fields = ('author__email',)
     readonly_fields = ('pub_date',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Текст ищется по полнотекстовому индексу, email - по подстроке"""
+        by_email, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term)
+        if not search_term:
+            return by_email, may_have_duplicates
+        matched = search_posts(Post.objects.all(), search_term).values('pk')
+        return (queryset.filter(pk__in=matched) | by_email,
+                may_have_duplicates)
@@ -0,0 +1,186 @@
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, get_user_model
+from django.contrib.auth.models import AnonymousUser, update_last_login
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.serializers import TokenObtainSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .metrics import add_permission_time
+from .models import Post
+from .pagination import (AsyncLimitOffsetPagination, KeysetPagination,
+                         PostKeysetPagination)
+from .permissions import HasResourcePermission
+from .scopes import ascope_filter
+from .serializers import PostSerializer, UserSerializer
+from .throttling import LoginRateThrottle
+from .tokens import RBACRefreshToken
+
+User = get_user_model()
+
+
+class AsyncAPIView(View):
+    """
+    Базовое асинхронное представление для ASGI.
+    Аутентификация и проверка прав выполняются через async ORM
+    без переходов в поток sync_to_async.
+    """
+    authentication_class = CachedJWTAuthentication
+    authentication_required = True
+    permission_classes = [HasResourcePermission]
+    throttle_classes = []
+    parsers = [JSONParser()]
+    renderer = JSONRenderer()
+    resource_name = None
+    action_name = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """
+        Как и APIView DRF, освобождает представление от проверки CSRF:
+        клиенты аутентифицируются токеном, а не сессионной cookie
+        """
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=self.parsers)
+        self.authenticator = self.authentication_class()
+        try:
+            return await self.initial(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def initial(self, request, *args, **kwargs):
+        """Ограничение частоты, аутентификация, права и обработчик"""
+        # Ограничение частоты проверяется до обращений к базе
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(request, self):
+                raise exceptions.Throttled(throttle.wait())
+        if self.authentication_required:
+            result = await self.authenticator.aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = result
+        else:
+            request.user, request.auth = AnonymousUser(), None
+
+        started = time.perf_counter()
+        try:
+            for permission in self.permission_classes:
+                if not await permission().ahas_permission(request, self):
+                    raise exceptions.PermissionDenied()
+        finally:
+            add_permission_time(time.perf_counter() - started)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        """Формирует ответ об ошибке в формате exception_handler DRF"""
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        response = self.respond(data, exc.status_code)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = (
+                self.authenticator.authenticate_header(self.request))
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(math.ceil(exc.wait))
+        return response
+
+    def respond(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code,
+                            content_type=self.renderer.media_type)
+
+
+class AsyncMeView(AsyncAPIView):
+    """Асинхронное получение информации о текущем пользователе"""
+
+    async def get(self, request):
+        return self.respond(UserSerializer(request.user).data)
+
+
+class AsyncPostViewMixin:
+    resource_name = 'posts'
+    action_name = 'read'
+
+    async def get_queryset(self, request):
+        return Post.objects.select_related('author').filter(
+            await ascope_filter(request.user, self.resource_name,
+                                self.action_name, 'author'))
+
+
+class AsyncPostListView(AsyncPostViewMixin, AsyncAPIView):
+    """Асинхронный список постов с limit/offset или keyset-пагинацией"""
+
+    async def get(self, request):
+        queryset = await self.get_queryset(request)
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = PostKeysetPagination()
+        else:
+            paginator = AsyncLimitOffsetPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        if page is None:
+            posts = [post async for post in queryset]
+            return self.respond(PostSerializer(posts, many=True).data)
+        data = PostSerializer(page, many=True).data
+        return self.respond(paginator.get_paginated_response(data).data)
+
+
+class AsyncPostDetailView(AsyncPostViewMixin, AsyncAPIView):
+    """Асинхронное получение поста"""
+
+    async def get(self, request, pk):
+        queryset = await self.get_queryset(request)
+        try:
+            post = await queryset.aget(pk=pk)
+        except Post.DoesNotExist:
+            raise exceptions.NotFound()
+        return self.respond(PostSerializer(post).data)
+
+
+class AsyncTokenObtainView(AsyncAPIView):
+    """
+    Асинхронная выдача JWT. Пароль проверяется в пуле процессов
+    сервиса хеширования, цикл событий при этом не блокируется
+    """
+    authentication_required = False
+    permission_classes = []
+    throttle_classes = [LoginRateThrottle]
+
+    async def post(self, request):
+        data = request.data
+        if not isinstance(data, dict):
+            data = {}
+        username_field = User.USERNAME_FIELD
+        errors = {
+            name: [exceptions.ErrorDetail(
+                'This field is required.', code='required')]
+            for name in (username_field, 'password')
+            if not isinstance(data.get(name), str) or not data.get(name)
+        }
+        if errors:
+            raise exceptions.ValidationError(errors)
+        user = await aauthenticate(
+            request._request, **{username_field: data[username_field],
+                                 'password': data['password']})
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(
+                TokenObtainSerializer.default_error_messages[
+                    'no_active_account'], code='no_active_account')
+        return self.respond(await sync_to_async(self._tokens)(user))
+
+    def _tokens(self, user):
+        refresh = RBACRefreshToken.for_user(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
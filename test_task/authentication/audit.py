@@ -0,0 +1,148 @@
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .conf import rbac_setting
+from .metrics import registry
+from .models import (AUDIT_ALLOW, AUDIT_DENY, AUDIT_ROLE_ASSIGNED,
+                     AUDIT_ROLE_REMOVED, AuditEntry)
+
+# Метка в очереди: писатель сразу записывает набранный пакет
+_FLUSH = object()
+
+
+class AuditLog:
+    """
+    Журнал аудита с асинхронной пакетной записью.
+    События складываются в ограниченную очередь процесса без ожидания;
+    при переполнении событие отбрасывается и учитывается в счетчике
+    audit_dropped_total. Фоновый поток записывает очередь через
+    bulk_create пакетами по RBAC['AUDIT_BATCH_SIZE'] не реже чем раз
+    в RBAC['AUDIT_FLUSH_INTERVAL'] секунд. Разрешающие решения
+    записываются с вероятностью RBAC['AUDIT_ALLOW_SAMPLE_RATE'].
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _get_queue(self):
+        # После fork поток писателя в дочернем процессе не существует
+        if self._queue is not None and self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._queue = queue.Queue(rbac_setting('AUDIT_QUEUE_SIZE'))
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,),
+                    name='audit-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+        return self._queue
+
+    def _put(self, entry):
+        try:
+            self._get_queue().put_nowait(entry)
+        except queue.Full:
+            registry.increment('audit_dropped_total')
+
+    def record_decision(self, user_id, resource_name, action_name, allowed):
+        """Ставит в очередь решение о доступе; не блокирует запрос"""
+        if not rbac_setting('AUDIT_ENABLED'):
+            return
+        if allowed and random.random() >= rbac_setting(
+                'AUDIT_ALLOW_SAMPLE_RATE'):
+            return
+        self._put(AuditEntry(
+            created_at=timezone.now(),
+            event=AUDIT_ALLOW if allowed else AUDIT_DENY, user_id=user_id,
+            resource_name=resource_name, action_name=action_name))
+
+    def record_role_changes(self, pairs, assigned, actor=None):
+        """
+        Ставит в очередь назначение или снятие ролей по парам
+        (user_id, role_id) после коммита текущей транзакции
+        """
+        if not rbac_setting('AUDIT_ENABLED') or not pairs:
+            return
+        now = timezone.now()
+        actor_id = getattr(actor, 'pk', actor)
+        event = AUDIT_ROLE_ASSIGNED if assigned else AUDIT_ROLE_REMOVED
+        entries = [AuditEntry(created_at=now, event=event, user_id=user_id,
+                              role_id=role_id, actor_id=actor_id)
+                   for user_id, role_id in pairs]
+
+        def enqueue():
+            for entry in entries:
+                self._put(entry)
+
+        transaction.on_commit(enqueue)
+
+    def _run(self, entries_queue):
+        while True:
+            items = [entries_queue.get()]
+            deadline = time.monotonic() + rbac_setting('AUDIT_FLUSH_INTERVAL')
+            batch_size = rbac_setting('AUDIT_BATCH_SIZE')
+            # Метка flush прерывает набор пакета: записывается то, что есть
+            while len(items) < batch_size and items[-1] is not _FLUSH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(entries_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            entries = [item for item in items if item is not _FLUSH]
+            if entries:
+                self._write(entries)
+            for _ in items:
+                entries_queue.task_done()
+
+    def _write(self, entries):
+        close_old_connections()
+        try:
+            AuditEntry.objects.bulk_create(entries)
+        except Exception:
+            registry.increment('audit_write_errors_total')
+        else:
+            registry.increment('audit_written_total', len(entries))
+        finally:
+            close_old_connections()
+
+    def flush(self, timeout=None):
+        """
+        Записывает все события, поставленные в очередь к этому моменту,
+        не дожидаясь заполнения пакета или RBAC['AUDIT_FLUSH_INTERVAL'],
+        и ждет окончания записи не дольше timeout секунд
+        """
+        entries_queue = self._queue
+        if entries_queue is None or self._pid != os.getpid():
+            return
+        if timeout is None:
+            entries_queue.put(_FLUSH)
+            entries_queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            entries_queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return
+        while entries_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+log = AuditLog()
+
+registry.register_gauge('audit_queue_depth', log.depth)
+atexit.register(log.flush, 5)
@@ -0,0 +1,145 @@
+import copy
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import VersionedLRUCache
+from .conf import rbac_setting
+from .revocation import store as revocation_store
+
+USERS_GENERATION = 'users'
+
+_user_cache = VersionedLRUCache(USERS_GENERATION,
+                                rbac_setting('USER_CACHE_SIZE'))
+
+
+def invalidate_user(user_id):
+    """
+    Сбрасывает закэшированного пользователя во всех воркерах, не трогая
+    остальных пользователей
+    """
+    _user_cache.invalidate(user_id)
+    # Повторный сброс после коммита не дает другим воркерам закэшировать
+    # пользователя, прочитанного до фиксации транзакции
+    transaction.on_commit(lambda: _user_cache.invalidate(user_id))
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация с асинхронной загрузкой пользователя
+    через async ORM для ASGI-представлений
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = await self.aget_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_validated_token(self, raw_token):
+        return self.get_validated_token(raw_token)
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        try:
+            user = await self.user_model.objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found") from e
+
+        self.check_user(user, validated_token)
+        return user
+
+    def check_user(self, user, validated_token):
+        """Проверки пользователя из JWTAuthentication.get_user"""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed"
+                )
+
+
+class CachedJWTAuthentication(AsyncJWTAuthentication):
+    """
+    JWT-аутентификация, загружающая пользователя через ограниченный
+    кэш воркера. Сохранение или удаление пользователя сбрасывает только
+    его запись, поэтому is_active=False действует сразу.
+    Отозванные токены отклоняются.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None and revocation_store.is_revoked(jti):
+            raise InvalidToken(_('Token is blacklisted'))
+        return validated_token
+
+    async def aget_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None and await revocation_store.ais_revoked(jti):
+            raise InvalidToken(_('Token is blacklisted'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        user = _user_cache.get_or_compute(
+            user_id, lambda: self._load_user(user_id))
+        return self._checked_copy(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        user = await _user_cache.aget_or_compute(
+            user_id, lambda: self._aload_user(user_id))
+        return self._checked_copy(user, validated_token)
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def _load_user(self, user_id):
+        return self.user_model.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}).first()
+
+    async def _aload_user(self, user_id):
+        return await self.user_model.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}).afirst()
+
+    def _checked_copy(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found")
+        self.check_user(user, validated_token)
+        # Каждый запрос получает свою копию, чтобы изменения экземпляра
+        # во view не попадали в кэш
+        return copy.copy(user)
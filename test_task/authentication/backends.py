@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import service as hashing_service
+
+UserModel = get_user_model()
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    ModelBackend, который проверяет пароль в пуле процессов
+    сервиса хеширования вместо потока обработки запроса
+    """
+
+    def _credentials(self, username, kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        return username
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self._credentials(username, kwargs)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Хешируем пароль, чтобы время ответа не выдавало
+            # существование пользователя
+            hashing_service.make_password(password)
+            return
+        valid, outdated = hashing_service.check_password(
+            password, user.password)
+        if not valid:
+            return
+        if outdated:
+            user.password = hashing_service.make_password(password)
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
+
+    async def aauthenticate(self, request, username=None, password=None,
+                            **kwargs):
+        username = self._credentials(username, kwargs)
+        if username is None or password is None:
+            return
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(
+                username)
+        except UserModel.DoesNotExist:
+            await hashing_service.amake_password(password)
+            return
+        valid, outdated = await hashing_service.acheck_password(
+            password, user.password)
+        if not valid:
+            return
+        if outdated:
+            user.password = await hashing_service.amake_password(password)
+            await user.asave(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
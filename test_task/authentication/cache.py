@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .conf import rbac_setting
+
+PERMISSIONS_GENERATION = 'permissions'
+
+
+def _shared_cache():
+    return caches[rbac_setting('CACHE_ALIAS')]
+
+
+def _generation_key(name):
+    return f'rbac:generation:{name}'
+
+
+def _initial_generation():
+    # Стартовое значение зависит от времени, чтобы после потери ключа
+    # счетчик не вернулся к уже использованному номеру поколения
+    return int(time.time() * 1000)
+
+
+def get_generation(name):
+    """Возвращает текущее поколение счетчика, общего для всех воркеров"""
+    cache = _shared_cache()
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation(name):
+    """Асинхронный вариант get_generation, не блокирует цикл событий"""
+    cache = _shared_cache()
+    key = _generation_key(name)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, _initial_generation(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def get_generations(names):
+    """Возвращает поколения нескольких счетчиков одним обращением к кэшу"""
+    keys = {_generation_key(name): name for name in names}
+    found = _shared_cache().get_many(keys)
+    return tuple(
+        found[key] if key in found else get_generation(name)
+        for key, name in keys.items())
+
+
+async def aget_generations(names):
+    """Асинхронный вариант get_generations"""
+    keys = {_generation_key(name): name for name in names}
+    found = await _shared_cache().aget_many(keys)
+    return tuple([
+        found[key] if key in found else await aget_generation(name)
+        for key, name in keys.items()])
+
+
+def bump_generation(name):
+    """Увеличивает поколение счетчика и возвращает новое значение"""
+    cache = _shared_cache()
+    key = _generation_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), timeout=None)
+        return cache.incr(key)
+
+
+def _change_key(name, generation):
+    return f'rbac:change:{name}:{generation}'
+
+
+def record_change(name, generation, change, timeout, replace=False):
+    """
+    Сохраняет описание изменения, которое перевело счетчик в generation.
+    Возвращает False, если под этим номером уже записано другое
+    изменение: неатомарный incr выдал номер двум процессам.
+    """
+    key = _change_key(name, generation)
+    if replace:
+        _shared_cache().set(key, change, timeout)
+        return True
+    return _shared_cache().add(key, change, timeout)
+
+
+def get_changes(name, start, end):
+    """
+    Возвращает изменения, переводящие счетчик из start в end, или None,
+    если какое-то из них не записано или уже вытеснено из кэша
+    """
+    keys = [_change_key(name, generation)
+            for generation in range(start + 1, end + 1)]
+    found = _shared_cache().get_many(keys)
+    if len(found) != len(keys):
+        return None
+    return [found[key] for key in keys]
+
+
+def increment_counter(key, timeout):
+    """
+    Увеличивает счетчик в общем кэше и возвращает новое значение.
+    Первое обращение создает ключ через add, следующие - через incr;
+    в Redis и Memcached обе операции атомарны между воркерами.
+    """
+    cache = _shared_cache()
+    if cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ истек между add и incr
+        cache.add(key, 1, timeout)
+        return 1
+
+
+async def aincrement_counter(key, timeout):
+    """Асинхронный вариант increment_counter"""
+    cache = _shared_cache()
+    if await cache.aadd(key, 1, timeout):
+        return 1
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout)
+        return 1
+
+
+def get_counter(key):
+    return _shared_cache().get(key, 0)
+
+
+async def aget_counter(key):
+    return await _shared_cache().aget(key, 0)
+
+
+class LRUCache:
+    """
+    Ограниченный LRU-кэш в памяти процесса.
+    Полностью сбрасывается, когда меняется поколение счетчика name.
+    """
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Возвращает значение из кэша или вычисляет и сохраняет его"""
+        generation = get_generation(self.name)
+        hit, value = self._lookup(key, generation)
+        if not hit:
+            value = compute()
+            self._store(key, value, generation)
+        return value
+
+    async def aget_or_compute(self, key, acompute):
+        """Асинхронный вариант get_or_compute, acompute - корутинная функция"""
+        generation = await aget_generation(self.name)
+        hit, value = self._lookup(key, generation)
+        if not hit:
+            value = await acompute()
+            self._store(key, value, generation)
+        return value
+
+    def _lookup(self, key, generation):
+        with self._lock:
+            if generation != self._generation:
+                self._data.clear()
+                self._generation = generation
+            elif key in self._data:
+                self._data.move_to_end(key)
+                return True, self._data[key]
+        return False, None
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            # Значение, вычисленное до смены поколения, не сохраняем
+            if generation == self._generation:
+                self._data[key] = value
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation = None
+
+
+class VersionedLRUCache(LRUCache):
+    """
+    LRU-кэш, в котором каждое значение проверяется по собственному
+    счетчику поколения ключа: изменение одного ключа не сбрасывает
+    остальные. Общий счетчик name по-прежнему сбрасывает весь кэш,
+    оба поколения читаются одним обращением к общему кэшу.
+    """
+
+    def key_generation(self, key):
+        """Имя счетчика поколения отдельного ключа"""
+        return f'{self.name}:{key}'
+
+    def get_or_compute(self, key, compute):
+        generation, key_generation = get_generations(
+            (self.name, self.key_generation(key)))
+        hit, entry = self._lookup(key, generation)
+        if hit and entry[0] == key_generation:
+            return entry[1]
+        value = compute()
+        self._store(key, (key_generation, value), generation)
+        return value
+
+    async def aget_or_compute(self, key, acompute):
+        generation, key_generation = await aget_generations(
+            (self.name, self.key_generation(key)))
+        hit, entry = self._lookup(key, generation)
+        if hit and entry[0] == key_generation:
+            return entry[1]
+        value = await acompute()
+        self._store(key, (key_generation, value), generation)
+        return value
+
+    def invalidate(self, key):
+        """Делает значение ключа устаревшим во всех воркерах"""
+        bump_generation(self.key_generation(key))
@@ -0,0 +1,81 @@
+import hashlib
+
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conf import rbac_setting
+from .metrics import registry
+from .versions import get_table_versions
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag для list и retrieve по версиям таблиц из etag_models.
+    Версии читаются из общего кэша до выполнения запроса, поэтому
+    при совпадении If-None-Match ответ 304 отдается без обращения
+    к базе и сериализатора. При etag_vary_on_user ETag зависит
+    от пользователя (для querysets, отфильтрованных по нему).
+
+    При cache_responses данные успешных ответов сохраняются в кэш
+    RBAC['RESPONSE_CACHE_ALIAS'] под ключом из того же дайджеста.
+    Запись в таблицу меняет ее версию, а значит и ключ, поэтому
+    устаревшие ответы не читаются и вытесняются по таймауту.
+    """
+    etag_models = ()
+    etag_vary_on_user = False
+    cache_responses = False
+
+    def get_version_digest(self, request):
+        """Дайджест запроса и версий таблиц, на которых строится ответ"""
+        parts = [
+            request.build_absolute_uri(),
+            request.accepted_media_type or '',
+            str(request.user.pk) if self.etag_vary_on_user else '',
+            *map(str, get_table_versions(self.etag_models)),
+        ]
+        return hashlib.blake2b(
+            '\n'.join(parts).encode(), digest_size=16).hexdigest()
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        digest = self.get_version_digest(request)
+        etag = f'W/"{digest}"'
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            candidates = {
+                _strip_weak(tag) for tag in parse_etags(if_none_match)}
+            if _strip_weak(etag) in candidates:
+                return Response(status=status.HTTP_304_NOT_MODIFIED,
+                                headers={'ETag': etag})
+        if self.cache_responses:
+            response = self._cached(digest, request, handler, *args, **kwargs)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def _cached(self, digest, request, handler, *args, **kwargs):
+        cache = caches[rbac_setting('RESPONSE_CACHE_ALIAS')]
+        key = f'rbac:response:{self.basename}:{digest}'
+        data = cache.get(key)
+        if data is not None:
+            registry.increment('response_cache_hits_total')
+            return Response(data)
+        registry.increment('response_cache_misses_total')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data,
+                      rbac_setting('RESPONSE_CACHE_TIMEOUT'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
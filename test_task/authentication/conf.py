@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'PERMISSION_CACHE_SIZE': 10000,
+    'PERMISSION_CHECK_MAX_PAIRS': 5000,
+    'TOKEN_PERMISSIONS': False,
+    'TOKEN_PERMISSIONS_MAX_LENGTH': 512,
+    'USER_CACHE_SIZE': 10000,
+    'REVOCATION_BLOOM_CAPACITY': 100000,
+    'REVOCATION_BLOOM_ERROR_RATE': 0.001,
+    'REVOCATION_REBUILD_INTERVAL': 3600,
+    'REVOCATION_COMPACT_EVERY': 1000,
+    'HASH_WORKERS': None,
+    'HASH_QUEUE_SIZE': 64,
+    'HASH_QUEUE_TIMEOUT': 5,
+    'RESPONSE_CACHE_ALIAS': 'default',
+    'RESPONSE_CACHE_TIMEOUT': 3600,
+    'FAST_LIST': True,
+    'AUDIT_ENABLED': True,
+    'AUDIT_QUEUE_SIZE': 10000,
+    'AUDIT_BATCH_SIZE': 500,
+    'AUDIT_FLUSH_INTERVAL': 1.0,
+    'AUDIT_ALLOW_SAMPLE_RATE': 0.1,
+    'EFFECTIVE_REFRESH_BACKGROUND': True,
+    'EFFECTIVE_REFRESH_BATCH_SIZE': 500,
+    'THROTTLE_ENABLED': True,
+    'THROTTLE_RATES': {'login': '10/min', 'login_ip': '100/min',
+                       'register': '5/min'},
+    'THROTTLE_MAX_KEYS': 100000,
+    'METRICS_TOKEN': None,
+}
+
+
+def rbac_setting(name):
+    """Возвращает значение из словаря настроек RBAC с учетом умолчаний"""
+    return getattr(settings, 'RBAC', {}).get(name, DEFAULTS[name])
+
+
+# Кэши, которые не видны другим процессам
+SHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Счетчики поколений, журнал политики и счетчики ограничения частоты
+    должны храниться в кэше, общем для всех воркеров и с атомарными
+    add/incr. Кэш в памяти не виден другим процессам, а файловый кэш и
+    DatabaseCache увеличивают счетчики чтением и записью без блокировки
+    """
+    alias = rbac_setting('CACHE_ALIAS')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in SHARED_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f"RBAC['CACHE_ALIAS'] указывает на кэш {alias!r} ({backend}), "
+        f"который не подходит для нескольких воркеров",
+        hint='Сброс кэшей разрешений и пользователей не дойдет до других '
+             'воркеров, а счетчики будут терять увеличения. Укажите Redis '
+             '(переменная окружения REDIS_URL) или Memcached.',
+        id='authentication.E001')]
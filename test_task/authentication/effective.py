@@ -0,0 +1,180 @@
+import atexit
+import os
+import threading
+from itertools import islice
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from .conf import rbac_setting
+from .metrics import registry
+from .models import EffectivePermission, Permission, UserRole
+from .utils import CHUNK_SIZE, chunks, on_commit_batch
+
+# Пути от разрешения к пользователю: через собственные роли
+# и через роли-потомки по замыканию иерархии
+GRANT_PATHS = ('role__user_roles__user_id',
+               'role__descendant_links__role__user_roles__user_id')
+
+
+def _desired_grants(user_ids):
+    desired = set()
+    for path in GRANT_PATHS:
+        desired.update(Permission.objects.filter(
+            **{f'{path}__in': user_ids}
+        ).values_list(path, 'resource__name', 'action__name'))
+    return desired
+
+
+def refresh_users(user_ids):
+    """Пересчитывает действующие разрешения указанных пользователей"""
+    for chunk in chunks(set(user_ids)):
+        desired = _desired_grants(chunk)
+        existing = {
+            (user_id, resource_name, action_name): pk
+            for pk, user_id, resource_name, action_name in
+            EffectivePermission.objects.filter(user_id__in=chunk).values_list(
+                'id', 'user_id', 'resource_name', 'action_name')
+        }
+        stale = [pk for key, pk in existing.items() if key not in desired]
+        if stale:
+            EffectivePermission.objects.filter(pk__in=stale).delete()
+        EffectivePermission.objects.bulk_create(
+            (EffectivePermission(user_id=user_id, resource_name=resource_name,
+                                 action_name=action_name)
+             for user_id, resource_name, action_name in desired
+             if (user_id, resource_name, action_name) not in existing),
+            batch_size=CHUNK_SIZE, ignore_conflicts=True)
+
+
+def users_of_roles(role_ids):
+    """Пользователи с указанными ролями или их потомками"""
+    return set(UserRole.objects.filter(
+        Q(role_id__in=role_ids)
+        | Q(role__ancestor_links__ancestor_id__in=role_ids)
+    ).values_list('user_id', flat=True))
+
+
+def roles_granting(**filters):
+    return set(Permission.objects.filter(
+        **filters).values_list('role_id', flat=True))
+
+
+class EffectiveRefresher:
+    """
+    Пересчет действующих разрешений вне запроса. Пользователи,
+    затронутые закоммиченными изменениями, копятся в множестве процесса,
+    а фоновый поток пересчитывает их пакетами по
+    RBAC['EFFECTIVE_REFRESH_BATCH_SIZE'] в отдельных транзакциях.
+    При RBAC['EFFECTIVE_REFRESH_BACKGROUND'] = False пакеты
+    пересчитываются сразу в вызывающем потоке.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = set()
+        self._busy = False
+        self._thread = None
+        self._pid = None
+
+    def submit(self, user_ids):
+        """Ставит пользователей в очередь пересчета; не блокирует запрос"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        if not rbac_setting('EFFECTIVE_REFRESH_BACKGROUND'):
+            for batch in chunks(user_ids, self._batch_size()):
+                self._refresh(batch)
+            return
+        with self._condition:
+            # После fork поток в дочернем процессе не существует
+            if self._thread is None or self._pid != os.getpid():
+                self._pending = set()
+                self._busy = False
+                self._thread = threading.Thread(
+                    target=self._run, name='effective-refresher',
+                    daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            self._pending |= user_ids
+            self._condition.notify_all()
+
+    def _batch_size(self):
+        return rbac_setting('EFFECTIVE_REFRESH_BATCH_SIZE')
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                batch = list(islice(self._pending, self._batch_size()))
+                self._pending.difference_update(batch)
+                self._busy = True
+            try:
+                self._refresh_in_background(batch)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _refresh(self, user_ids):
+        with transaction.atomic():
+            refresh_users(user_ids)
+
+    def _refresh_in_background(self, user_ids):
+        close_old_connections()
+        try:
+            self._refresh(user_ids)
+        except Exception:
+            registry.increment('effective_refresh_errors_total')
+        else:
+            registry.increment('effective_refreshed_users_total',
+                               len(user_ids))
+        finally:
+            close_old_connections()
+
+    def flush(self, timeout=None):
+        """Ждет пересчета всех пользователей, поставленных в очередь"""
+        with self._condition:
+            if self._pid != os.getpid():
+                return
+            self._condition.wait_for(
+                lambda: not self._pending and not self._busy, timeout)
+
+    def depth(self):
+        return len(self._pending)
+
+
+refresher = EffectiveRefresher()
+
+registry.register_gauge('effective_refresh_pending', refresher.depth)
+atexit.register(refresher.flush, 5)
+
+
+def schedule_refresh(user_ids):
+    """
+    Передает пересчет фоновому потоку после коммита текущей транзакции,
+    объединяя всех затронутых в ней пользователей
+    """
+    on_commit_batch('effective_permissions', user_ids, refresher.submit)
+
+
+def rebuild_all():
+    """Полностью перестраивает таблицу действующих разрешений"""
+    with transaction.atomic():
+        EffectivePermission.objects.all().delete()
+        total = 0
+        for path in GRANT_PATHS:
+            rows = Permission.objects.filter(
+                **{f'{path}__isnull': False}
+            ).values_list(path, 'resource__name', 'action__name').distinct()
+            for batch in chunks(rows.iterator(chunk_size=CHUNK_SIZE * 4),
+                                CHUNK_SIZE * 4):
+                created = EffectivePermission.objects.bulk_create(
+                    (EffectivePermission(user_id=user_id,
+                                         resource_name=resource_name,
+                                         action_name=action_name)
+                     for user_id, resource_name, action_name in batch),
+                    batch_size=CHUNK_SIZE, ignore_conflicts=True)
+                total += len(created)
+    return total
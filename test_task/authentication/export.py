@@ -0,0 +1,86 @@
+import csv
+import json
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _encode_value(value):
+    # Формат дат совпадает с DateTimeField сериализаторов DRF
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+    return value
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_rows(keys, rows):
+    dumps = json.JSONEncoder(
+        ensure_ascii=False, separators=(',', ':')).encode
+    for row in rows:
+        yield dumps(dict(zip(keys, map(_encode_value, row)))) + '\n'
+
+
+def _csv_rows(keys, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(keys)
+    for row in rows:
+        yield writer.writerow([_encode_value(value) for value in row])
+
+
+def stream_export(queryset, fields, output, filename):
+    """
+    Потоковая выгрузка queryset в NDJSON или CSV.
+    fields - пары (ключ в выгрузке, поле для values_list).
+    Строки читаются через iterator(), поэтому память не зависит
+    от размера выгрузки.
+    """
+    keys = [key for key, _ in fields]
+    rows = queryset.order_by('pk').values_list(
+        *(lookup for _, lookup in fields)
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if output == 'csv':
+        content = _csv_rows(keys, rows)
+    else:
+        content = _ndjson_rows(keys, rows)
+    response = StreamingHttpResponse(
+        content, content_type=CONTENT_TYPES[output])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{output}"')
+    return response
+
+
+class ExportMixin:
+    """
+    Добавляет во ViewSet действие export.
+    Поля выгрузки задаются атрибутом export_fields.
+    """
+    export_fields = ()
+    export_name = None
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Потоковая выгрузка в NDJSON (по умолчанию) или CSV (?output=csv)"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in CONTENT_TYPES:
+            raise ValidationError(
+                {'output': 'Поддерживаются форматы ndjson и csv'})
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(queryset, self.export_fields, output,
+                             self.export_name or self.basename)
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .conf import rbac_setting
+
+# Поля, значение которых из values() совпадает с to_representation
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField,
+                serializers.BooleanField, serializers.FloatField)
+
+
+_ISO_DATETIME = object()
+
+
+class ValuesMapper:
+    """
+    Отображение строк values_list() в словари ответа, совпадающие
+    с результатом ModelSerializer. Аксессоры полей компилируются один
+    раз: простые поля берутся из строки как есть, для остальных
+    вызывается to_representation поля сериализатора.
+    SerializerMethodField поддерживается, если источники метода
+    перечислены в method_sources сериализатора: метод получает
+    строку-namedtuple с этими атрибутами.
+    Даты в формате ISO 8601 форматируются без повторного поиска
+    текущего часового пояса на каждой строке.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer = serializer_class()
+        method_sources = getattr(serializer_class, 'method_sources', {})
+        self.lookups = []
+        self.accessors = []
+        for name, field in self.serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                for source in method_sources[name]:
+                    self._lookup_index(source)
+                method = getattr(self.serializer, field.method_name)
+                self.accessors.append((name, None, method))
+                continue
+            index = self._lookup_index(self._field_lookup(field))
+            convert = None
+            if self._is_iso_datetime(field):
+                convert = _ISO_DATETIME
+            elif not isinstance(field, PLAIN_FIELDS + (
+                    serializers.SlugRelatedField,
+                    serializers.PrimaryKeyRelatedField)):
+                convert = field.to_representation
+            self.accessors.append((name, index, convert))
+
+    def _is_iso_datetime(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        return (type(field) is serializers.DateTimeField and settings.USE_TZ
+                and not hasattr(field, 'timezone')
+                and output_format is not None
+                and output_format.lower() == ISO_8601)
+
+    def _field_lookup(self, field):
+        lookup = '__'.join(field.source_attrs)
+        if isinstance(field, serializers.SlugRelatedField):
+            return f'{lookup}__{field.slug_field}'
+        if isinstance(field, PLAIN_FIELDS + (
+                serializers.PrimaryKeyRelatedField,
+                serializers.DateTimeField, serializers.DateField)):
+            return lookup
+        raise TypeError(
+            f'Поле {field.field_name} ({type(field).__name__}) '
+            f'не поддерживается быстрым режимом')
+
+    def _lookup_index(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def values(self, queryset, extra=()):
+        """values_list с нужными полями и дополнительными именами extra"""
+        lookups = self.lookups + [
+            name for name in extra if name not in self.lookups]
+        return queryset.values_list(*lookups, named=True)
+
+    def map(self, rows):
+        # Та же логика, что в DateTimeField.to_representation, но часовой
+        # пояс определяется один раз на страницу
+        field_timezone = timezone.get_current_timezone()
+
+        def iso_datetime(value):
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+
+        accessors = [
+            (name, index,
+             iso_datetime if convert is _ISO_DATETIME else convert)
+            for name, index, convert in self.accessors]
+        result = []
+        for row in rows:
+            item = {}
+            for name, index, convert in accessors:
+                if index is None:
+                    item[name] = convert(row)
+                    continue
+                value = row[index]
+                if value is not None and convert is not None:
+                    value = convert(value)
+                item[name] = value
+            result.append(item)
+        return result
+
+
+class FastListMixin:
+    """
+    Быстрый режим list для ViewSet: страница читается через
+    values_list() и преобразуется ValuesMapper без создания моделей
+    и сериализаторов. Отключается настройкой RBAC['FAST_LIST'].
+    """
+    fast_list_serializer_class = None
+    _values_mapper = None
+
+    @classmethod
+    def get_values_mapper(cls):
+        if cls.__dict__.get('_values_mapper') is None:
+            cls._values_mapper = ValuesMapper(cls.fast_list_serializer_class)
+        return cls._values_mapper
+
+    def list(self, request, *args, **kwargs):
+        if (self.fast_list_serializer_class is None
+                or not rbac_setting('FAST_LIST')):
+            return super().list(request, *args, **kwargs)
+        mapper = self.get_values_mapper()
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering_field = getattr(self.paginator, 'ordering_field', None)
+        rows = mapper.values(queryset, [ordering_field, 'id']
+                             if ordering_field else ())
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(mapper.map(page))
+        return Response(mapper.map(rows))
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .conf import rbac_setting
+from .metrics import registry
+from .utils import chunks
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис хеширования паролей перегружен, повторите позже'
+    default_code = 'hashing_unavailable'
+
+
+def _init_worker(settings_module):
+    # При запуске через spawn настройки в дочернем процессе не загружены
+    if settings_module:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    """Проверяет пароль и сообщает, нужно ли перехешировать его"""
+    outdated = []
+    valid = hashers.check_password(password, encoded, setter=outdated.append)
+    return valid, bool(outdated)
+
+
+def _make_passwords(passwords):
+    return [hashers.make_password(password) for password in passwords]
+
+
+class HashingService:
+    """
+    Хеширование и проверка паролей в отдельном пуле процессов.
+    Число задач в очереди ограничено RBAC['HASH_QUEUE_SIZE']: синхронный
+    вызов ждет свободного места не дольше RBAC['HASH_QUEUE_TIMEOUT'],
+    асинхронный не ждет совсем. В обоих случаях при переполнении
+    выбрасывается HashingUnavailable (503).
+    Если процесс пула аварийно завершился, пул пересоздается, а
+    задача повторяется один раз.
+    При RBAC['HASH_WORKERS'] = 0 пароли хешируются в текущем потоке.
+    """
+
+    # Массовое хеширование отправляет в пул небольшие порции и держит
+    # в работе не больше workers - 1 порций, поэтому у входа
+    # пользователей всегда есть свободный процесс или очередь
+    # не длиннее одной порции
+    bulk_chunk_size = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self.workers = None
+        self.pending = 0
+
+    def _get_executor(self):
+        # После fork пул родителя в дочернем процессе неработоспособен
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._pid != os.getpid():
+                self.workers = (rbac_setting('HASH_WORKERS')
+                                or os.cpu_count() or 1)
+                self._slots = threading.BoundedSemaphore(
+                    rbac_setting('HASH_QUEUE_SIZE'))
+                self.pending = 0
+                self._executor = None
+                self._pid = os.getpid()
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),))
+        return self._executor
+
+    def _restart(self, executor):
+        """Заменяет сломанный пул; следующая задача создаст новый"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        registry.increment('password_hash_pool_restarts_total')
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args, timeout=None, block=True):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=block, timeout=timeout):
+            registry.increment('password_hash_rejected_total')
+            raise HashingUnavailable()
+        with self._lock:
+            self.pending += 1
+        started = time.perf_counter()
+
+        def done(future):
+            with self._lock:
+                self.pending -= 1
+            slots.release()
+            registry.observe('password_hash_seconds',
+                             time.perf_counter() - started)
+
+        try:
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._restart(executor)
+                future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            done(None)
+            raise
+        future.executor = executor
+        future.add_done_callback(done)
+        return future
+
+    def _inline(self):
+        return rbac_setting('HASH_WORKERS') == 0
+
+    def _result(self, future, fn, *args):
+        """Результат задачи; после падения пула задача повторяется"""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self._restart(future.executor)
+        try:
+            return self._submit(
+                fn, *args,
+                timeout=rbac_setting('HASH_QUEUE_TIMEOUT')).result()
+        except BrokenProcessPool:
+            self._restart(self._executor)
+            raise HashingUnavailable()
+
+    def _run(self, fn, *args):
+        if self._inline():
+            return fn(*args)
+        future = self._submit(
+            fn, *args, timeout=rbac_setting('HASH_QUEUE_TIMEOUT'))
+        return self._result(future, fn, *args)
+
+    async def _arun(self, fn, *args):
+        if self._inline():
+            return fn(*args)
+        for attempt in range(2):
+            future = self._submit(fn, *args, block=False)
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                self._restart(future.executor)
+        raise HashingUnavailable()
+
+    def make_password(self, password):
+        """Возвращает хеш пароля"""
+        if password is None:
+            return hashers.make_password(None)
+        return self._run(hashers.make_password, password)
+
+    async def amake_password(self, password):
+        if password is None:
+            return hashers.make_password(None)
+        return await self._arun(hashers.make_password, password)
+
+    def check_password(self, password, encoded):
+        """Возвращает пару (пароль верен, хеш нужно обновить)"""
+        if password is None or not hashers.is_password_usable(encoded):
+            return False, False
+        return self._run(_verify, password, encoded)
+
+    async def acheck_password(self, password, encoded):
+        if password is None or not hashers.is_password_usable(encoded):
+            return False, False
+        return await self._arun(_verify, password, encoded)
+
+    def make_passwords(self, passwords):
+        """
+        Хеширует список паролей с сохранением порядка.
+        Пароли уходят в пул порциями по bulk_chunk_size, и одновременно
+        в работе не больше workers - 1 порций, поэтому проверка пароля
+        при входе ждет не дольше одной порции.
+        """
+        if self._inline() or len(passwords) < 2:
+            return _make_passwords(passwords)
+        self._get_executor()
+        limit = max(self.workers - 1, 1)
+        hashes = []
+        in_flight = deque()
+        for chunk in chunks(passwords, self.bulk_chunk_size):
+            if len(in_flight) >= limit:
+                hashes.extend(self._result(*in_flight.popleft()))
+            in_flight.append((self._submit(_make_passwords, chunk),
+                              _make_passwords, chunk))
+        while in_flight:
+            hashes.extend(self._result(*in_flight.popleft()))
+        return hashes
+
+
+service = HashingService()
+
+registry.register_gauge('password_hash_queue_depth', lambda: service.pending)
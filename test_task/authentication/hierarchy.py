@@ -0,0 +1,115 @@
+from collections import defaultdict, deque
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .effective import schedule_refresh, users_of_roles
+from .models import Role, RoleAncestor, RoleParent
+from .policy import invalidate_policy
+from .utils import CHUNK_SIZE, chunks, on_commit_batch
+from .versions import bump_table_versions
+
+
+def parents_map():
+    """Словарь роль -> множество непосредственных родителей"""
+    parents = defaultdict(set)
+    for role_id, parent_id in RoleParent.objects.values_list(
+            'role_id', 'parent_id'):
+        parents[role_id].add(parent_id)
+    return parents
+
+
+def _children_map(parents):
+    children = defaultdict(set)
+    for role_id, parent_ids in parents.items():
+        for parent_id in parent_ids:
+            children[parent_id].add(role_id)
+    return children
+
+
+def _reachable(graph, start):
+    """Все вершины, достижимые из start, без нее самой"""
+    seen = set()
+    queue = deque(graph.get(start, ()))
+    while queue:
+        node = queue.popleft()
+        if node in seen:
+            continue
+        seen.add(node)
+        queue.extend(graph.get(node, ()))
+    seen.discard(start)
+    return seen
+
+
+def check_cycle(role_id, parent_id):
+    """Выбрасывает ValidationError, если связь role -> parent создаст цикл"""
+    if role_id is None or parent_id is None:
+        return
+    if role_id == parent_id:
+        raise ValidationError('Роль не может быть родителем самой себя')
+    if role_id in _reachable(parents_map(), parent_id):
+        raise ValidationError(
+            'Связь создает цикл в иерархии ролей')
+
+
+def update_closure(role_ids):
+    """
+    Пересчитывает замыкание для указанных ролей и всех их потомков.
+    Возвращает множество ролей, чьи предки изменились.
+    """
+    parents = parents_map()
+    children = _children_map(parents)
+    role_ids = set(role_ids)
+    affected = set(role_ids)
+    for role_id in role_ids:
+        affected |= _reachable(children, role_id)
+
+    desired = {(role_id, ancestor_id)
+               for role_id in affected
+               for ancestor_id in _reachable(parents, role_id)}
+    existing = {}
+    for chunk in chunks(affected):
+        existing.update(
+            ((role_id, ancestor_id), pk)
+            for pk, role_id, ancestor_id in RoleAncestor.objects.filter(
+                role_id__in=chunk).values_list('id', 'role_id', 'ancestor_id'))
+
+    stale = {key: pk for key, pk in existing.items() if key not in desired}
+    missing = desired - existing.keys()
+    for chunk in chunks(stale.values()):
+        RoleAncestor.objects.filter(pk__in=chunk).delete()
+    RoleAncestor.objects.bulk_create(
+        (RoleAncestor(role_id=role_id, ancestor_id=ancestor_id)
+         for role_id, ancestor_id in missing),
+        batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    return {role_id for role_id, _ in missing | stale.keys()}
+
+
+def _apply_closure_update(role_ids):
+    with transaction.atomic():
+        changed = update_closure(
+            Role.objects.filter(pk__in=role_ids).values_list('pk', flat=True))
+        if not changed:
+            return
+        bump_table_versions(RoleAncestor)
+        invalidate_policy()
+        schedule_refresh(users_of_roles(changed))
+
+
+def schedule_closure_update(role_ids):
+    """Откладывает пересчет замыкания до коммита текущей транзакции"""
+    on_commit_batch('role_closure', role_ids, _apply_closure_update)
+
+
+def rebuild_closure():
+    """Полностью перестраивает замыкание иерархии ролей"""
+    parents = parents_map()
+    with transaction.atomic():
+        RoleAncestor.objects.all().delete()
+        RoleAncestor.objects.bulk_create(
+            (RoleAncestor(role_id=role_id, ancestor_id=ancestor_id)
+             for role_id in list(parents)
+             for ancestor_id in _reachable(parents, role_id)),
+            batch_size=CHUNK_SIZE)
+        invalidate_policy()
+    return RoleAncestor.objects.count()
@@ -0,0 +1,221 @@
+import csv
+import io
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .hashing import service as hashing_service
+from .utils import CHUNK_SIZE, chunks
+from .versions import bump_table_versions
+
+User = get_user_model()
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('username', 'email', 'first_name', 'last_name',
+                 'middle_name', 'is_active')
+REQUIRED_FIELDS = ('username', 'email', 'first_name', 'last_name', 'password')
+TRUE_VALUES = {'1', 'true', 'yes', 'да'}
+FALSE_VALUES = {'0', 'false', 'no', 'нет'}
+
+
+def detect_format(filename, default='csv'):
+    """Определяет формат по расширению файла"""
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Читает текстовый поток и выдает пары (номер строки, данные).
+    Нераспознанные строки выдаются с данными None.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _clean_row(row):
+    errors = {}
+    data = {}
+    for name in REQUIRED_FIELDS:
+        value = row.get(name)
+        if value is None or not str(value).strip():
+            errors[name] = ['Обязательное поле']
+    for name in IMPORT_FIELDS[:-1]:
+        value = str(row.get(name) or '').strip()
+        max_length = User._meta.get_field(name).max_length
+        if len(value) > max_length:
+            errors.setdefault(name, []).append(
+                f'Длина больше {max_length} символов')
+        data[name] = value
+    if 'email' not in errors:
+        data['email'] = User.objects.normalize_email(data['email'])
+        try:
+            validate_email(data['email'])
+        except ValidationError as exc:
+            errors['email'] = list(exc.messages)
+    if 'username' not in errors:
+        try:
+            User.username_validator(data['username'])
+        except ValidationError as exc:
+            errors['username'] = list(exc.messages)
+    is_active = row.get('is_active', True)
+    if isinstance(is_active, str):
+        value = is_active.strip().lower()
+        if value in TRUE_VALUES or not value:
+            is_active = True
+        elif value in FALSE_VALUES:
+            is_active = False
+    if not isinstance(is_active, bool):
+        errors['is_active'] = ['Ожидается логическое значение']
+    data['is_active'] = is_active
+    return data, str(row.get('password') or ''), errors
+
+
+def _taken(field, values):
+    taken = set()
+    for chunk in chunks(values):
+        taken.update(User.objects.filter(
+            **{f'{field}__in': chunk}).values_list(field, flat=True))
+    return taken
+
+
+class ImportFileError(Exception):
+    """
+    Файл не удалось прочитать до конца. report содержит итог по
+    строкам, импортированным до ошибки.
+    """
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+class ImportReport:
+    """Итог импорта: число созданных пользователей и ошибки по строкам"""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, number, errors):
+        self.errors.append({'row': number, 'errors': errors})
+
+    def as_dict(self):
+        return {'total': self.total, 'created': self.created,
+                'failed': len(self.errors), 'errors': self.errors}
+
+
+def _import_batch(batch, seen, report):
+    cleaned = []
+    for number, row in batch:
+        if row is None:
+            report.add_error(number, {'non_field_errors': [
+                'Строка не является JSON-объектом']})
+            continue
+        data, password, errors = _clean_row(row)
+        if errors:
+            report.add_error(number, errors)
+        else:
+            cleaned.append((number, data, password))
+
+    taken_emails = _taken('email', {data['email'] for _, data, _ in cleaned})
+    taken_usernames = _taken(
+        'username', {data['username'] for _, data, _ in cleaned})
+    valid = []
+    for number, data, password in cleaned:
+        errors = {}
+        if data['email'] in taken_emails or data['email'] in seen['email']:
+            errors['email'] = ['Пользователь с таким email уже существует']
+        if (data['username'] in taken_usernames
+                or data['username'] in seen['username']):
+            errors['username'] = ['Пользователь с таким именем уже существует']
+        if errors:
+            report.add_error(number, errors)
+            continue
+        seen['email'].add(data['email'])
+        seen['username'].add(data['username'])
+        valid.append((number, data, password))
+
+    hashes = hashing_service.make_passwords(
+        [password for _, _, password in valid])
+    users = [User(password=encoded, **data)
+             for (_, data, _), encoded in zip(valid, hashes)]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=CHUNK_SIZE)
+        created = len(users)
+    except IntegrityError:
+        created = _insert_skipping_conflicts(valid, users, report)
+    report.created += created
+    if created:
+        bump_table_versions(User)
+
+
+def _insert_skipping_conflicts(valid, users, report):
+    """
+    Повторная вставка пакета, в котором часть пользователей успели
+    создать параллельно. Свои строки узнаются по хешу пароля: соль
+    делает его уникальным. Возвращает число созданных пользователей.
+    """
+    User.objects.bulk_create(users, batch_size=CHUNK_SIZE,
+                             ignore_conflicts=True)
+    inserted = set()
+    for chunk in chunks(users):
+        inserted.update(User.objects.filter(
+            email__in=[user.email for user in chunk]
+        ).values_list('email', 'password'))
+    created = 0
+    for (number, _, _), user in zip(valid, users):
+        if (user.email, user.password) in inserted:
+            created += 1
+        else:
+            report.add_error(number, {'non_field_errors': [
+                'Пользователь с таким email или именем уже существует']})
+    return created
+
+
+def import_users(stream, fmt, batch_size=1000):
+    """
+    Импортирует пользователей из CSV или NDJSON.
+    Строки проверяются и вставляются пакетами через bulk_create,
+    пароли хешируются в пуле процессов. Ошибочные строки попадают
+    в отчет и не прерывают импорт остальных.
+    """
+    report = ImportReport()
+    seen = {'email': set(), 'username': set()}
+    try:
+        for batch in chunks(read_rows(stream, fmt), batch_size):
+            report.total += len(batch)
+            _import_batch(batch, seen, report)
+    except UnicodeDecodeError:
+        raise ImportFileError('Файл должен быть в кодировке UTF-8', report)
+    except csv.Error as exc:
+        raise ImportFileError(f'Ошибка разбора CSV: {exc}', report)
+    finally:
+        report.errors.sort(key=lambda error: error['row'])
+    return report
+
+
+def open_upload(upload):
+    """Оборачивает загруженный файл в текстовый поток"""
+    return io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
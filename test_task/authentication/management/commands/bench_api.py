@@ -0,0 +1,145 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import Post
+from authentication.profiling import QueryRecorder, summarize_latencies
+
+User = get_user_model()
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон реальных эндпоинтов в процессе. '
+            'Данные готовит команда seed_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Число запросов на эндпоинт')
+        parser.add_argument('--login-requests', type=int, default=20,
+                            help='Число запросов на выдачу JWT')
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        try:
+            user = User.objects.get(email=f'{prefix}-user-0@example.com')
+            admin = User.objects.get(email=f'{prefix}-admin@example.com')
+        except User.DoesNotExist:
+            raise CommandError('Сначала выполните manage.py seed_data')
+
+        # Тестовое окружение разрешает хост testserver и не зависит
+        # от ALLOWED_HOSTS
+        setup_test_environment()
+        try:
+            self._benchmark(user, admin, options)
+        finally:
+            teardown_test_environment()
+
+    def _benchmark(self, user, admin, options):
+        user_client = self._client(user)
+        admin_client = self._client(admin)
+        created_before = Post.objects.filter(author=user).order_by(
+            '-id').values_list('id', flat=True).first() or 0
+        requests = options['requests']
+        scenarios = [
+            ('jwt-create', APIClient(), 'post', '/api/v1/jwt/create/',
+             {'email': user.email, 'password': options['password']},
+             options['login_requests']),
+            ('user-me', user_client, 'get', '/api/users/me/', None, requests),
+            ('post-list', user_client, 'get', '/api/posts/?limit=20',
+             None, requests),
+            ('post-list-cursor', user_client, 'get',
+             '/api/posts/?cursor=&limit=20', None, requests),
+            ('post-create', user_client, 'post', '/api/posts/',
+             {'text': 'benchmark'}, requests),
+        ]
+        for name in ('resources', 'actions', 'roles', 'permissions',
+                     'user-roles'):
+            scenarios.append((f'{name}-list', admin_client, 'get',
+                              f'/api/{name}/?limit=50', None, requests))
+
+        # Замеряется пропускная способность, а не ограничение частоты
+        no_throttling = override_settings(
+            RBAC={**getattr(settings, 'RBAC', {}), 'THROTTLE_ENABLED': False})
+        try:
+            results = {}
+            for name, client, method, url, data, count in scenarios:
+                with no_throttling:
+                    results[name] = self._run(
+                        client, method, url, data, count)
+                self.stderr.write(
+                    f'{name}: {results[name]["rps"]} rps, '
+                    f'p99 {results[name]["p99_ms"]} мс')
+        finally:
+            Post.objects.filter(
+                author=user, id__gt=created_before, text='benchmark').delete()
+
+        report = {
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(payload)
+        self.stdout.write(payload)
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(
+            RefreshToken.for_user(user).access_token))
+        return client
+
+    def _run(self, client, method, url, data, count):
+        send = getattr(client, method)
+        # Прогревочный запрос заполняет кэши решений и политики
+        self._check_response(url, send(url, data, format='json'))
+
+        latencies = []
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            for _ in range(count):
+                request_started = time.perf_counter()
+                response = send(url, data, format='json')
+                latencies.append(time.perf_counter() - request_started)
+                self._check_response(url, response)
+        elapsed = time.perf_counter() - started
+
+        summary = summarize_latencies(latencies, elapsed)
+        summary['queries_per_request'] = round(recorder.count / count, 2)
+        summary['sql_ms_per_request'] = round(
+            recorder.time / count * 1000, 3)
+        return summary
+
+    def _check_response(self, url, response):
+        # Замеры ответов с ошибкой не описывают реальный эндпоинт
+        if not 200 <= response.status_code < 300:
+            raise CommandError(
+                f'{url}: статус {response.status_code}: '
+                f'{response.content[:200].decode(errors="replace")}')
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import (Action, Permission, Post, Resource, Role,
+                                   UserRole)
+from authentication.profiling import summarize_latencies
+
+User = get_user_model()
+
+# Пары (синхронный WSGI-путь, асинхронный ASGI-путь)
+ENDPOINTS = (
+    ('/api/users/me/', '/api/async/users/me/'),
+    ('/api/posts/?limit=20', '/api/async/posts/?limit=20'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность и задержки синхронных '
+            'представлений под WSGI и асинхронных под ASGI')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--posts', type=int, default=100)
+
+    def handle(self, *args, **options):
+        user, objects = self._create_fixture(options['posts'])
+        headers = {'Authorization': 'Bearer ' + str(
+            RefreshToken.for_user(user).access_token)}
+        # Тестовое окружение разрешает хост testserver
+        setup_test_environment()
+        try:
+            report = {}
+            for sync_path, async_path in ENDPOINTS:
+                report[sync_path] = {
+                    'wsgi': self._run_wsgi(sync_path, headers, options),
+                    'asgi': asyncio.run(
+                        self._run_asgi(async_path, headers, options)),
+                }
+            self.stdout.write(json.dumps(report, indent=2))
+        finally:
+            teardown_test_environment()
+            for obj in objects:
+                obj.delete()
+
+    def _check_statuses(self, path, statuses):
+        errors = sorted(status for status in statuses
+                        if not 200 <= status < 300)
+        if errors:
+            raise CommandError(f'{path}: ответы со статусами {errors}')
+
+    def _run_wsgi(self, path, headers, options):
+        def worker(count):
+            client = Client(headers=headers)
+            latencies, statuses = [], set()
+            for _ in range(count):
+                started = time.perf_counter()
+                statuses.add(client.get(path, headers=headers).status_code)
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+            return latencies, statuses
+
+        concurrency = options['concurrency']
+        per_worker = max(options['requests'] // concurrency, 1)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, [per_worker] * concurrency))
+        elapsed = time.perf_counter() - started
+        self._check_statuses(path, {status for _, statuses in results
+                                    for status in statuses})
+        return summarize_latencies(
+            [value for latencies, _ in results for value in latencies],
+            elapsed)
+
+    async def _run_asgi(self, path, headers, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies, statuses = [], set()
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                statuses.add(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        self._check_statuses(path, statuses)
+        return summarize_latencies(latencies, elapsed)
+
+    def _create_fixture(self, posts):
+        user = User.objects.create_user(
+            email='bench-asgi@example.com', username='bench-asgi',
+            first_name='Bench', last_name='ASGI', password=None)
+        role = Role.objects.create(name='bench-asgi')
+        resource = Resource.objects.create(name='posts')
+        action = Action.objects.create(name='read')
+        Permission.objects.create(role=role, resource=resource, action=action)
+        UserRole.objects.create(user=user, role=role)
+        Post.objects.bulk_create(
+            Post(text=f'bench post {i}', author=user) for i in range(posts))
+        return user, [user, role, resource, action]
@@ -0,0 +1,107 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import Action, Permission, Resource, Role, UserRole
+from authentication.policy import CompiledPolicy
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает проверку доступа запросом к базе и по '
+            'скомпилированной политике на синтетических данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', type=int, default=1000)
+        parser.add_argument('--resources', type=int, default=500)
+        parser.add_argument('--actions', type=int, default=4)
+        parser.add_argument('--grants-per-role', type=int, default=50)
+        parser.add_argument('--roles-per-user', type=int, default=3)
+        parser.add_argument('--checks', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rnd = random.Random(options['seed'])
+        roles = Role.objects.bulk_create(
+            Role(name=f'bench-role-{i}') for i in range(options['roles']))
+        resources = Resource.objects.bulk_create(
+            Resource(name=f'bench-resource-{i}')
+            for i in range(options['resources']))
+        actions = Action.objects.bulk_create(
+            Action(name=f'bench-action-{i}')
+            for i in range(options['actions']))
+        pairs = [(resource, action)
+                 for resource in resources for action in actions]
+        permissions = []
+        for role in roles:
+            for resource, action in rnd.sample(
+                    pairs, min(options['grants_per_role'], len(pairs))):
+                permissions.append(
+                    Permission(role=role, resource=resource, action=action))
+        Permission.objects.bulk_create(permissions, batch_size=5000)
+
+        user = User.objects.create_user(
+            email='bench-policy@example.com', username='bench-policy',
+            first_name='Bench', last_name='Policy', password=None)
+        UserRole.objects.bulk_create(
+            UserRole(user=user, role=role)
+            for role in rnd.sample(roles, options['roles_per_user']))
+
+        checks = [(resource.name, action.name)
+                  for resource, action in rnd.choices(
+                      pairs, k=options['checks'])]
+
+        started = time.perf_counter()
+        policy = CompiledPolicy.load()
+        load_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        query_results = [self._query_check(user, resource, action)
+                         for resource, action in checks]
+        query_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        role_ids = list(UserRole.objects.filter(
+            user=user).values_list('role_id', flat=True))
+        mask = policy.user_mask(role_ids)
+        policy_results = [policy.allows(mask, resource, action)
+                          for resource, action in checks]
+        policy_time = time.perf_counter() - started
+
+        if query_results != policy_results:
+            self.stderr.write('Результаты проверок не совпадают')
+
+        count = len(checks)
+        self.stdout.write(
+            f'Ролей: {len(roles)}, ресурсов: {len(resources)}, '
+            f'действий: {len(actions)}, разрешений: {len(permissions)}')
+        self.stdout.write(f'Компиляция политики: {load_time * 1000:.1f} мс')
+        self.stdout.write(
+            f'Запрос к базе: {query_time / count * 1e6:.1f} мкс/проверка')
+        self.stdout.write(
+            f'Политика: {policy_time / count * 1e6:.2f} мкс/проверка')
+
+    def _query_check(self, user, resource_name, action_name):
+        user_roles = UserRole.objects.filter(
+            user=user).values_list('role', flat=True)
+        return Permission.objects.filter(
+            role__in=user_roles,
+            resource__name=resource_name,
+            action__name=action_name
+        ).exists()
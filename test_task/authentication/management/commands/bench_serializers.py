@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from authentication.fastpath import ValuesMapper
+from authentication.models import Post
+from authentication.serializers import PostSerializer, UserSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стоимость строки списка в сериализаторах DRF '
+            'и в быстром режиме values(). Данные готовит команда seed_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Размер страницы')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        scenarios = [
+            ('users', User.objects.order_by('-created_at', '-id'),
+             UserSerializer),
+            ('posts', Post.objects.select_related('author').order_by(
+                '-pub_date', '-id'), PostSerializer),
+        ]
+        renderer = JSONRenderer()
+        for name, queryset, serializer_class in scenarios:
+            page = queryset[:rows]
+            count = len(page)
+            if not count:
+                raise CommandError('Сначала выполните manage.py seed_data')
+            mapper = ValuesMapper(serializer_class)
+
+            # all() дает новый queryset без кэша результатов, поэтому
+            # в оба замера входит чтение страницы из базы
+            def slow():
+                return serializer_class(page.all(), many=True).data
+
+            def fast():
+                return mapper.map(mapper.values(page.all()))
+
+            if renderer.render(slow()) != renderer.render(fast()):
+                raise CommandError(f'{name}: JSON быстрого режима отличается')
+            slow_time = self._measure(slow, options['repeat'])
+            fast_time = self._measure(fast, options['repeat'])
+            self.stdout.write(
+                f'{name}: {count} строк, сериализатор '
+                f'{slow_time / count * 1e6:.2f} мкс/строка, values() '
+                f'{fast_time / count * 1e6:.2f} мкс/строка, '
+                f'ускорение x{slow_time / fast_time:.1f}')
+        self.stdout.write(self.style.SUCCESS('JSON совпадает побайтно'))
+
+    def _measure(self, func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,152 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from authentication.profiling import QueryRecorder, percentile
+from authentication.throttling import (LoginRateThrottle, SharedWindowStore,
+                                       TokenBucketStore, parse_rate)
+
+
+class Command(BaseCommand):
+    help = ('Стоимость решения об ограничении частоты и проверка, что отказ '
+            'на входе не хеширует пароль и не обращается к базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--decisions', type=int, default=100000)
+        parser.add_argument('--clients', type=int, default=10000,
+                            help='Число различных адресов клиентов')
+        parser.add_argument('--rps', type=int, default=10000,
+                            help='Частота запросов в имитации атаки')
+        parser.add_argument('--seconds', type=int, default=10)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Число воркеров в имитации атаки')
+
+    def handle(self, *args, **options):
+        rates = {'login': '10/min', 'login_ip': '100/min',
+                 'register': '5/min'}
+        with override_settings(RBAC={**getattr(settings, 'RBAC', {}),
+                                     'THROTTLE_ENABLED': True,
+                                     'THROTTLE_RATES': rates}):
+            self._bench_store(options)
+            self._bench_throttle(options)
+            self._simulate_attack(options, rates['login'])
+            # Тестовое окружение разрешает хост testserver и не зависит
+            # от ALLOWED_HOSTS
+            setup_test_environment()
+            try:
+                self._check_rejection()
+            finally:
+                teardown_test_environment()
+
+    def _bench_store(self, options):
+        store = TokenBucketStore(max_keys=options['clients'] * 2)
+        keys = [f'login:ip:10.0.{i // 256}.{i % 256}'
+                for i in range(options['clients'])]
+        decisions = options['decisions']
+        capacity, refill_rate = parse_rate('10/min')
+        started = time.perf_counter()
+        for i in range(decisions):
+            store.consume(keys[i % len(keys)], capacity, refill_rate)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'store: {elapsed / decisions * 1e6:.2f} мкс/решение, '
+            f'{decisions / elapsed:,.0f} решений/с')
+
+    def _bench_throttle(self, options):
+        factory = APIRequestFactory()
+        requests = []
+        # Первые запросы каждого клиента проходят до общего счетчика
+        # в кэше, остальные отклоняются корзинами процесса
+        for i in range(min(options['clients'], 100)):
+            request = Request(factory.post(
+                '/api/v1/jwt/create/',
+                {'email': f'user-{i}@example.com', 'password': 'x'},
+                format='json', REMOTE_ADDR=f'10.1.{i // 256}.{i % 256}'),
+                parsers=[JSONParser()])
+            request.data  # тело разбирается один раз, как в представлении
+            requests.append(request)
+        throttle = LoginRateThrottle()
+        throttle.store = TokenBucketStore(max_keys=len(requests) * 4)
+        throttle.shared_store = self._shared_store()
+        decisions = options['decisions']
+        latencies = []
+        for i in range(decisions):
+            started = time.perf_counter()
+            throttle.allow_request(requests[i % len(requests)], None)
+            latencies.append(time.perf_counter() - started)
+        total = sum(latencies)
+        latencies.sort()
+        self.stdout.write(
+            f'LoginRateThrottle: p50 {percentile(latencies, 0.5) * 1e6:.1f} '
+            f'мкс, p99 {percentile(latencies, 0.99) * 1e6:.1f} мкс, '
+            f'{decisions / total:,.0f} решений/с')
+
+    def _shared_store(self):
+        # Отдельный префикс, чтобы не видеть счетчики прошлых запусков
+        shared_store = SharedWindowStore()
+        shared_store.prefix = f'bench-throttle:{time.time_ns()}'
+        return shared_store
+
+    def _simulate_attack(self, options, rate):
+        """
+        Один адрес шлет rps запросов в секунду по модельным часам,
+        запросы распределяются по воркерам с собственными корзинами
+        """
+        workers = [TokenBucketStore(max_keys=16)
+                   for _ in range(options['workers'])]
+        shared_store = self._shared_store()
+        capacity, refill_rate = parse_rate(rate)
+        period = capacity / refill_rate
+        rps, seconds = options['rps'], options['seconds']
+        allowed = shared_hits = 0
+        started = time.perf_counter()
+        for i in range(rps * seconds):
+            now = i / rps
+            local = workers[i % len(workers)]
+            if local.consume('login:ip:attacker', capacity, refill_rate,
+                             now=now):
+                continue
+            shared_hits += 1
+            if shared_store.hit('login:ip:attacker', capacity, period,
+                                now=now):
+                local.drain('login:ip:attacker', now)
+            else:
+                allowed += 1
+        elapsed = time.perf_counter() - started
+        expected = capacity + int(seconds * refill_rate)
+        self.stdout.write(
+            f'атака {rps} rps x {seconds} с на {len(workers)} воркера: '
+            f'пропущено {allowed} (ожидалось не больше {expected}), '
+            f'обращений к общему счетчику {shared_hits}, обработка заняла '
+            f'{elapsed:.3f} с ({elapsed / seconds * 100:.1f}% одного ядра)')
+
+    def _check_rejection(self):
+        client = APIClient()
+        data = {'email': 'bench-throttle@example.com', 'password': 'x'}
+        url = '/api/v1/jwt/create/'
+        for _ in range(20):
+            response = client.post(url, data, format='json',
+                                   REMOTE_ADDR='10.2.0.1')
+            if response.status_code == 429:
+                break
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = client.post(url, data, format='json',
+                                   REMOTE_ADDR='10.2.0.1')
+        elapsed = time.perf_counter() - started
+        if response.status_code != 429:
+            raise CommandError(
+                f'{url}: ожидался отказ 429, получен статус '
+                f'{response.status_code}')
+        self.stdout.write(
+            f'отказ {url}: статус {response.status_code}, '
+            f'Retry-After {response.get("Retry-After")}, '
+            f'SQL-запросов {recorder.count}, {elapsed * 1000:.2f} мс')
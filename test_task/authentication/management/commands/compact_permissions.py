@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from authentication.models import Permission
+from authentication.policy import invalidate_policy
+from authentication.signals import invalidate_permissions
+from authentication.utils import chunks
+from authentication.versions import bump_table_versions
+
+
+def redundant_permissions():
+    """Разрешения, которые роль уже получает от одного из предков"""
+    inherited = Permission.objects.filter(
+        role__descendant_links__role_id=OuterRef('role_id'),
+        resource_id=OuterRef('resource_id'),
+        action_id=OuterRef('action_id'))
+    return Permission.objects.filter(Exists(inherited))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет разрешения, дублирующие разрешения родительских ролей. '
+            'Действующие права пользователей не меняются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только посчитать лишние разрешения')
+
+    def handle(self, *args, **options):
+        total = Permission.objects.count()
+        with transaction.atomic():
+            ids = list(redundant_permissions().values_list('pk', flat=True))
+            if ids and not options['dry_run']:
+                for chunk in chunks(ids):
+                    # Права пользователей не меняются, поэтому таблица
+                    # действующих разрешений не пересчитывается
+                    Permission.objects.filter(pk__in=chunk)._raw_delete(
+                        Permission.objects.db)
+                invalidate_permissions()
+                invalidate_policy()
+                bump_table_versions(Permission)
+        verb = 'Можно удалить' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} разрешений: {len(ids)} из {total}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authentication.revocation import store
+
+
+class Command(BaseCommand):
+    help = 'Удаляет записи об отозванных токенах с истекшим сроком действия'
+
+    def handle(self, *args, **options):
+        deleted = store.compact()
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.imports import (IMPORT_FORMATS, ImportFileError,
+                                    detect_format, import_users)
+
+
+class Command(BaseCommand):
+    help = ('Импорт пользователей из CSV или NDJSON. '
+            'Пароли хешируются в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с пользователями')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Формат файла; по умолчанию по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--errors', help='Файл для JSON-отчета об ошибках')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig',
+                      newline='') as stream:
+                report = import_users(stream, fmt, options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f'Не удалось прочитать файл: {exc}')
+        except ImportFileError as exc:
+            raise CommandError(
+                f'{exc}. До ошибки обработано строк: {exc.report.total}, '
+                f'создано: {exc.report.created}')
+
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8') as output:
+                json.dump(report.errors, output, ensure_ascii=False, indent=2)
+        else:
+            for error in report.errors[:20]:
+                self.stderr.write(
+                    f"Строка {error['row']}: "
+                    f"{json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {report.total}, создано: {report.created}, '
+            f'с ошибками: {len(report.errors)}'))
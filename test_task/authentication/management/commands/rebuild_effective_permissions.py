@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from authentication.effective import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает таблицу действующих разрешений с нуля'
+
+    def handle(self, *args, **options):
+        total = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано действующих разрешений: {total}'))
@@ -0,0 +1,135 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.effective import rebuild_all
+from authentication.hierarchy import rebuild_closure
+from authentication.models import (Action, Permission, Post, Resource, Role,
+                                   RoleParent, UserRole)
+from authentication.policy import invalidate_policy
+from authentication.signals import invalidate_permissions
+from authentication.utils import chunks
+from authentication.versions import bump_table_versions
+
+User = get_user_model()
+
+BASE_ACTIONS = ('read', 'create', 'update', 'delete')
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--roles', type=int, default=50)
+        parser.add_argument('--resources', type=int, default=100)
+        parser.add_argument('--actions', type=int, default=8)
+        parser.add_argument('--permissions-per-role', type=int, default=20)
+        parser.add_argument('--roles-per-user', type=int, default=2)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--hierarchy', action='store_true',
+                            help='Общие разрешения выдаются базовой ролью, '
+                                 'от которой наследуются остальные')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = self._seed(options)
+            rebuild_closure()
+            rebuild_all()
+            invalidate_permissions()
+            invalidate_policy()
+            bump_table_versions(User, Role, Resource, Action, Permission,
+                                RoleParent, UserRole, Post)
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{name}: {count}'
+                            for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {elapsed:.1f} с - {summary}'))
+
+    def _seed(self, options):
+        rnd = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        password = make_password(options['password'])
+
+        admin = User.objects.create(
+            email=f'{prefix}-admin@example.com', username=f'{prefix}-admin',
+            first_name='Seed', last_name='Admin', password=password,
+            is_staff=True)
+        users = [admin]
+        for batch in chunks(
+                (User(email=f'{prefix}-user-{i}@example.com',
+                      username=f'{prefix}-user-{i}', first_name='Seed',
+                      last_name=f'User {i}', password=password)
+                 for i in range(options['users'])), batch_size):
+            users.extend(User.objects.bulk_create(batch))
+
+        actions = Action.objects.bulk_create(
+            [Action(name=name) for name in BASE_ACTIONS]
+            + [Action(name=f'{prefix}-action-{i}') for i in range(
+                max(options['actions'] - len(BASE_ACTIONS), 0))])
+        resources = Resource.objects.bulk_create(
+            [Resource(name='posts')]
+            + [Resource(name=f'{prefix}-resource-{i}')
+               for i in range(options['resources'] - 1)])
+        roles = Role.objects.bulk_create(
+            Role(name=f'{prefix}-role-{i}') for i in range(options['roles']))
+        admin_role = Role.objects.create(name=f'{prefix}-admin')
+        base_role = None
+        if options['hierarchy']:
+            base_role = Role.objects.create(name=f'{prefix}-base')
+            RoleParent.objects.bulk_create(
+                RoleParent(role=role, parent=base_role) for role in roles)
+
+        posts_resource = resources[0]
+        grants = {(admin_role.pk, posts_resource.pk, action.pk)
+                  for action in actions[:len(BASE_ACTIONS)]}
+        pairs = [(resource.pk, action.pk)
+                 for resource in resources for action in actions]
+        # Каждая роль может читать и создавать посты, чтобы
+        # пользователи проходили проверки эндпоинтов
+        for role in [base_role] if base_role else roles:
+            grants.add((role.pk, posts_resource.pk, actions[0].pk))
+            grants.add((role.pk, posts_resource.pk, actions[1].pk))
+        for role in roles:
+            for resource_id, action_id in rnd.sample(
+                    pairs, min(options['permissions_per_role'], len(pairs))):
+                grants.add((role.pk, resource_id, action_id))
+        for batch in chunks(grants, batch_size):
+            Permission.objects.bulk_create(
+                Permission(role_id=role_id, resource_id=resource_id,
+                           action_id=action_id)
+                for role_id, resource_id, action_id in batch)
+
+        assignments = [UserRole(user=admin, role=admin_role)]
+        per_user = min(options['roles_per_user'], len(roles))
+        for user in users[1:]:
+            for role in rnd.sample(roles, per_user):
+                assignments.append(
+                    UserRole(user=user, role=role, assigned_by=admin))
+        for batch in chunks(assignments, batch_size):
+            UserRole.objects.bulk_create(batch)
+
+        author_ids = [user.pk for user in users]
+        for batch in chunks(
+                (Post(text=f'{prefix} post {i}',
+                      author_id=rnd.choice(author_ids))
+                 for i in range(options['posts'])), batch_size):
+            Post.objects.bulk_create(batch)
+
+        return {
+            'users': len(users),
+            'roles': len(roles) + 1 + (base_role is not None),
+            'resources': len(resources), 'actions': len(actions),
+            'permissions': len(grants), 'user_roles': len(assignments),
+            'posts': options['posts'],
+        }
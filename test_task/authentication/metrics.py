@@ -0,0 +1,285 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .conf import rbac_setting
+from .profiling import QueryRecorder
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0)
+
+
+class _Shard:
+    """Счетчики одного потока; пишет только поток-владелец"""
+
+    def __init__(self):
+        self.routes = {}
+        self.counters = {}
+        self.observations = {}
+
+    def fold(self, other):
+        """Прибавляет к шарду значения другого шарда"""
+        for key, stats in list(other.routes.items()):
+            merged = self.routes.setdefault(key, [0] * len(stats))
+            for index, value in enumerate(stats):
+                merged[index] += value
+        for name, value in list(other.counters.items()):
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, (count, total) in list(other.observations.items()):
+            merged_count, merged_total = self.observations.get(
+                name, (0, 0.0))
+            self.observations[name] = (merged_count + count,
+                                       merged_total + total)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик без блокировок на горячем пути: каждый поток пишет
+    в собственный шард, шарды суммируются только при чтении /metrics.
+    Шарды завершившихся потоков сворачиваются в один общий, поэтому
+    серверы, создающие поток на запрос, не накапливают шарды.
+    Значения относятся к одному процессу.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()
+        self._gauges = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._reap()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _reap(self):
+        """Сворачивает шарды завершившихся потоков; под _shards_lock"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                # Поток завершился и больше не пишет в шард
+                self._retired.fold(shard)
+        self._shards = alive
+
+    def record_request(self, route, method, status, latency, queries,
+                       sql_time, size, permission_time):
+        key = (route, method, status)
+        routes = self._shard().routes
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [
+                0, 0.0, 0, 0.0, 0, 0.0]
+        stats[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        offset = len(LATENCY_BUCKETS) + 1
+        stats[offset] += 1
+        stats[offset + 1] += latency
+        stats[offset + 2] += queries
+        stats[offset + 3] += sql_time
+        stats[offset + 4] += size
+        stats[offset + 5] += permission_time
+
+    def increment(self, name, value=1):
+        """Увеличивает именованный счетчик"""
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Добавляет наблюдение в именованную сводку (count и sum)"""
+        observations = self._shard().observations
+        count, total = observations.get(name, (0, 0.0))
+        observations[name] = (count + 1, total + value)
+
+    def register_gauge(self, name, callback):
+        """Регистрирует функцию, значение которой читается при выгрузке"""
+        self._gauges[name] = callback
+
+    def _merge(self):
+        total = _Shard()
+        with self._shards_lock:
+            self._reap()
+            total.fold(self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            total.fold(shard)
+        return total.routes, total.counters, total.observations
+
+    def render(self):
+        """Выгружает метрики в текстовом формате Prometheus"""
+        routes, counters, observations = self._merge()
+        lines = [
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        offset = len(LATENCY_BUCKETS) + 1
+        totals = {
+            'http_request_sql_queries_total': 2,
+            'http_request_sql_seconds_total': 3,
+            'http_response_size_bytes_total': 4,
+            'http_request_permission_seconds_total': 5,
+        }
+        for (route, method, status), stats in sorted(routes.items()):
+            labels = f'route="{route}",method="{method}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket'
+                             f'{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket'
+                         f'{{{labels},le="+Inf"}} {stats[offset]}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} '
+                         f'{stats[offset]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} '
+                         f'{stats[offset + 1]}')
+        for name, index in totals.items():
+            lines.append(f'# TYPE {name} counter')
+            for (route, method, status), stats in sorted(routes.items()):
+                labels = f'route="{route}",method="{method}",status="{status}"'
+                lines.append(f'{name}{{{labels}}} {stats[offset + index]}')
+        for name, value in sorted(counters.items()):
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {value}')
+        for name, (count, total) in sorted(observations.items()):
+            lines.append(f'# TYPE {name} summary')
+            lines.append(f'{name}_count {count}')
+            lines.append(f'{name}_sum {total}')
+        for name, callback in sorted(self._gauges.items()):
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {callback()}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+_permission_time = ContextVar('permission_time', default=0.0)
+_query_recorder = ContextVar('query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _query_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    # Обертка ставится один раз на соединение и пишет в запись текущего
+    # контекста запроса, поэтому видит и запросы async ORM из потоков
+    # sync_to_async
+    connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder,
+                           dispatch_uid='metrics_query_recorder')
+
+
+def add_permission_time(seconds):
+    """Учитывает время, проведенное в классах разрешений, для запроса"""
+    _permission_time.set(_permission_time.get() + seconds)
+
+
+class TimedPermissionsMixin:
+    """Замеряет время проверок разрешений во view DRF"""
+
+    def check_permissions(self, request):
+        started = time.perf_counter()
+        try:
+            super().check_permissions(request)
+        finally:
+            add_permission_time(time.perf_counter() - started)
+
+    def check_object_permissions(self, request, obj):
+        started = time.perf_counter()
+        try:
+            super().check_object_permissions(request, obj)
+        finally:
+            add_permission_time(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Собирает по каждому маршруту гистограмму задержек, число и время
+    SQL-запросов, размер ответа и время в классах разрешений
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        permission_token = _permission_time.set(0.0)
+        recorder = QueryRecorder()
+        recorder_token = _query_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_recorder.reset(recorder_token)
+        self._record(request, response, time.perf_counter() - started,
+                     recorder)
+        _permission_time.reset(permission_token)
+        return response
+
+    async def __acall__(self, request):
+        permission_token = _permission_time.set(0.0)
+        recorder = QueryRecorder()
+        recorder_token = _query_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_recorder.reset(recorder_token)
+        self._record(request, response, time.perf_counter() - started,
+                     recorder)
+        _permission_time.reset(permission_token)
+        return response
+
+    def _record(self, request, response, latency, recorder):
+        match = request.resolver_match
+        route = (match.url_name or match.route) if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.record_request(
+            route, request.method, response.status_code, latency,
+            recorder.count, recorder.time, size, _permission_time.get())
+
+
+def _metrics_allowed(request):
+    """
+    Доступ к /metrics: bearer-токен RBAC['METRICS_TOKEN'] для сборщика
+    метрик или сессия активного администратора
+    """
+    token = rbac_setting('METRICS_TOKEN')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+def metrics_view(request):
+    """
+    Эндпоинт /metrics в текстовом формате Prometheus. Значения
+    относятся к процессу, обработавшему запрос
+    """
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
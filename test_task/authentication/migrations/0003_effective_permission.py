@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_effective_permissions(apps, schema_editor):
+    Permission = apps.get_model('authentication', 'Permission')
+    EffectivePermission = apps.get_model(
+        'authentication', 'EffectivePermission')
+    rows = Permission.objects.filter(
+        role__user_roles__isnull=False
+    ).values_list('role__user_roles__user_id', 'resource__name',
+                  'action__name').distinct()
+    EffectivePermission.objects.bulk_create(
+        (EffectivePermission(user_id=user_id, resource_name=resource_name,
+                             action_name=action_name)
+         for user_id, resource_name, action_name in rows.iterator()),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EffectivePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_name', models.CharField(max_length=200, verbose_name='Название ресурса')),
+                ('action_name', models.CharField(max_length=100, verbose_name='Название действия')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Действующее разрешение',
+                'verbose_name_plural': 'Действующие разрешения',
+                'unique_together': {('user', 'resource_name', 'action_name')},
+            },
+        ),
+        migrations.RunPython(populate_effective_permissions,
+                             migrations.RunPython.noop),
+    ]
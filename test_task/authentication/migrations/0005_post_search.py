@@ -0,0 +1,83 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE authentication_post_fts USING fts5(
+        text, content='authentication_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER authentication_post_fts_insert
+    AFTER INSERT ON authentication_post BEGIN
+        INSERT INTO authentication_post_fts(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER authentication_post_fts_delete
+    AFTER DELETE ON authentication_post BEGIN
+        INSERT INTO authentication_post_fts(authentication_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER authentication_post_fts_update
+    AFTER UPDATE OF text ON authentication_post BEGIN
+        INSERT INTO authentication_post_fts(authentication_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO authentication_post_fts(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO authentication_post_fts(authentication_post_fts) "
+    "VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS authentication_post_fts_insert',
+    'DROP TRIGGER IF EXISTS authentication_post_fts_delete',
+    'DROP TRIGGER IF EXISTS authentication_post_fts_update',
+    'DROP TABLE IF EXISTS authentication_post_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE authentication_post ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('russian', text)) STORED
+    """,
+    'CREATE INDEX authentication_post_search_idx ON authentication_post '
+    'USING GIN (search_vector)',
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS authentication_post_search_idx',
+    'ALTER TABLE authentication_post DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _execute(schema_editor, statements):
+    statements = statements.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_FORWARD,
+                             'postgresql': POSTGRESQL_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_BACKWARD,
+                             'postgresql': POSTGRESQL_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_revoked_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoleAncestor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='authentication.role')),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='authentication.role')),
+            ],
+            options={
+                'verbose_name': 'Предок роли',
+                'verbose_name_plural': 'Предки ролей',
+                'unique_together': {('role', 'ancestor')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RoleParent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='child_links', to='authentication.role')),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parent_links', to='authentication.role')),
+            ],
+            options={
+                'verbose_name': 'Родительская роль',
+                'verbose_name_plural': 'Родительские роли',
+                'constraints': [models.CheckConstraint(condition=models.Q(('role', models.F('parent')), _negated=True), name='role_parent_not_self')],
+                'unique_together': {('role', 'parent')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:00
+
+from django.db import migrations, models
+
+import authentication.patterns
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_role_hierarchy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='action',
+            name='name',
+            field=models.CharField(max_length=100, validators=[authentication.patterns.validate_name_pattern], verbose_name='Название действия'),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='name',
+            field=models.CharField(max_length=200, validators=[authentication.patterns.validate_name_pattern], verbose_name='Название ресурса'),
+        ),
+    ]
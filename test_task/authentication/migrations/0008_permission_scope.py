@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_name_patterns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='permission',
+            name='scope',
+            field=models.CharField(choices=[('own', 'Только свои объекты'), ('all', 'Все объекты')], default='own', max_length=10, verbose_name='Область'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_permission_scope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Время события')),
+                ('event', models.CharField(choices=[('allow', 'Доступ разрешен'), ('deny', 'Доступ запрещен'), ('role_assigned', 'Роль назначена'), ('role_removed', 'Роль снята')], max_length=20, verbose_name='Событие')),
+                ('user_id', models.BigIntegerField(null=True, verbose_name='Пользователь')),
+                ('actor_id', models.BigIntegerField(null=True, verbose_name='Инициатор')),
+                ('role_id', models.BigIntegerField(null=True, verbose_name='Роль')),
+                ('resource_name', models.CharField(blank=True, max_length=200, verbose_name='Ресурс')),
+                ('action_name', models.CharField(blank=True, max_length=100, verbose_name='Действие')),
+            ],
+            options={
+                'verbose_name': 'Запись аудита',
+                'verbose_name_plural': 'Журнал аудита',
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='audit_created_id_idx'), models.Index(fields=['user_id', '-created_at', '-id'], name='audit_user_created_id_idx'), models.Index(fields=['event', '-created_at', '-id'], name='audit_event_created_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_post_search_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditentry',
+            index=models.Index(fields=['actor_id', '-created_at', '-id'], name='audit_actor_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditentry',
+            index=models.Index(fields=['resource_name', 'action_name', '-created_at', '-id'], name='audit_resource_action_idx'),
+        ),
+    ]
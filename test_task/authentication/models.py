@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .patterns import validate_name_pattern
+
 
 class CustomUser(AbstractUser):
     """Расширенная модель пользователя с дополнительными полями"""
@@ -18,6 +20,10 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='user_created_at_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.last_name} {self.first_name} ({self.email})"
@@ -25,7 +31,8 @@ class CustomUser(AbstractUser):
 
 class Resource(models.Model):
     """Модель ресурса в системе"""
-    name = models.CharField('Название ресурса', max_length=200)
+    name = models.CharField('Название ресурса', max_length=200,
+                            validators=[validate_name_pattern])
     description = models.TextField('Описание', blank=True)
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
@@ -40,7 +47,8 @@ class Resource(models.Model):
 
 class Action(models.Model):
     """Модель действия, которое можно выполнить с ресурсом"""
-    name = models.CharField('Название действия', max_length=100)
+    name = models.CharField('Название действия', max_length=100,
+                            validators=[validate_name_pattern])
     description = models.TextField('Описание', blank=True)
 
     class Meta:
@@ -65,6 +73,58 @@ class Role(models.Model):
         return self.name
 
 
+class RoleParent(models.Model):
+    """Наследование ролей: роль получает разрешения родительской роли"""
+    role = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name='parent_links')
+    parent = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name='child_links')
+
+    class Meta:
+        verbose_name = 'Родительская роль'
+        verbose_name_plural = 'Родительские роли'
+        unique_together = ['role', 'parent']
+        constraints = [
+            models.CheckConstraint(
+                condition=~models.Q(role=models.F('parent')),
+                name='role_parent_not_self'),
+        ]
+
+    def __str__(self):
+        return f"{self.role.name} -> {self.parent.name}"
+
+    def clean(self):
+        from .hierarchy import check_cycle
+        check_cycle(self.role_id, self.parent_id)
+
+
+class RoleAncestor(models.Model):
+    """
+    Транзитивное замыкание иерархии ролей: все предки роли без нее самой.
+    Поддерживается инкрементально при изменении RoleParent.
+    """
+    role = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name='ancestor_links')
+    ancestor = models.ForeignKey(
+        Role, on_delete=models.CASCADE, related_name='descendant_links')
+
+    class Meta:
+        verbose_name = 'Предок роли'
+        verbose_name_plural = 'Предки ролей'
+        unique_together = ['role', 'ancestor']
+
+    def __str__(self):
+        return f"{self.role_id} < {self.ancestor_id}"
+
+
+SCOPE_OWN = 'own'
+SCOPE_ALL = 'all'
+SCOPE_CHOICES = (
+    (SCOPE_OWN, 'Только свои объекты'),
+    (SCOPE_ALL, 'Все объекты'),
+)
+
+
 class Permission(models.Model):
     """Модель разрешения - связь роли с ресурсом и действием"""
     role = models.ForeignKey(
@@ -73,6 +133,8 @@ class Permission(models.Model):
         Resource, on_delete=models.CASCADE, related_name='permissions')
     action = models.ForeignKey(
         Action, on_delete=models.CASCADE, related_name='permissions')
+    scope = models.CharField('Область', max_length=10, choices=SCOPE_CHOICES,
+                             default=SCOPE_OWN)
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
 
     class Meta:
@@ -105,6 +167,26 @@ class UserRole(models.Model):
         return f"{self.user.email} - {self.role.name}"
 
 
+class EffectivePermission(models.Model):
+    """
+    Денормализованное действующее разрешение пользователя.
+    Поддерживается инкрементально при изменении ролей и разрешений.
+    """
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE,
+        related_name='effective_permissions')
+    resource_name = models.CharField('Название ресурса', max_length=200)
+    action_name = models.CharField('Название действия', max_length=100)
+
+    class Meta:
+        verbose_name = 'Действующее разрешение'
+        verbose_name_plural = 'Действующие разрешения'
+        unique_together = ['user', 'resource_name', 'action_name']
+
+    def __str__(self):
+        return f"{self.user_id} {self.action_name} {self.resource_name}"
+
+
 class Post(models.Model):
     """Модель поста как пример ресурса"""
     text = models.TextField()
@@ -112,5 +194,91 @@ class Post(models.Model):
     author = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name='posts')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_id_idx'),
+        ]
+
     def __str__(self):
         return self.text
+
+
+class PostSearch(models.Model):
+    """
+    Полнотекстовый индекс постов: виртуальная таблица FTS5, которую
+    создает и поддерживает миграция 0005_post_search (только SQLite)
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_entry')
+    text = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'authentication_post_fts'
+
+
+class RevokedToken(models.Model):
+    """Отозванный JWT, хранится до истечения срока действия токена"""
+    jti = models.CharField('Идентификатор токена', max_length=255,
+                           unique=True)
+    expires_at = models.DateTimeField('Истекает', db_index=True)
+    revoked_at = models.DateTimeField('Дата отзыва', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Отозванный токен'
+        verbose_name_plural = 'Отозванные токены'
+
+    def __str__(self):
+        return self.jti
+
+
+AUDIT_ALLOW = 'allow'
+AUDIT_DENY = 'deny'
+AUDIT_ROLE_ASSIGNED = 'role_assigned'
+AUDIT_ROLE_REMOVED = 'role_removed'
+AUDIT_EVENTS = (
+    (AUDIT_ALLOW, 'Доступ разрешен'),
+    (AUDIT_DENY, 'Доступ запрещен'),
+    (AUDIT_ROLE_ASSIGNED, 'Роль назначена'),
+    (AUDIT_ROLE_REMOVED, 'Роль снята'),
+)
+
+
+class AuditEntry(models.Model):
+    """
+    Запись журнала аудита: решение о доступе или изменение ролей.
+    Идентификаторы хранятся без внешних ключей, чтобы записи переживали
+    удаление пользователей и ролей и вставлялись пакетами без проверок.
+    """
+    created_at = models.DateTimeField('Время события')
+    event = models.CharField('Событие', max_length=20, choices=AUDIT_EVENTS)
+    user_id = models.BigIntegerField('Пользователь', null=True)
+    actor_id = models.BigIntegerField('Инициатор', null=True)
+    role_id = models.BigIntegerField('Роль', null=True)
+    resource_name = models.CharField('Ресурс', max_length=200, blank=True)
+    action_name = models.CharField('Действие', max_length=100, blank=True)
+
+    class Meta:
+        verbose_name = 'Запись аудита'
+        verbose_name_plural = 'Журнал аудита'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='audit_created_id_idx'),
+            models.Index(fields=['user_id', '-created_at', '-id'],
+                         name='audit_user_created_id_idx'),
+            models.Index(fields=['event', '-created_at', '-id'],
+                         name='audit_event_created_id_idx'),
+            models.Index(fields=['actor_id', '-created_at', '-id'],
+                         name='audit_actor_created_id_idx'),
+            models.Index(fields=['resource_name', 'action_name',
+                                 '-created_at', '-id'],
+                         name='audit_resource_action_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at} {self.event} {self.user_id}"
@@ -0,0 +1,175 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по паре (ordering_field, id): поле сортируется
+    по убыванию (по возрастанию при descending = False), id - всегда
+    по убыванию. Стоимость страницы не зависит от глубины, COUNT(*)
+    выполняется только по запросу ?count=true.
+    """
+    ordering_field = None
+    descending = True
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+    default_limit = 20
+    max_limit = 1000
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self._prepare(queryset, request)
+        if self.count is not None:
+            self.count = queryset.count()
+        return self._finish(list(window))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Асинхронный вариант paginate_queryset для async ORM"""
+        window = self._prepare(queryset, request)
+        if self.count is not None:
+            self.count = await queryset.acount()
+        return self._finish([obj async for obj in window])
+
+    def _prepare(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = True
+
+        field = self.ordering_field
+        if self.descending:
+            queryset = queryset.order_by(f'-{field}', '-id')
+            after = f'{field}__lt'
+        else:
+            queryset = queryset.order_by(field, '-id')
+            after = f'{field}__gt'
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{after: value}) | Q(**{field: value, 'id__lt': pk}))
+        return queryset[:self.limit + 1]
+
+    def _finish(self, page):
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last_position = None
+        if page:
+            last = page[-1]
+            self.last_position = (getattr(last, self.ordering_field), last.id)
+        return page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode()).decode()
+            value, pk = decoded.rsplit('|', 1)
+            return self.parse_value(value), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        value, pk = position
+        raw = f'{self.format_value(value)}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def parse_value(self, value):
+        return datetime.fromisoformat(value)
+
+    def format_value(self, value):
+        return value.isoformat()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.count_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.last_position))
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+
+class AsyncLimitOffsetPagination(LimitOffsetPagination):
+    """LimitOffsetPagination с асинхронным получением страницы"""
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        window = queryset[self.offset:self.offset + self.limit]
+        return [obj async for obj in window]
+
+
+class PostKeysetPagination(KeysetPagination):
+    ordering_field = 'pub_date'
+
+
+class UserKeysetPagination(KeysetPagination):
+    ordering_field = 'created_at'
+
+
+class AuditKeysetPagination(KeysetPagination):
+    ordering_field = 'created_at'
+    default_limit = 100
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """Keyset-пагинация результатов поиска по релевантности"""
+    ordering_field = 'search_rank'
+    descending = False
+
+    def parse_value(self, value):
+        return float(value)
+
+    def format_value(self, value):
+        return repr(value)
+
+
+class KeysetPaginationMixin:
+    """
+    Включает keyset-пагинацию, если в запросе передан параметр cursor
+    (пустой для первой страницы). Иначе используется pagination_class.
+    """
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            if (self.keyset_pagination_class is not None
+                    and request is not None
+                    and KeysetPagination.cursor_query_param
+                    in request.query_params):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
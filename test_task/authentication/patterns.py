@@ -0,0 +1,78 @@
+import copy
+
+from django.core.exceptions import ValidationError
+
+WILDCARD = '*'
+
+
+def is_pattern(name):
+    """Шаблон - имя, оканчивающееся на *: `*`, `posts.*`, `reports/*`"""
+    return name.endswith(WILDCARD)
+
+
+def matches(pattern, name):
+    """Проверяет, подходит ли имя под шаблон или точное имя"""
+    if is_pattern(pattern):
+        return name.startswith(pattern[:-1])
+    return pattern == name
+
+
+def validate_name_pattern(name):
+    """Звездочка допустима только последним символом имени"""
+    if WILDCARD in name[:-1]:
+        raise ValidationError(
+            'Символ * допускается только в конце имени')
+
+
+def candidate_patterns(name):
+    """Все шаблоны, под которые может подойти имя, от * до name*"""
+    return [name[:length] + WILDCARD for length in range(len(name) + 1)]
+
+
+def claims_allow(grants, resource_name, action_name):
+    """
+    Проверяет пару по словарю ресурс -> список действий, в котором
+    ключи и действия могут быть шаблонами
+    """
+    for resource in (resource_name, *candidate_patterns(resource_name)):
+        for action in grants.get(resource, ()):
+            if matches(action, action_name):
+                return True
+    return False
+
+
+class PatternTrie:
+    """
+    Префиксное дерево шаблонов. Поиск всех шаблонов, подходящих под
+    имя, проходит имя один раз и не зависит от числа шаблонов.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, pattern, value):
+        node = self.root
+        for char in pattern[:-1]:
+            node = node.setdefault(char, {})
+        # Значения хранятся под ключом None, который не совпадает
+        # ни с одним символом
+        values = node.setdefault(None, [])
+        if value not in values:
+            values.append(value)
+
+    def copy(self):
+        trie = PatternTrie()
+        trie.root = copy.deepcopy(self.root)
+        return trie
+
+    def match(self, name):
+        """Возвращает значения всех шаблонов, подходящих под имя"""
+        found = []
+        node = self.root
+        for char in name:
+            found.extend(node.get(None, ()))
+            node = node.get(char)
+            if node is None:
+                return found
+        found.extend(node.get(None, ()))
+        return found
@@ -1,6 +1,36 @@
+from asgiref.sync import sync_to_async
 from rest_framework import permissions
 
-from .models import Permission, UserRole
+from .audit import log as audit_log
+from .cache import LRUCache
+from .conf import rbac_setting
+from .models import UserRole
+from .policy import get_policy
+from .signals import PERMISSIONS_GENERATION
+from .tokens import acheck_token_permission, check_token_permission
+
+_decision_cache = LRUCache(PERMISSIONS_GENERATION,
+                           rbac_setting('PERMISSION_CACHE_SIZE'))
+
+
+def user_role_ids(user):
+    """Возвращает идентификаторы ролей пользователя"""
+    return _decision_cache.get_or_compute(
+        ('roles', user.pk),
+        lambda: tuple(UserRole.objects.filter(
+            user=user).values_list('role_id', flat=True))
+    )
+
+
+def view_action_name(view):
+    """
+    Действие RBAC представления: get_action_name(), если представление
+    сопоставляет действия ViewSet с действиями RBAC, иначе action_name
+    """
+    get_action_name = getattr(view, 'get_action_name', None)
+    if get_action_name is not None:
+        return get_action_name()
+    return getattr(view, 'action_name', None)
 
 
 class HasResourcePermission(permissions.BasePermission):
@@ -14,31 +44,88 @@ class HasResourcePermission(permissions.BasePermission):
         if not request.user.is_active:
             return False
         resource_name = getattr(view, 'resource_name', None)
-        action_name = getattr(view, 'action_name', None)
+        action_name = view_action_name(view)
+
+        if not resource_name or not action_name:
+            return True
+
+        decision = check_token_permission(
+            request.auth, resource_name, action_name)
+        if decision is None:
+            decision = self._check_user_permission(
+                request.user, resource_name, action_name)
+        audit_log.record_decision(request.user.pk, resource_name, action_name,
+                                  decision)
+        return decision
+
+    async def ahas_permission(self, request, view):
+        """Асинхронный вариант has_permission для ASGI-представлений"""
+        if not request.user or not request.user.is_authenticated:
+            return False
+        if not request.user.is_active:
+            return False
+        resource_name = getattr(view, 'resource_name', None)
+        action_name = view_action_name(view)
 
         if not resource_name or not action_name:
             return True
 
-        return self._check_user_permission(request.user,
-                                           resource_name, action_name)
+        decision = await acheck_token_permission(
+            request.auth, resource_name, action_name)
+        if decision is None:
+            try:
+                decision = await _decision_cache.aget_or_compute(
+                    (request.user.pk, resource_name, action_name),
+                    lambda: self._aquery_user_permission(
+                        request.user, resource_name, action_name)
+                )
+            except Exception:
+                decision = False
+        audit_log.record_decision(request.user.pk, resource_name, action_name,
+                                  decision)
+        return decision
 
     def _check_user_permission(self, user, resource_name, action_name):
         """Проверяет, есть ли у пользователя разрешение"""
         try:
-
-            user_roles = UserRole.objects.filter(
-                user=user).values_list('role', flat=True)
-            permission_exists = Permission.objects.filter(
-                role__in=user_roles,
-                resource__name=resource_name,
-                action__name=action_name
-            ).exists()
-
-            return permission_exists
-
+            return _decision_cache.get_or_compute(
+                (user.pk, resource_name, action_name),
+                lambda: self._query_user_permission(
+                    user, resource_name, action_name)
+            )
         except Exception:
             return False
 
+    def _query_user_permission(self, user, resource_name, action_name):
+        """
+        Проверка по битовым маскам скомпилированной политики - единственному
+        источнику решений. Политика перестраивается или применяет журнал
+        изменений при смене поколения, поэтому отзыв разрешения действует
+        сразу, а таблица действующих разрешений в проверке не участвует.
+        """
+        policy = get_policy()
+        mask = policy.user_mask(self._user_role_ids(user))
+        return policy.allows(mask, resource_name, action_name)
+
+    def _user_role_ids(self, user):
+        return user_role_ids(user)
+
+    async def _aquery_user_permission(self, user, resource_name, action_name):
+        return await sync_to_async(self._query_user_permission)(
+            user, resource_name, action_name)
+
+    def check_many(self, user, pairs):
+        """
+        Проверяет список пар (ресурс, действие) одним обращением
+        к кэшу или базе
+        """
+        if not user.is_active:
+            return [False] * len(pairs)
+        policy = get_policy()
+        mask = policy.user_mask(self._user_role_ids(user))
+        return [policy.allows(mask, resource_name, action_name)
+                for resource_name, action_name in pairs]
+
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -0,0 +1,337 @@
+import hashlib
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .cache import (aget_generation, bump_generation, get_changes,
+                    get_generation, record_change)
+from .models import (SCOPE_ALL, SCOPE_OWN, Action, Permission, Resource, Role,
+                     RoleAncestor)
+from .patterns import PatternTrie, is_pattern
+
+POLICY_GENERATION = 'policy'
+# Сколько последних изменений другие воркеры применяют инкрементально;
+# при большем отставании политика перестраивается из базы
+CHANGE_LOG_SIZE = 100
+CHANGE_LOG_TIMEOUT = 3600
+# Сколько раз изменение пытается занять свободный номер в журнале
+CHANGE_RECORD_ATTEMPTS = 3
+# Запись журнала, после которой воркеры перестраивают политику из базы
+RELOAD = ('reload',)
+
+
+class CompiledPolicy:
+    """
+    Скомпилированная в память RBAC-политика.
+    Имена ресурсов и действий интернированы в небольшие целые числа,
+    каждой паре (ресурс, действие) соответствует бит, а права роли
+    хранятся битовой маской; отдельная маска отмечает разрешения
+    с областью «все объекты». Роль дополнительно получает маски всех
+    своих предков по иерархии.
+    Имена-шаблоны (`*`, `posts.*`) хранятся в префиксных деревьях, поэтому
+    проверка пары проходит имя один раз независимо от числа шаблонов.
+    """
+
+    def __init__(self):
+        self.resource_ids = {}
+        self.action_ids = {}
+        self.pair_bits = {}
+        self.resource_names = {}
+        self.action_names = {}
+        self.grants = {}
+        self.role_grants = {}
+        self.role_masks = {}
+        self.role_scope_masks = {}
+        self.role_ancestors = {}
+        self.resource_patterns = PatternTrie()
+        self.action_patterns = PatternTrie()
+        self._layout_id = None
+
+    @classmethod
+    def load(cls):
+        """Строит политику по текущему состоянию базы"""
+        policy = cls()
+        policy.resource_names = dict(
+            Resource.objects.values_list('id', 'name'))
+        policy.action_names = dict(Action.objects.values_list('id', 'name'))
+        for role_id in Role.objects.values_list('id', flat=True):
+            policy.role_grants[role_id] = {}
+            policy.role_masks[role_id] = 0
+        rows = Permission.objects.values_list(
+            'id', 'role_id', 'resource_id', 'action_id', 'scope')
+        for permission_id, role_id, resource_id, action_id, scope in rows:
+            policy._add_grant(permission_id, role_id, resource_id, action_id,
+                              scope)
+        for role_id, ancestor_id in RoleAncestor.objects.values_list(
+                'role_id', 'ancestor_id'):
+            policy.role_ancestors.setdefault(role_id, []).append(ancestor_id)
+        return policy
+
+    def copy(self):
+        """
+        Копия для применения изменений. Опубликованная политика не
+        меняется, поэтому читатели обходятся без блокировки.
+        """
+        policy = CompiledPolicy()
+        policy.resource_ids = dict(self.resource_ids)
+        policy.action_ids = dict(self.action_ids)
+        policy.pair_bits = dict(self.pair_bits)
+        policy.resource_names = dict(self.resource_names)
+        policy.action_names = dict(self.action_names)
+        policy.grants = dict(self.grants)
+        policy.role_grants = {role_id: dict(grants) for role_id, grants
+                              in self.role_grants.items()}
+        policy.role_masks = dict(self.role_masks)
+        policy.role_scope_masks = dict(self.role_scope_masks)
+        policy.role_ancestors = {
+            role_id: list(ancestors)
+            for role_id, ancestors in self.role_ancestors.items()}
+        policy.resource_patterns = self.resource_patterns.copy()
+        policy.action_patterns = self.action_patterns.copy()
+        return policy
+
+    def _intern(self, table, patterns, name):
+        index = table.get(name)
+        if index is None:
+            index = table[name] = len(table)
+            if is_pattern(name):
+                patterns.add(name, name)
+        return index
+
+    def _bit(self, resource_name, action_name):
+        pair = (self._intern(self.resource_ids, self.resource_patterns,
+                             resource_name),
+                self._intern(self.action_ids, self.action_patterns,
+                             action_name))
+        bit = self.pair_bits.get(pair)
+        if bit is None:
+            bit = self.pair_bits[pair] = len(self.pair_bits)
+        return bit
+
+    def _add_grant(self, permission_id, role_id, resource_id, action_id,
+                   scope=SCOPE_OWN):
+        bit = self._bit(self.resource_names[resource_id],
+                        self.action_names[action_id])
+        self.grants[permission_id] = (role_id, resource_id, action_id)
+        scope_all = scope == SCOPE_ALL
+        self.role_grants.setdefault(role_id, {})[permission_id] = (
+            bit, scope_all)
+        self.role_masks[role_id] = self.role_masks.get(role_id, 0) | 1 << bit
+        if scope_all:
+            self.role_scope_masks[role_id] = (
+                self.role_scope_masks.get(role_id, 0) | 1 << bit)
+
+    def _remove_grant(self, permission_id):
+        grant = self.grants.pop(permission_id, None)
+        if grant is None:
+            return
+        role_id = grant[0]
+        bits = self.role_grants.get(role_id, {})
+        bits.pop(permission_id, None)
+        self._recompute_role(role_id)
+
+    def _recompute_role(self, role_id):
+        mask = scope_mask = 0
+        for bit, scope_all in self.role_grants.get(role_id, {}).values():
+            mask |= 1 << bit
+            if scope_all:
+                scope_mask |= 1 << bit
+        self.role_masks[role_id] = mask
+        self.role_scope_masks[role_id] = scope_mask
+
+    def permission_saved(self, permission_id, role_id, resource_id,
+                         action_id, scope):
+        if (resource_id not in self.resource_names
+                or action_id not in self.action_names):
+            return False
+        self._remove_grant(permission_id)
+        self._add_grant(permission_id, role_id, resource_id, action_id, scope)
+
+    def permission_deleted(self, permission_id):
+        self._remove_grant(permission_id)
+
+    def role_deleted(self, role_id):
+        self.role_grants.pop(role_id, None)
+        self.role_masks.pop(role_id, None)
+        self.role_scope_masks.pop(role_id, None)
+        self.role_ancestors.pop(role_id, None)
+
+    def _name_saved(self, names, pk, name):
+        # Переименование меняет биты пар, нужна полная перекомпиляция
+        previous = names.get(pk)
+        names[pk] = name
+        return previous is None or previous == name
+
+    def resource_saved(self, resource_id, name):
+        return self._name_saved(self.resource_names, resource_id, name)
+
+    def action_saved(self, action_id, name):
+        return self._name_saved(self.action_names, action_id, name)
+
+    CHANGES = frozenset((
+        'permission_saved', 'permission_deleted', 'role_deleted',
+        'resource_saved', 'action_saved'))
+
+    def apply(self, change):
+        """
+        Применяет изменение вида (имя метода, *аргументы).
+        Возвращает False, если инкрементальное обновление невозможно.
+        """
+        method, *args = change
+        if method not in self.CHANGES:
+            return False
+        return getattr(self, method)(*args) is not False
+
+    def _union(self, masks, role_ids):
+        mask = 0
+        for role_id in role_ids:
+            mask |= masks.get(role_id, 0)
+            for ancestor_id in self.role_ancestors.get(role_id, ()):
+                mask |= masks.get(ancestor_id, 0)
+        return mask
+
+    def user_mask(self, role_ids):
+        """Объединяет маски ролей пользователя и их предков"""
+        return self._union(self.role_masks, role_ids)
+
+    def user_scope_mask(self, role_ids):
+        """Маска разрешений пользователя с областью «все объекты»"""
+        return self._union(self.role_scope_masks, role_ids)
+
+    def grants_of(self, mask):
+        """Возвращает словарь ресурс -> список действий, разрешенных маской"""
+        resource_names = list(self.resource_ids)
+        action_names = list(self.action_ids)
+        grants = {}
+        for (resource_id, action_id), bit in self.pair_bits.items():
+            if mask >> bit & 1:
+                grants.setdefault(resource_names[resource_id], []).append(
+                    action_names[action_id])
+        return grants
+
+    def layout_id(self):
+        """
+        Отпечаток раскладки битов. Маска, выданная одной политикой,
+        читается другой только при совпадении отпечатков: воркеры
+        нумеруют пары в порядке загрузки и применения изменений.
+        """
+        if self._layout_id is None:
+            resource_names = list(self.resource_ids)
+            action_names = list(self.action_ids)
+            digest = hashlib.blake2b(digest_size=8)
+            for (resource_id, action_id), bit in self.pair_bits.items():
+                digest.update(f'{bit}\0{resource_names[resource_id]}\0'
+                              f'{action_names[action_id]}\n'.encode())
+            self._layout_id = digest.hexdigest()
+        return self._layout_id
+
+    def _matching(self, table, patterns, name):
+        ids = [table[pattern] for pattern in patterns.match(name)]
+        index = table.get(name)
+        if index is not None:
+            ids.append(index)
+        return ids
+
+    def match_mask(self, resource_name, action_name):
+        """Маска всех пар, точных и шаблонных, подходящих под имена"""
+        mask = 0
+        action_ids = self._matching(self.action_ids, self.action_patterns,
+                                    action_name)
+        if not action_ids:
+            return mask
+        for resource_id in self._matching(
+                self.resource_ids, self.resource_patterns, resource_name):
+            for action_id in action_ids:
+                bit = self.pair_bits.get((resource_id, action_id))
+                if bit is not None:
+                    mask |= 1 << bit
+        return mask
+
+    def allows(self, mask, resource_name, action_name):
+        """Проверяет, разрешена ли пара (ресурс, действие) маской"""
+        return bool(mask & self.match_mask(resource_name, action_name))
+
+
+_policy = None
+_policy_generation = None
+_lock = threading.RLock()
+
+
+def _replay(policy, changes):
+    """Применяет изменения к копии политики; None, если это невозможно"""
+    policy = policy.copy()
+    for change in changes:
+        if not policy.apply(change):
+            return None
+    return policy
+
+
+def get_policy():
+    """
+    Возвращает актуальную политику текущего воркера.
+    Если со времени загрузки записано немного изменений, они
+    применяются к копии из общего журнала, иначе политика
+    перестраивается из базы. Новая политика подменяет старую целиком.
+    """
+    global _policy, _policy_generation
+    generation = get_generation(POLICY_GENERATION)
+    policy = _policy
+    if policy is not None and generation == _policy_generation:
+        return policy
+    with _lock:
+        policy, current = _policy, _policy_generation
+        if policy is not None and generation == current:
+            return policy
+        updated = None
+        if policy is not None and 0 < generation - current <= CHANGE_LOG_SIZE:
+            changes = get_changes(POLICY_GENERATION, current, generation)
+            if changes is not None:
+                updated = _replay(policy, changes)
+        if updated is None:
+            updated = CompiledPolicy.load()
+        _policy, _policy_generation = updated, generation
+        return updated
+
+
+async def aget_policy():
+    """
+    Асинхронный вариант get_policy: актуальная политика возвращается
+    без перехода в поток, загрузка и применение журнала - в потоке
+    """
+    generation = await aget_generation(POLICY_GENERATION)
+    policy = _policy
+    if policy is not None and generation == _policy_generation:
+        return policy
+    return await sync_to_async(get_policy)()
+
+
+def invalidate_policy():
+    """
+    Помечает политику устаревшей во всех воркерах, например после
+    bulk_create: без записи в журнале изменений политика перестраивается
+    """
+    transaction.on_commit(lambda: bump_generation(POLICY_GENERATION))
+
+
+def apply_change(*change):
+    """
+    Записывает изменение политики в общий журнал после коммита
+    транзакции; все воркеры, включая текущий, применяют его при
+    следующем чтении политики. Каждый номер журнала занимается через
+    add, поэтому два изменения с одинаковым номером от неатомарного
+    incr не затирают друг друга.
+    """
+    def apply():
+        # Номер, уже занятый другим изменением, не перезаписывается:
+        # изменение берет следующий номер
+        for _ in range(CHANGE_RECORD_ATTEMPTS):
+            generation = bump_generation(POLICY_GENERATION)
+            if record_change(POLICY_GENERATION, generation, change,
+                             CHANGE_LOG_TIMEOUT):
+                return
+        # Свободный номер не найден: воркеры перестроят политику целиком
+        record_change(POLICY_GENERATION, bump_generation(POLICY_GENERATION),
+                      RELOAD, CHANGE_LOG_TIMEOUT, replace=True)
+
+    transaction.on_commit(apply)
@@ -0,0 +1,41 @@
+import math
+import time
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу, values - отсортированный список"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[rank]
+
+
+def summarize_latencies(latencies, elapsed):
+    """Сводка пропускной способности и задержек в миллисекундах"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+class QueryRecorder:
+    """
+    Считает SQL-запросы и суммарное время их выполнения.
+    Подключается через connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
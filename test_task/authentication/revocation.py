@@ -0,0 +1,161 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import aget_generation, bump_generation, get_generation
+from .conf import rbac_setting
+from .models import RevokedToken
+
+REVOCATIONS_GENERATION = 'revocations'
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray с двойным хешированием"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(
+            int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & 1 << (position & 7)
+                   for position in self._positions(key))
+
+
+class RevocationStore:
+    """
+    Хранилище отозванных JTI.
+    Проверка идет по фильтру Блума в памяти воркера; в таблицу
+    RevokedToken обращаемся только при положительном ответе фильтра.
+    Новые записи других воркеров подгружаются инкрементально
+    при смене общего счетчика поколений.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._generation = None
+        self._last_id = 0
+        self._built_at = 0.0
+        self._revoked_since_compaction = 0
+
+    def _new_bloom(self, rows):
+        # Запас вдвое от числа записей, чтобы фильтр не перестраивался
+        # при каждой синхронизации, когда записей больше емкости
+        capacity = max(rbac_setting('REVOCATION_BLOOM_CAPACITY'), 2 * rows)
+        return BloomFilter(capacity,
+                           rbac_setting('REVOCATION_BLOOM_ERROR_RATE'))
+
+    def _needs_sync(self, generation):
+        return self._bloom is None or generation != self._generation
+
+    def _sync(self, generation):
+        with self._lock:
+            if not self._needs_sync(generation):
+                return
+            rebuild = (
+                self._bloom is None
+                or self._bloom.count >= self._bloom.capacity
+                or time.monotonic() - self._built_at
+                > rbac_setting('REVOCATION_REBUILD_INTERVAL')
+            )
+            if rebuild:
+                rows = RevokedToken.objects.filter(
+                    expires_at__gt=django_timezone.now())
+                bloom = self._new_bloom(rows.count())
+                last_id = 0
+            else:
+                bloom = self._bloom
+                rows = RevokedToken.objects.filter(id__gt=self._last_id)
+                last_id = self._last_id
+            for pk, jti in rows.values_list('id', 'jti').iterator():
+                bloom.add(jti)
+                last_id = max(last_id, pk)
+            self._bloom = bloom
+            self._last_id = last_id
+            self._generation = generation
+            if rebuild:
+                self._built_at = time.monotonic()
+
+    def _might_be_revoked(self, jti, generation):
+        # Фильтр подменяется целиком, поэтому читаем одну ссылку
+        bloom = self._bloom
+        return (bloom is None or generation != self._generation
+                or jti in bloom)
+
+    def is_revoked(self, jti):
+        """Проверяет, отозван ли токен с указанным JTI"""
+        generation = get_generation(REVOCATIONS_GENERATION)
+        if not self._might_be_revoked(jti, generation):
+            return False
+        self._sync(generation)
+        if jti not in self._bloom:
+            return False
+        return RevokedToken.objects.filter(
+            jti=jti, expires_at__gt=django_timezone.now()).exists()
+
+    async def ais_revoked(self, jti):
+        """Асинхронная проверка; в поток уходят только обращения к базе"""
+        generation = await aget_generation(REVOCATIONS_GENERATION)
+        if not self._might_be_revoked(jti, generation):
+            return False
+        return await sync_to_async(self.is_revoked)(jti)
+
+    def revoke(self, jti, expires_at):
+        """Отзывает токен до момента expires_at"""
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)],
+            ignore_conflicts=True)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._revoked_since_compaction += 1
+            compact = (self._revoked_since_compaction
+                       >= rbac_setting('REVOCATION_COMPACT_EVERY'))
+            if compact:
+                self._revoked_since_compaction = 0
+        bump_generation(REVOCATIONS_GENERATION)
+        if compact:
+            self.compact()
+
+    def revoke_token(self, token):
+        """Отзывает провалидированный токен SimpleJWT"""
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti is None:
+            return
+        expires_at = datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+        self.revoke(jti, expires_at)
+
+    def compact(self):
+        """Удаляет записи о токенах, срок действия которых истек"""
+        deleted, _ = RevokedToken.objects.filter(
+            expires_at__lte=django_timezone.now()).delete()
+        with self._lock:
+            # Следующая проверка перестроит фильтр без истекших записей;
+            # до этого читатели пользуются прежним фильтром
+            self._generation = None
+            self._built_at = 0.0
+        return deleted
+
+
+store = RevocationStore()
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+
+from .audit import log as audit_log
+from .effective import schedule_refresh
+from .models import Role, UserRole
+from .signals import invalidate_permissions
+from .utils import CHUNK_SIZE, chunks
+from .versions import bump_table_versions
+
+User = get_user_model()
+
+
+def _existing_ids(model, ids):
+    found = set()
+    for chunk in chunks(ids):
+        found.update(model.objects.filter(
+            pk__in=chunk).values_list('pk', flat=True))
+    return found
+
+
+def _existing_assignments(pairs):
+    """Возвращает словарь (user_id, role_id) -> id для существующих связей"""
+    wanted = set(pairs)
+    role_ids = {role_id for _, role_id in wanted}
+    existing = {}
+    for chunk in chunks({user_id for user_id, _ in wanted}):
+        rows = UserRole.objects.filter(
+            user_id__in=chunk, role_id__in=role_ids
+        ).values_list('id', 'user_id', 'role_id')
+        for pk, user_id, role_id in rows:
+            if (user_id, role_id) in wanted:
+                existing[(user_id, role_id)] = pk
+    return existing
+
+
+def _create_assignments(to_create):
+    """
+    Создает связи и возвращает пары, которые уже успели создать
+    параллельные запросы: такие пары пропускаются, а не считаются
+    созданными
+    """
+    conflicts = set()
+    while to_create:
+        try:
+            with transaction.atomic():
+                UserRole.objects.bulk_create(
+                    to_create.values(), batch_size=CHUNK_SIZE)
+            break
+        except IntegrityError:
+            found = _existing_assignments(list(to_create))
+            if not found:
+                raise
+            for pair in found:
+                del to_create[pair]
+            conflicts.update(found)
+    return conflicts
+
+
+def assign_roles(pairs, assigned_by):
+    """
+    Назначает роли по списку пар (user_id, role_id) в одной транзакции.
+    Возвращает статус для каждой пары.
+    """
+    user_ids = _existing_ids(User, {user_id for user_id, _ in pairs})
+    role_ids = _existing_ids(Role, {role_id for _, role_id in pairs})
+    with transaction.atomic():
+        existing = _existing_assignments(pairs)
+        outcomes = []
+        to_create = {}
+        for pair in pairs:
+            user_id, role_id = pair
+            if user_id not in user_ids:
+                outcomes.append('user_not_found')
+            elif role_id not in role_ids:
+                outcomes.append('role_not_found')
+            elif pair in existing or pair in to_create:
+                outcomes.append('exists')
+            else:
+                to_create[pair] = UserRole(
+                    user_id=user_id, role_id=role_id, assigned_by=assigned_by)
+                outcomes.append('created')
+        conflicts = _create_assignments(to_create)
+        if conflicts:
+            outcomes = [
+                'exists' if outcome == 'created' and pair in conflicts
+                else outcome for pair, outcome in zip(pairs, outcomes)]
+        if to_create:
+            schedule_refresh({user_id for user_id, _ in to_create})
+            invalidate_permissions()
+            bump_table_versions(UserRole)
+            audit_log.record_role_changes(list(to_create), True, assigned_by)
+    return outcomes
+
+
+def _delete_assignments(pks):
+    """
+    Удаляет связи одним DELETE на порцию, минуя сбор объектов и сигналы
+    pre_delete/post_delete: на UserRole нет внешних ключей, а кэши
+    и действующие разрешения обновляет вызывающий код один раз
+    """
+    meta = UserRole._meta
+    table = connection.ops.quote_name(meta.db_table)
+    column = connection.ops.quote_name(meta.pk.column)
+    with connection.cursor() as cursor:
+        for chunk in chunks(pks):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {column} IN ({placeholders})',
+                chunk)
+
+
+def remove_roles(pairs, removed_by=None):
+    """
+    Снимает роли по списку пар (user_id, role_id) в одной транзакции.
+    Связи удаляются пакетно без поштучных сигналов, после чего кэши
+    решений, версия таблицы и действующие разрешения затронутых
+    пользователей обновляются один раз.
+    Возвращает статус для каждой пары.
+    """
+    with transaction.atomic():
+        existing = _existing_assignments(pairs)
+        removed = set()
+        outcomes = []
+        for pair in pairs:
+            if pair in existing and pair not in removed:
+                removed.add(pair)
+                outcomes.append('removed')
+            else:
+                outcomes.append('not_found')
+        if removed:
+            _delete_assignments([existing[pair] for pair in removed])
+            schedule_refresh({user_id for user_id, _ in removed})
+            invalidate_permissions()
+            bump_table_versions(UserRole)
+            audit_log.record_role_changes(list(removed), False, removed_by)
+    return outcomes
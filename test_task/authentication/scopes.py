@@ -0,0 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+
+from .permissions import user_role_ids, view_action_name
+from .policy import get_policy
+
+# Условие, не совпадающее ни с одной строкой: Django не выполняет запрос
+NOTHING = Q(pk__in=[])
+# Действия, для которых администратор видит все строки без разрешения
+# с областью «все объекты»
+STAFF_ACTIONS = frozenset({'read'})
+
+
+def scope_filter(user, resource_name, action_name, owner_field):
+    """
+    Компилирует права пользователя на действие в Q-выражение по строкам.
+    Роли с разрешением области «все объекты» на это действие получают
+    все строки, администратор - все строки только для чтения, остальные -
+    только свои (по полю owner_field).
+    """
+    if not user or not user.is_authenticated or not user.is_active:
+        return NOTHING
+    if user.is_staff and action_name in STAFF_ACTIONS:
+        return Q()
+    policy = get_policy()
+    scope_mask = policy.user_scope_mask(user_role_ids(user))
+    if scope_mask and policy.allows(scope_mask, resource_name, action_name):
+        return Q()
+    return Q(**{owner_field: user})
+
+
+ascope_filter = sync_to_async(scope_filter)
+
+
+class ScopedQuerysetMixin:
+    """
+    Фильтрует queryset ViewSet по области разрешений в SQL: списки,
+    изменение и удаление не загружают строки, недоступные пользователю.
+    Действие RBAC берется из get_action_name() представления.
+    """
+    owner_field = 'author'
+
+    def filter_by_scope(self, queryset):
+        return queryset.filter(scope_filter(
+            self.request.user, self.resource_name, view_action_name(self),
+            self.owner_field))
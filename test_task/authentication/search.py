@@ -0,0 +1,62 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Lookup, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post, PostSearch
+
+TERM_RE = re.compile(r'\w+')
+
+
+class Match(Lookup):
+    """Условие MATCH по колонке таблицы FTS5"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+PostSearch._meta.get_field('text').register_lookup(Match)
+
+
+def search_terms(query):
+    """Выделяет из строки поиска слова без операторов"""
+    return TERM_RE.findall(query)
+
+
+def search_posts(queryset, query):
+    """
+    Оставляет в queryset посты, подходящие под запрос, и добавляет
+    аннотацию search_rank: чем меньше значение, тем выше релевантность.
+    SQLite использует таблицу FTS5 и bm25, PostgreSQL - колонку
+    search_vector с GIN-индексом. На других СУБД используется icontains.
+    """
+    terms = search_terms(query)
+    if not terms:
+        # Аннотация нужна и пустому результату: по ней упорядочивает
+        # keyset-пагинация поиска
+        return queryset.none().annotate(
+            search_rank=Value(0.0, FloatField()))
+    post_table = Post._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Каждое слово в кавычках, чтобы ввод не разбирался
+        # как синтаксис запросов FTS5
+        match = ' '.join(f'"{term}"' for term in terms)
+        return queryset.filter(search_entry__text__match=match).annotate(
+            search_rank=F('search_entry__rank'))
+    if vendor == 'postgresql':
+        tsquery = "plainto_tsquery('russian', %s)"
+        text = ' '.join(terms)
+        return queryset.filter(RawSQL(
+            f'{post_table}.search_vector @@ {tsquery}', (text,),
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            f'-ts_rank({post_table}.search_vector, {tsquery})', (text,),
+            output_field=FloatField()))
+    for term in terms:
+        queryset = queryset.filter(text__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0, FloatField()))
@@ -1,11 +1,29 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from djoser import serializers as djoser_serializers
+from djoser.conf import settings as djoser_settings
 from rest_framework import serializers
 
 from . import models
+from .conf import rbac_setting
+from .hashing import service as hashing_service
 
 User = get_user_model()
 
 
+def build_user(validated_data):
+    """
+    Создает несохраненного пользователя, как UserManager.create_user,
+    но хеширует пароль в пуле сервиса хеширования
+    """
+    password = validated_data.pop('password')
+    user = User(**validated_data)
+    user.email = User.objects.normalize_email(user.email)
+    user.username = User.normalize_username(user.username)
+    user.password = hashing_service.make_password(password)
+    return user
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания пользователя"""
     password = serializers.CharField(write_only=True)
@@ -23,13 +41,29 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
+        user = build_user(validated_data)
+        user.save()
+        return user
+
+
+class UserCreatePasswordRetypeSerializer(
+        djoser_serializers.UserCreatePasswordRetypeSerializer):
+    """Регистрация djoser с хешированием пароля в пуле процессов"""
+
+    def perform_create(self, validated_data):
+        user = build_user(validated_data)
+        if djoser_settings.SEND_ACTIVATION_EMAIL:
+            user.is_active = False
+        with transaction.atomic():
+            user.save()
         return user
 
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения пользователя"""
     full_name = serializers.SerializerMethodField()
+    # Поля, которые читает get_full_name, для быстрого режима списков
+    method_sources = {'full_name': ('last_name', 'first_name', 'middle_name')}
 
     class Meta:
         model = User
@@ -111,3 +145,66 @@ class UserRoleSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.UserRole
         fields = '__all__'
+
+
+class PermissionCheckSerializer(serializers.Serializer):
+    """Сериализатор пакетной проверки разрешений"""
+    pairs = serializers.JSONField()
+    user_id = serializers.IntegerField(required=False)
+
+    def validate_pairs(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Ожидается список пар")
+        limit = rbac_setting('PERMISSION_CHECK_MAX_PAIRS')
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"Не больше {limit} пар в одном запросе")
+        pairs = []
+        for item in value:
+            if isinstance(item, dict):
+                item = (item.get('resource'), item.get('action'))
+            if (not isinstance(item, (list, tuple)) or len(item) != 2
+                    or not all(isinstance(name, str) for name in item)):
+                raise serializers.ValidationError(
+                    "Пара должна содержать строки resource и action")
+            pairs.append(tuple(item))
+        return pairs
+
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    """Сериализатор записей журнала аудита"""
+
+    class Meta:
+        model = models.AuditEntry
+        fields = '__all__'
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    """Фильтры запроса к журналу аудита"""
+    user_id = serializers.IntegerField(required=False)
+    actor_id = serializers.IntegerField(required=False)
+    event = serializers.ChoiceField(choices=models.AUDIT_EVENTS,
+                                    required=False)
+    resource = serializers.CharField(required=False)
+    action = serializers.CharField(required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+
+class RoleAssignmentBulkSerializer(serializers.Serializer):
+    """Сериализатор пакетного назначения и снятия ролей"""
+    pairs = serializers.JSONField()
+
+    def validate_pairs(self, value):
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError("Ожидается непустой список пар")
+        pairs = []
+        for item in value:
+            if isinstance(item, dict):
+                item = (item.get('user_id'), item.get('role_id'))
+            if (not isinstance(item, (list, tuple)) or len(item) != 2
+                    or not all(type(pk) is int for pk in item)):
+                raise serializers.ValidationError(
+                    "Пара должна содержать целые user_id и role_id")
+            pairs.append(tuple(item))
+        return pairs
@@ -0,0 +1,173 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+
+from .authentication import invalidate_user
+from .cache import PERMISSIONS_GENERATION, bump_generation
+from .effective import roles_granting, schedule_refresh, users_of_roles
+from .hierarchy import check_cycle, schedule_closure_update
+from .models import (Action, Permission, Post, Resource, Role, RoleParent,
+                     UserRole)
+from .policy import apply_change
+from .utils import on_commit_batch
+from .versions import bump_table_versions
+
+
+def invalidate_permissions():
+    """Сбрасывает кэши решений о доступе во всех воркерах"""
+    bump_generation(PERMISSIONS_GENERATION)
+    # Повторный сброс после коммита не дает другим воркерам закэшировать
+    # решение, прочитанное до фиксации транзакции
+    on_commit_batch('permissions_generation', {PERMISSIONS_GENERATION},
+                    lambda names: bump_generation(PERMISSIONS_GENERATION))
+
+
+def _on_rbac_change(sender, **kwargs):
+    invalidate_permissions()
+
+
+for _model in (UserRole, Permission, Role, RoleParent, Resource, Action):
+    post_save.connect(_on_rbac_change, sender=_model,
+                      dispatch_uid=f'rbac_invalidate_save_{_model.__name__}')
+    post_delete.connect(
+        _on_rbac_change, sender=_model,
+        dispatch_uid=f'rbac_invalidate_delete_{_model.__name__}')
+
+
+def _on_permission_save(sender, instance, **kwargs):
+    apply_change('permission_saved', instance.pk, instance.role_id,
+                 instance.resource_id, instance.action_id, instance.scope)
+
+
+def _on_permission_delete(sender, instance, **kwargs):
+    apply_change('permission_deleted', instance.pk)
+
+
+def _on_role_delete(sender, instance, **kwargs):
+    apply_change('role_deleted', instance.pk)
+
+
+def _on_resource_save(sender, instance, **kwargs):
+    apply_change('resource_saved', instance.pk, instance.name)
+
+
+def _on_action_save(sender, instance, **kwargs):
+    apply_change('action_saved', instance.pk, instance.name)
+
+
+post_save.connect(_on_permission_save, sender=Permission,
+                  dispatch_uid='policy_permission_save')
+post_delete.connect(_on_permission_delete, sender=Permission,
+                    dispatch_uid='policy_permission_delete')
+post_delete.connect(_on_role_delete, sender=Role,
+                    dispatch_uid='policy_role_delete')
+post_save.connect(_on_resource_save, sender=Resource,
+                  dispatch_uid='policy_resource_save')
+post_save.connect(_on_action_save, sender=Action,
+                  dispatch_uid='policy_action_save')
+
+
+def _remember_previous(sender, instance, **kwargs):
+    """Запоминает прежние значения полей, влияющих на разрешения"""
+    instance._rbac_previous = None
+    if instance.pk is not None:
+        fields = _TRACKED_FIELDS[sender]
+        instance._rbac_previous = sender.objects.filter(
+            pk=instance.pk).values(*fields).first()
+
+
+def _on_user_role_save(sender, instance, **kwargs):
+    user_ids = {instance.user_id}
+    if instance._rbac_previous:
+        user_ids.add(instance._rbac_previous['user_id'])
+    schedule_refresh(user_ids)
+
+
+def _on_user_role_delete(sender, instance, **kwargs):
+    schedule_refresh({instance.user_id})
+
+
+def _on_permission_granted(sender, instance, **kwargs):
+    role_ids = {instance.role_id}
+    if instance._rbac_previous:
+        role_ids.add(instance._rbac_previous['role_id'])
+    schedule_refresh(users_of_roles(role_ids))
+
+
+def _on_permission_revoked(sender, instance, **kwargs):
+    schedule_refresh(users_of_roles({instance.role_id}))
+
+
+def _on_name_change(sender, instance, **kwargs):
+    previous = instance._rbac_previous
+    if previous and previous['name'] != instance.name:
+        field = 'resource' if sender is Resource else 'action'
+        schedule_refresh(users_of_roles(roles_granting(**{field: instance})))
+
+
+_TRACKED_FIELDS = {
+    UserRole: ('user_id',),
+    Permission: ('role_id',),
+    RoleParent: ('role_id',),
+    Resource: ('name',),
+    Action: ('name',),
+}
+
+for _model in _TRACKED_FIELDS:
+    pre_save.connect(_remember_previous, sender=_model,
+                     dispatch_uid=f'effective_previous_{_model.__name__}')
+
+post_save.connect(_on_user_role_save, sender=UserRole,
+                  dispatch_uid='effective_user_role_save')
+pre_delete.connect(_on_user_role_delete, sender=UserRole,
+                   dispatch_uid='effective_user_role_delete')
+post_save.connect(_on_permission_granted, sender=Permission,
+                  dispatch_uid='effective_permission_save')
+pre_delete.connect(_on_permission_revoked, sender=Permission,
+                   dispatch_uid='effective_permission_delete')
+post_save.connect(_on_name_change, sender=Resource,
+                  dispatch_uid='effective_resource_save')
+post_save.connect(_on_name_change, sender=Action,
+                  dispatch_uid='effective_action_save')
+
+
+def _check_role_parent(sender, instance, **kwargs):
+    check_cycle(instance.role_id, instance.parent_id)
+
+
+def _on_role_parent_change(sender, instance, **kwargs):
+    role_ids = {instance.role_id}
+    previous = getattr(instance, '_rbac_previous', None)
+    if previous:
+        role_ids.add(previous['role_id'])
+    schedule_closure_update(role_ids)
+
+
+pre_save.connect(_check_role_parent, sender=RoleParent,
+                 dispatch_uid='hierarchy_check_cycle')
+post_save.connect(_on_role_parent_change, sender=RoleParent,
+                  dispatch_uid='hierarchy_role_parent_save')
+post_delete.connect(_on_role_parent_change, sender=RoleParent,
+                    dispatch_uid='hierarchy_role_parent_delete')
+
+
+def _on_user_change(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+post_save.connect(_on_user_change, sender=get_user_model(),
+                  dispatch_uid='user_cache_save')
+post_delete.connect(_on_user_change, sender=get_user_model(),
+                    dispatch_uid='user_cache_delete')
+
+
+def _on_table_change(sender, **kwargs):
+    bump_table_versions(sender)
+
+
+for _model in (Post, Resource, Action, Role, RoleParent, Permission, UserRole,
+               get_user_model()):
+    post_save.connect(_on_table_change, sender=_model,
+                      dispatch_uid=f'table_version_save_{_model.__name__}')
+    post_delete.connect(_on_table_change, sender=_model,
+                        dispatch_uid=f'table_version_delete_{_model.__name__}')
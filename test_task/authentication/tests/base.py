@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# Отдельный кэш процесса, чтобы счетчики поколений и кэш ответов
+# не пересекались с общим кэшем разработки
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'authentication-tests',
+    },
+}
+
+# Быстрый хешер для пользователей с паролем
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+# Действующие разрешения пересчитываются сразу после коммита: фоновый
+# поток не видит данных, созданных в транзакции теста. Журнал аудита
+# выключен: его поток пишет в базу вне транзакции теста
+TEST_RBAC = {'EFFECTIVE_REFRESH_BACKGROUND': False, 'AUDIT_ENABLED': False}
+
+
+def rbac_settings(**overrides):
+    """override_settings для отдельных ключей словаря RBAC"""
+    return override_settings(RBAC={**getattr(settings, 'RBAC', {}),
+                                   **TEST_RBAC, **overrides})
+
+
+def make_user(name, **fields):
+    """Создает пользователя name@example.com без пароля"""
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name='Test', password=None, **fields)
+
+
+def client_for(user):
+    """APIClient с access-токеном пользователя"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(
+        RefreshToken.for_user(user).access_token))
+    return client
+
+
+@override_settings(CACHES=TEST_CACHES)
+@rbac_settings()
+class RBACTestCase(TestCase):
+    """
+    Тест с данными RBAC. Общий кэш очищается перед каждым тестом:
+    политика, решения и пользователи, закэшированные в предыдущих
+    тестах, относятся к откаченным данным.
+    Данные, чьи обработчики коммита (журнал политики, пересчет
+    действующих разрешений) важны для теста, создаются внутри
+    captureOnCommitCallbacks(execute=True).
+    """
+
+    def setUp(self):
+        cache.clear()
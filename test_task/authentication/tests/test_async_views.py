@@ -0,0 +1,43 @@
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import reverse
+
+from .base import FAST_HASHERS, TEST_CACHES, User, rbac_settings
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AsyncTokenObtainTests(TestCase):
+    """Ошибки разбора тела асинхронного входа возвращаются как 4xx"""
+
+    async def test_malformed_json(self):
+        response = await self.async_client.post(
+            reverse('async-jwt-create'), '{bad',
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.json())
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+@rbac_settings(HASH_WORKERS=0)
+class AsyncCsrfTests(TestCase):
+    """Асинхронный вход работает для клиентов без CSRF-cookie"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(
+            email='csrf@example.com', username='csrf', first_name='Csrf',
+            last_name='Test', password='secret-password')
+
+    credentials = {'email': 'csrf@example.com', 'password': 'secret-password'}
+
+    def test_sync_login_without_csrf_cookie(self):
+        response = Client(enforce_csrf_checks=True).post(
+            reverse('jwt_create'), self.credentials,
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_login_without_csrf_cookie(self):
+        response = await AsyncClient(enforce_csrf_checks=True).post(
+            reverse('async-jwt-create'), self.credentials,
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
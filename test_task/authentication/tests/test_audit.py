@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+
+from ..audit import AuditLog
+from ..audit import log as global_log
+from ..metrics import MetricsRegistry
+from ..models import AUDIT_ALLOW, AUDIT_DENY, AUDIT_ROLE_ASSIGNED, AuditEntry
+from .base import TEST_CACHES, rbac_settings
+
+AUDIT = {'AUDIT_ENABLED': True, 'AUDIT_ALLOW_SAMPLE_RATE': 1.0,
+         'AUDIT_FLUSH_INTERVAL': 0.05}
+
+
+@override_settings(CACHES=TEST_CACHES)
+@rbac_settings(**AUDIT)
+class AuditLogTests(TransactionTestCase):
+    """
+    Журнал аудита: фоновый поток записывает очередь, переполнение
+    учитывается в счетчике, flush дожидается записи.
+    Поток писателя работает со своим соединением, поэтому тест
+    не оборачивается в транзакцию.
+    """
+
+    def setUp(self):
+        # События общего журнала из тестов с настройками проекта
+        # записываются его потоком в обход транзакций
+        global_log.flush(5)
+        AuditEntry.objects.all().delete()
+        self.log = AuditLog()
+        self.registry = MetricsRegistry()
+        patcher = mock.patch('authentication.audit.registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def counter(self, name):
+        return self.registry._merge()[1].get(name, 0)
+
+    def block_writer(self):
+        """Останавливает поток писателя внутри _write до release.set()"""
+        started, release = threading.Event(), threading.Event()
+        write = self.log._write
+
+        def blocked(entries):
+            started.set()
+            release.wait(5)
+            write(entries)
+
+        self.log._write = blocked
+        # Очистка таблиц после теста не должна пересечься с записью
+        self.addCleanup(self.log.flush, 5)
+        self.addCleanup(release.set)
+        return started, release
+
+    def test_entries_are_written(self):
+        self.log.record_decision(1, 'posts', 'read', True)
+        self.log.record_decision(2, 'posts', 'delete', False)
+        self.log.record_role_changes([(1, 10), (2, 10)], True, actor=3)
+        self.log.flush(5)
+        self.assertEqual(
+            sorted(AuditEntry.objects.values_list(
+                'event', 'user_id', 'role_id', 'actor_id', 'resource_name',
+                'action_name')),
+            sorted([(AUDIT_ALLOW, 1, None, None, 'posts', 'read'),
+                    (AUDIT_DENY, 2, None, None, 'posts', 'delete'),
+                    (AUDIT_ROLE_ASSIGNED, 1, 10, 3, '', ''),
+                    (AUDIT_ROLE_ASSIGNED, 2, 10, 3, '', '')]))
+        self.assertEqual(self.counter('audit_written_total'), 4)
+        self.assertEqual(self.log.depth(), 0)
+
+    @rbac_settings(AUDIT_ENABLED=False)
+    def test_disabled(self):
+        self.log.record_decision(1, 'posts', 'read', False)
+        self.log.record_role_changes([(1, 10)], True)
+        self.assertIsNone(self.log._queue)
+        self.assertFalse(AuditEntry.objects.exists())
+
+    @rbac_settings(**AUDIT, AUDIT_QUEUE_SIZE=2, AUDIT_BATCH_SIZE=1)
+    def test_full_queue_drops_entries(self):
+        started, release = self.block_writer()
+        self.log.record_decision(1, 'posts', 'read', False)
+        self.assertTrue(started.wait(5))
+        # Писатель занят первым событием: в очередь помещаются два
+        for user_id in range(2, 7):
+            self.log.record_decision(user_id, 'posts', 'read', False)
+        self.assertEqual(self.log.depth(), 2)
+        self.assertEqual(self.counter('audit_dropped_total'), 3)
+        release.set()
+        self.log.flush(5)
+        self.assertEqual(
+            sorted(AuditEntry.objects.values_list('user_id', flat=True)),
+            [1, 2, 3])
+
+    @rbac_settings(**{**AUDIT, 'AUDIT_FLUSH_INTERVAL': 60})
+    def test_flush_writes_partial_batch(self):
+        # Пакет не заполнен и интервал не истек: при выходе процесса
+        # события записывает flush, зарегистрированный в atexit
+        self.log.record_decision(1, 'posts', 'read', False)
+        self.log.record_decision(2, 'posts', 'read', False)
+        begin = time.monotonic()
+        self.log.flush(5)
+        self.assertLess(time.monotonic() - begin, 5)
+        self.assertEqual(AuditEntry.objects.count(), 2)
+        self.log.record_decision(3, 'posts', 'read', False)
+        self.log.flush()
+        self.assertEqual(AuditEntry.objects.count(), 3)
+
+    def test_flush_timeout(self):
+        started, _ = self.block_writer()
+        self.log.record_decision(1, 'posts', 'read', False)
+        self.assertTrue(started.wait(5))
+        begin = time.monotonic()
+        self.log.flush(0.1)
+        self.assertLess(time.monotonic() - begin, 2)
+        self.assertFalse(AuditEntry.objects.exists())
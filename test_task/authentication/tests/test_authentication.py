@@ -0,0 +1,40 @@
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from ..authentication import CachedJWTAuthentication
+from .base import RBACTestCase, client_for, make_user
+
+
+class CachedUserTests(RBACTestCase):
+    """Изменение пользователя сбрасывает только его запись в кэше воркера"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('cached-user')
+        cls.other = make_user('cached-other')
+
+    def token(self, user):
+        return AccessToken(str(RefreshToken.for_user(user).access_token))
+
+    def test_deactivation_rejects_cached_token(self):
+        client = client_for(self.user)
+        for url in ('/api/users/me/', '/api/async/users/me/'):
+            self.assertEqual(client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        for url in ('/api/users/me/', '/api/async/users/me/'):
+            self.assertEqual(client.get(url).status_code, 401)
+
+    def test_change_keeps_other_users_cached(self):
+        authentication = CachedJWTAuthentication()
+        token = self.token(self.other)
+        authentication.get_user(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'renamed'
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.get_user(token).pk, self.other.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                authentication.get_user(self.token(self.user)).first_name,
+                'renamed')
@@ -0,0 +1,56 @@
+from ..models import (SCOPE_ALL, Action, Permission, Post, Resource, Role,
+                      UserRole)
+from .base import RBACTestCase, client_for, make_user
+
+
+class PostETagTests(RBACTestCase):
+    """
+    ETag списка постов меняется при переименовании ресурса или действия,
+    от которых зависит область разрешения пользователя
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            posts = Resource.objects.create(name='posts')
+            read = Action.objects.create(name='read')
+            cls.archive = Resource.objects.create(name='archive')
+            cls.browse = Action.objects.create(name='browse')
+            role = Role.objects.create(name='etag-role')
+            Permission.objects.create(role=role, resource=posts, action=read)
+            Permission.objects.create(role=role, resource=cls.archive,
+                                      action=read, scope=SCOPE_ALL)
+            Permission.objects.create(role=role, resource=posts,
+                                      action=cls.browse, scope=SCOPE_ALL)
+            cls.user = make_user('etag-user')
+            UserRole.objects.create(user=cls.user, role=role)
+            Post.objects.create(text='own post', author=cls.user)
+            Post.objects.create(text='other post',
+                                author=make_user('etag-other'))
+
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(self.user)
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/posts/', {'limit': 50}, **headers)
+
+    def assertRenameChangesETag(self, instance, name):
+        response = self.get()
+        self.assertEqual(len(response.json()['results']), 1)
+        etag = response['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.name = name
+            instance.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_resource_rename(self):
+        self.assertRenameChangesETag(self.archive, 'post*')
+
+    def test_action_rename(self):
+        self.assertRenameChangesETag(self.browse, '*')
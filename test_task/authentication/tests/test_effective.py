@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..effective import EffectiveRefresher, refresher
+from ..models import (Action, EffectivePermission, Permission, Resource, Role,
+                      UserRole)
+from ..permissions import HasResourcePermission
+from .base import RBACTestCase, make_user, rbac_settings
+
+
+class EffectivePermissionTests(RBACTestCase):
+    """
+    Решения принимаются по скомпилированной политике; таблица
+    действующих разрешений пересчитывается после коммита вне запроса
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.role = Role.objects.create(name='effective-role')
+            cls.permission = Permission.objects.create(
+                role=cls.role,
+                resource=Resource.objects.create(name='effective'),
+                action=Action.objects.create(name='read'))
+            cls.user = make_user('effective-user')
+            UserRole.objects.create(user=cls.user, role=cls.role)
+
+    def allowed(self, user):
+        return HasResourcePermission()._check_user_permission(
+            user, 'effective', 'read')
+
+    def test_stale_row_does_not_allow(self):
+        outsider = make_user('effective-outsider')
+        EffectivePermission.objects.create(
+            user=outsider, resource_name='effective', action_name='read')
+        self.assertFalse(self.allowed(outsider))
+
+    def test_revocation_denies_before_refresh(self):
+        self.assertTrue(self.allowed(self.user))
+        with mock.patch.object(refresher, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.permission.delete()
+        self.assertFalse(self.allowed(self.user))
+        submit.assert_called_once_with({self.user.pk})
+        # Пересчет еще не выполнен, но строка на решение не влияет
+        self.assertTrue(EffectivePermission.objects.filter(
+            user=self.user, resource_name='effective').exists())
+
+
+@rbac_settings(EFFECTIVE_REFRESH_BACKGROUND=True,
+               EFFECTIVE_REFRESH_BATCH_SIZE=2)
+class EffectiveRefresherTests(SimpleTestCase):
+    """Фоновый поток пересчитывает пользователей пакетами"""
+
+    def test_batches(self):
+        batches = []
+        background = EffectiveRefresher()
+        with mock.patch.object(background, '_refresh', batches.append):
+            background.submit(range(5))
+            background.submit({4, 5})
+            background.flush(timeout=5)
+        self.assertEqual(background.depth(), 0)
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+        self.assertEqual(set().union(*batches), set(range(6)))
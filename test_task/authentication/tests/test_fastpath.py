@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from ..models import Action, Permission, Post, Resource, Role, UserRole
+from ..serializers import PostSerializer
+from .base import RBACTestCase, client_for, make_user, rbac_settings
+
+
+class FastListTests(RBACTestCase):
+    """Быстрый список постов побайтно совпадает с выводом PostSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='fast-reader')
+            Permission.objects.create(
+                role=role, resource=Resource.objects.create(name='posts'),
+                action=Action.objects.create(name='read'))
+            cls.user = make_user('fast-reader', is_staff=True)
+            UserRole.objects.create(user=cls.user, role=role)
+            authors = [cls.user, make_user('fast-author')]
+            dates = [
+                datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+                datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                datetime(2023, 12, 31, 23, 59, 59, 1, tzinfo=timezone.utc),
+            ]
+            for i in range(6):
+                post = Post.objects.create(
+                    text=f'Пост №{i} "с кавычками" \\ и юникодом ✓',
+                    author=authors[i % 2])
+                # pub_date заполняется auto_now_add, задаем его отдельно
+                Post.objects.filter(pk=post.pk).update(
+                    pub_date=dates[i % len(dates)])
+
+    def fetch(self, params, fast):
+        with rbac_settings(FAST_LIST=fast):
+            response = client_for(self.user).get('/api/posts/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_matches_serializer(self):
+        for params in ({}, {'limit': 4}, {'limit': 4, 'offset': 2}):
+            with self.subTest(params=params):
+                fast = self.fetch(params, True)
+                slow = self.fetch(params, False)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_results_match_serializer_output(self):
+        results = self.fetch({'limit': 50}, True).json()['results']
+        posts = Post.objects.filter(
+            pk__in=[post['id'] for post in results]).select_related('author')
+        by_id = {post.pk: post for post in posts}
+        expected = PostSerializer(
+            [by_id[post['id']] for post in results], many=True).data
+        self.assertEqual(
+            JSONRenderer().render(results), JSONRenderer().render(expected))
+        self.assertEqual(results[0]['author'], self.user.email)
+        self.assertIn('.123456Z', ''.join(post['pub_date']
+                                          for post in results))
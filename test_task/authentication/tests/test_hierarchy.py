@@ -0,0 +1,86 @@
+from django.core.exceptions import ValidationError
+
+from ..hierarchy import rebuild_closure
+from ..models import (Action, Permission, Resource, Role, RoleAncestor,
+                      RoleParent, UserRole)
+from ..permissions import HasResourcePermission
+from .base import RBACTestCase, client_for, make_user
+
+
+class RoleHierarchyTests(RBACTestCase):
+    """
+    Иерархия ролей: циклы запрещены, замыкание обновляется
+    инкрементально и совпадает с полным перестроением
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.roles = {name: Role.objects.create(name=f'hierarchy-{name}')
+                         for name in 'abcde'}
+            Permission.objects.create(
+                role=cls.roles['a'],
+                resource=Resource.objects.create(name='hierarchy'),
+                action=Action.objects.create(name='read'))
+            cls.user = make_user('hierarchy-user')
+            UserRole.objects.create(user=cls.user, role=cls.roles['c'])
+            cls.admin = make_user('hierarchy-admin', is_staff=True)
+
+    def link(self, role, parent):
+        with self.captureOnCommitCallbacks(execute=True):
+            return RoleParent.objects.create(role=self.roles[role],
+                                             parent=self.roles[parent])
+
+    def closure(self):
+        names = {role.pk: name for name, role in self.roles.items()}
+        return {(names[role_id], names[ancestor_id])
+                for role_id, ancestor_id in RoleAncestor.objects.values_list(
+                    'role_id', 'ancestor_id')}
+
+    def allowed(self):
+        return HasResourcePermission()._check_user_permission(
+            self.user, 'hierarchy', 'read')
+
+    def test_direct_cycle(self):
+        self.link('b', 'a')
+        with self.assertRaises(ValidationError):
+            self.link('a', 'b')
+        with self.assertRaises(ValidationError):
+            self.link('a', 'a')
+        response = client_for(self.admin).post(
+            f'/api/roles/{self.roles["a"].pk}/parents/',
+            {'parent_id': self.roles['b'].pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.closure(), {('b', 'a')})
+
+    def test_indirect_cycle(self):
+        self.link('b', 'a')
+        self.link('c', 'b')
+        with self.assertRaises(ValidationError):
+            self.link('a', 'c')
+        self.assertEqual(self.closure(),
+                         {('b', 'a'), ('c', 'b'), ('c', 'a')})
+
+    def test_remove_parent(self):
+        self.assertFalse(self.allowed())
+        link = self.link('b', 'a')
+        self.link('c', 'b')
+        self.assertTrue(self.allowed())
+        with self.captureOnCommitCallbacks(execute=True):
+            link.delete()
+        self.assertEqual(self.closure(), {('c', 'b')})
+        self.assertFalse(self.allowed())
+
+    def test_rebuild_matches_incremental(self):
+        for role, parent in (('b', 'a'), ('c', 'b'), ('d', 'b'),
+                             ('d', 'e'), ('e', 'a')):
+            self.link(role, parent)
+        with self.captureOnCommitCallbacks(execute=True):
+            RoleParent.objects.get(role=self.roles['b']).delete()
+        incremental = self.closure()
+        self.assertEqual(incremental,
+                         {('c', 'b'), ('d', 'b'), ('d', 'e'), ('d', 'a'),
+                          ('e', 'a')})
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_closure()
+        self.assertEqual(self.closure(), incremental)
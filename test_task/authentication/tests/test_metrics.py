@@ -0,0 +1,49 @@
+import threading
+
+from django.test import SimpleTestCase, TestCase
+
+from ..metrics import MetricsRegistry
+from .base import make_user, rbac_settings
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    """Шарды завершившихся потоков сворачиваются без потери значений"""
+
+    def test_dead_thread_shards_are_reaped(self):
+        registry = MetricsRegistry()
+
+        def work():
+            registry.increment('jobs_total')
+            registry.observe('job_seconds', 0.5)
+
+        for _ in range(20):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        output = registry.render()
+        self.assertIn('jobs_total 20\n', output)
+        self.assertIn('job_seconds_count 20\n', output)
+        self.assertIn('job_seconds_sum 10.0\n', output)
+        self.assertEqual(registry._shards, [])
+
+
+@rbac_settings(METRICS_TOKEN='scrape-secret')
+class MetricsAccessTests(TestCase):
+    """/metrics доступен сборщику с токеном и администраторам"""
+
+    def test_anonymous_is_forbidden(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    def test_token(self):
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE', response.content)
+
+    def test_staff_session(self):
+        self.client.force_login(make_user('metrics-user'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(make_user('metrics-staff', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
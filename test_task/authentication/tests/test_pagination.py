@@ -0,0 +1,78 @@
+import base64
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+from ..models import Action, Permission, Post, Resource, Role, UserRole
+from .base import RBACTestCase, client_for, make_user
+
+
+def cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+class KeysetPaginationTests(RBACTestCase):
+    """Keyset-пагинация постов по (pub_date, id)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='keyset-reader')
+            Permission.objects.create(
+                role=role, resource=Resource.objects.create(name='posts'),
+                action=Action.objects.create(name='read'))
+            cls.user = make_user('keyset-reader', is_staff=True)
+            UserRole.objects.create(user=cls.user, role=role)
+            posts = [Post.objects.create(text=f'keyset {i}', author=cls.user)
+                     for i in range(8)]
+        # Пять постов с одинаковой датой: порядок задает только id
+        same = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        Post.objects.filter(pk__in=[post.pk for post in posts[:5]]).update(
+            pub_date=same)
+        for day, post in enumerate(posts[5:], start=2):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=datetime(2024, 5, day, tzinfo=timezone.utc))
+        cls.expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(self.user)
+
+    def get(self, **params):
+        return self.client.get('/api/posts/', params)
+
+    def test_pages_are_stable_for_equal_dates(self):
+        seen = []
+        params = {'cursor': '', 'limit': 3}
+        while True:
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('count', body)
+            seen.extend(post['id'] for post in body['results'])
+            if body['next'] is None:
+                break
+            query = parse_qs(urlparse(body['next']).query)
+            params = {'cursor': query['cursor'][0], 'limit': 3}
+        self.assertEqual(seen, self.expected)
+
+    def test_invalid_cursor(self):
+        valid = self.get(cursor='', limit=2).json()['next']
+        token = parse_qs(urlparse(valid).query)['cursor'][0]
+        for value in ('not-base64!', cursor('no-separator'),
+                      cursor('2024-05-01T12:00:00+00:00|abc'),
+                      cursor('yesterday|10'), token[:-4] + 'AAAA',
+                      base64.urlsafe_b64encode(b'\xff\xfe|1').decode()):
+            with self.subTest(cursor=value):
+                response = self.get(cursor=value)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['detail'],
+                                 'Неверный курсор')
+
+    def test_count_on_request(self):
+        body = self.get(cursor='', limit=3, count='true').json()
+        self.assertEqual(body['count'], len(self.expected))
+        self.assertEqual(len(body['results']), 3)
+        # Следующая страница не пересчитывает COUNT(*)
+        self.assertNotIn('count=', body['next'])
+        self.assertNotIn('count', self.get(cursor='', limit=3).json())
@@ -0,0 +1,130 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from ..models import (Action, EffectivePermission, Permission, Resource, Role,
+                      UserRole)
+from ..patterns import (PatternTrie, claims_allow, matches,
+                        validate_name_pattern)
+from ..permissions import HasResourcePermission
+from ..policy import CompiledPolicy
+from .base import RBACTestCase, make_user
+
+# Разрешения роли в виде пар (ресурс, действие), включая шаблоны
+GRANTS = (
+    ('posts.*', 'read'),
+    ('reports/*', '*'),
+    ('*', 'export'),
+    ('billing', 'pay*'),
+    ('audit', 'view'),
+)
+
+# Проверяемая пара и ожидаемое решение
+CASES = (
+    ('posts.comments', 'read', True),
+    ('posts.', 'read', True),
+    ('posts', 'read', False),
+    ('postsx', 'read', False),
+    ('posts.comments', 'update', False),
+    ('reports/daily', 'delete', True),
+    ('reports/', 'read', True),
+    ('reports', 'read', False),
+    ('anything', 'export', True),
+    ('', 'export', True),
+    ('anything', 'exports', False),
+    ('billing', 'pay', True),
+    ('billing', 'payout', True),
+    ('billing', 'pa', False),
+    ('billing.eu', 'pay', False),
+    ('audit', 'view', True),
+    ('audit', 'view*', False),
+    ('audit.log', 'view', False),
+    ('unknown', 'read', False),
+)
+
+VALID_NAMES = ('*', 'posts', 'posts.*', 'reports/*', 'a*')
+INVALID_NAMES = ('*posts', 'po*sts', '**', 'posts.*.read')
+
+
+class PatternTests(SimpleTestCase):
+    """Шаблоны имен одинаково работают в политике и в правах токена"""
+
+    def assertDecisions(self, check):
+        for resource_name, action_name, expected in CASES:
+            with self.subTest(resource=resource_name, action=action_name):
+                self.assertIs(check(resource_name, action_name), expected)
+
+    def test_validate_name_pattern(self):
+        for name in VALID_NAMES:
+            with self.subTest(name=name):
+                validate_name_pattern(name)
+        for name in INVALID_NAMES:
+            with self.subTest(name=name):
+                with self.assertRaises(ValidationError):
+                    validate_name_pattern(name)
+
+    def test_trie_matches_patterns(self):
+        patterns = ('*', 'p*', 'posts*', 'posts.*', 'q*')
+        trie = PatternTrie()
+        for pattern in patterns:
+            trie.add(pattern, pattern)
+        for name in ('posts.comments', 'posts', 'p', '', 'q', 'x'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    sorted(trie.match(name)),
+                    sorted(pattern for pattern in patterns
+                           if matches(pattern, name)))
+
+    def test_policy(self):
+        policy = CompiledPolicy()
+        for number, (resource_name, action_name) in enumerate(GRANTS):
+            policy.resource_names[number] = resource_name
+            policy.action_names[number] = action_name
+            policy._add_grant(number, 1, number, number)
+        mask = policy.user_mask([1])
+        self.assertDecisions(lambda resource_name, action_name: (
+            policy.allows(mask, resource_name, action_name)))
+        # Роль без разрешений не получает доступ через шаблоны
+        empty_mask = policy.user_mask([2])
+        for resource_name, action_name, _ in CASES:
+            with self.subTest(resource=resource_name, action=action_name):
+                self.assertFalse(
+                    policy.allows(empty_mask, resource_name, action_name))
+
+    def test_token_claims(self):
+        grants = {}
+        for resource_name, action_name in GRANTS:
+            grants.setdefault(resource_name, []).append(action_name)
+        self.assertDecisions(lambda resource_name, action_name: (
+            claims_allow(grants, resource_name, action_name)))
+
+
+class PermissionCheckPatternTests(RBACTestCase):
+    """
+    Шаблоны имен в проверке HasResourcePermission и в таблице
+    действующих разрешений после коммита
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.user = make_user('patterns')
+            role = Role.objects.create(name='patterns')
+            for resource_name, action_name in GRANTS:
+                Permission.objects.create(
+                    role=role,
+                    resource=Resource.objects.create(name=resource_name),
+                    action=Action.objects.create(name=action_name))
+            UserRole.objects.create(user=cls.user, role=role)
+
+    def test_query_user_permission(self):
+        permission = HasResourcePermission()
+        for resource_name, action_name, expected in CASES:
+            with self.subTest(resource=resource_name, action=action_name):
+                self.assertIs(permission._query_user_permission(
+                    self.user, resource_name, action_name), expected)
+
+    def test_effective_permissions(self):
+        self.assertEqual(
+            set(EffectivePermission.objects.filter(
+                user=self.user).values_list('resource_name', 'action_name')),
+            set(GRANTS))
@@ -0,0 +1,72 @@
+from ..models import Action, Permission, Resource, Role, UserRole
+from .base import RBACTestCase, client_for, make_user, rbac_settings
+
+URL = '/api/permissions/check/'
+
+
+class PermissionCheckTests(RBACTestCase):
+    """Пакетная проверка пар (ресурс, действие)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='check-role')
+            posts = Resource.objects.create(name='posts')
+            reports = Resource.objects.create(name='reports.*')
+            read = Action.objects.create(name='read')
+            Action.objects.create(name='delete')
+            Permission.objects.create(role=role, resource=posts, action=read)
+            Permission.objects.create(role=role, resource=reports,
+                                      action=read)
+            cls.user = make_user('check-user')
+            UserRole.objects.create(user=cls.user, role=role)
+            cls.other = make_user('check-other')
+            cls.admin = make_user('check-admin', is_staff=True)
+
+    def check(self, caller, pairs, **data):
+        return client_for(caller).post(URL, {'pairs': pairs, **data},
+                                       format='json')
+
+    def decisions(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item['allowed'] for item in response.json()['results']]
+
+    def test_mixed_decisions(self):
+        response = self.check(self.user, [
+            ['posts', 'read'], ['posts', 'delete'],
+            {'resource': 'reports.daily', 'action': 'read'},
+            ['reports', 'read']])
+        self.assertEqual(self.decisions(response),
+                         [True, False, True, False])
+        self.assertEqual(response.json()['results'][2],
+                         {'resource': 'reports.daily', 'action': 'read',
+                          'allowed': True})
+
+    def test_unknown_names_are_denied(self):
+        response = self.check(self.user, [
+            ['missing', 'read'], ['posts', 'missing'], ['', '']])
+        self.assertEqual(self.decisions(response), [False, False, False])
+
+    def test_other_user(self):
+        pairs = [['posts', 'read']]
+        self.assertEqual(self.check(self.other, pairs,
+                                    user_id=self.user.pk).status_code, 403)
+        self.assertEqual(self.decisions(
+            self.check(self.admin, pairs, user_id=self.user.pk)), [True])
+        self.assertEqual(self.decisions(
+            self.check(self.admin, pairs, user_id=self.other.pk)), [False])
+
+    def test_invalid_pairs(self):
+        for pairs in ('posts', [['posts']], [['posts', 1]]):
+            with self.subTest(pairs=pairs):
+                self.assertEqual(self.check(self.user, pairs).status_code,
+                                 400)
+
+    @rbac_settings(PERMISSION_CHECK_MAX_PAIRS=3)
+    def test_size_limit(self):
+        pairs = [['posts', 'read']] * 3
+        self.assertEqual(self.decisions(self.check(self.user, pairs)),
+                         [True] * 3)
+        response = self.check(self.user, pairs + [['posts', 'read']])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pairs', response.json())
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from .. import policy as policy_module
+from ..cache import bump_generation
+from ..models import Action, Permission, Resource, Role
+from ..policy import CompiledPolicy, get_policy
+from .base import RBACTestCase
+
+
+class PolicyJournalTests(RBACTestCase):
+    """Воркер, загрузивший политику раньше, применяет журнал изменений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.role = Role.objects.create(name='journal-role')
+            cls.resource = Resource.objects.create(name='journal')
+            cls.read = Action.objects.create(name='read')
+            cls.write = Action.objects.create(name='write')
+
+    def lagging_worker(self):
+        """Состояние воркера, который прочитал политику до изменений"""
+        return get_policy(), policy_module._policy_generation
+
+    def catch_up(self, worker, reload=False):
+        policy_module._policy, policy_module._policy_generation = worker
+        load = mock.patch.object(CompiledPolicy, 'load',
+                                 side_effect=CompiledPolicy.load)
+        with load as full_load:
+            policy = get_policy()
+        self.assertEqual(full_load.called, reload)
+        return policy
+
+    def allows(self, policy, action):
+        return policy.allows(policy.user_mask([self.role.pk]), 'journal',
+                             action.name)
+
+    def grant(self, action):
+        return Permission.objects.create(role=self.role,
+                                         resource=self.resource,
+                                         action=action)
+
+    def test_replays_grant_and_revoke(self):
+        worker = self.lagging_worker()
+        with self.captureOnCommitCallbacks(execute=True):
+            permission = self.grant(self.read)
+        self.assertTrue(self.allows(self.catch_up(worker), self.read))
+
+        worker = self.lagging_worker()
+        with self.captureOnCommitCallbacks(execute=True):
+            permission.delete()
+        self.assertFalse(self.allows(self.catch_up(worker), self.read))
+
+    def colliding_bump(self, collisions):
+        """
+        bump_generation, который первые collisions раз повторяет
+        предыдущий номер, как неатомарный incr при гонке воркеров
+        """
+        issued = []
+
+        def bump(name):
+            if issued and len(issued) <= collisions:
+                issued.append(issued[-1])
+            else:
+                issued.append(bump_generation(name))
+            return issued[-1]
+        return mock.patch.object(policy_module, 'bump_generation', bump)
+
+    def test_colliding_generation_keeps_both_changes(self):
+        worker = self.lagging_worker()
+        with self.colliding_bump(collisions=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.grant(self.read)
+                self.grant(self.write)
+        policy = self.catch_up(worker)
+        self.assertTrue(self.allows(policy, self.read))
+        self.assertTrue(self.allows(policy, self.write))
+
+    def test_exhausted_attempts_force_reload(self):
+        worker = self.lagging_worker()
+        with self.colliding_bump(collisions=10):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.grant(self.read)
+                self.grant(self.write)
+        policy = self.catch_up(worker, reload=True)
+        self.assertTrue(self.allows(policy, self.read))
+        self.assertTrue(self.allows(policy, self.write))
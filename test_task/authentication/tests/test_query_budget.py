@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..models import Action, Permission, Post, Resource, Role, UserRole
+from .base import TEST_CACHES, User, client_for
+
+# Допустимое число SQL-запросов на запрос к списку с прогретыми кэшами
+# пользователя и решений о доступе (COUNT и выборка страницы)
+QUERY_BUDGETS = {
+    '/api/users/': 2,
+    '/api/posts/': 2,
+    '/api/resources/': 2,
+    '/api/actions/': 2,
+    '/api/roles/': 2,
+    '/api/permissions/': 2,
+    '/api/user-roles/': 2,
+}
+PAGE_SIZES = (5, 50)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryBudgetTests(TestCase):
+    """Списки API выполняют фиксированное число SQL-запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        size = max(PAGE_SIZES)
+        cls.admin = User.objects.create_user(
+            email='budget-admin@example.com', username='budget-admin',
+            first_name='Budget', last_name='Admin', password=None,
+            is_staff=True)
+        users = User.objects.bulk_create(
+            User(email=f'budget-{i}@example.com', username=f'budget-{i}',
+                 first_name='Budget', last_name=str(i))
+            for i in range(size))
+        roles = Role.objects.bulk_create(
+            Role(name=f'budget-role-{i}') for i in range(size))
+        resources = Resource.objects.bulk_create(
+            Resource(name=f'budget-resource-{i}') for i in range(size))
+        action = Action.objects.create(name='budget-action')
+        Permission.objects.bulk_create(
+            Permission(role=role, resource=resource, action=action)
+            for role, resource in zip(roles, resources))
+        UserRole.objects.bulk_create(
+            UserRole(user=user, role=role, assigned_by=cls.admin)
+            for user, role in zip(users, roles))
+        admin_role = Role.objects.create(name='budget-admin')
+        Permission.objects.create(
+            role=admin_role, resource=Resource.objects.create(name='posts'),
+            action=Action.objects.create(name='read'))
+        UserRole.objects.create(user=cls.admin, role=admin_role)
+        Post.objects.bulk_create(
+            Post(text=f'budget post {i}', author=user)
+            for i, user in enumerate(users))
+
+    def setUp(self):
+        # Политика, загруженная в других тестах, не знает о разрешениях,
+        # созданных bulk_create без журнала изменений
+        cache.clear()
+        self.client = client_for(self.admin)
+
+    def test_list_query_budget(self):
+        for url, budget in QUERY_BUDGETS.items():
+            # Первый запрос прогревает кэши решений о доступе
+            self.client.get(url, {'limit': 1})
+            for limit in PAGE_SIZES:
+                with self.subTest(url=url, limit=limit):
+                    with self.assertNumQueries(budget):
+                        response = self.client.get(url, {'limit': limit})
+                    self.assertEqual(response.status_code, 200)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..models import RevokedToken
+from ..revocation import RevocationStore, store
+from .base import RBACTestCase, make_user, rbac_settings
+
+
+class RevocationStoreTests(RBACTestCase):
+    """Отозванные токены отклоняются; фильтр Блума следует за поколениями"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('revocation-user')
+
+    def setUp(self):
+        super().setUp()
+        # Общее хранилище помнит номер последней записи из откаченных
+        # тестов; сжатие заставляет перестроить фильтр
+        store.compact()
+
+    def test_revoked_token_is_rejected(self):
+        refresh = RefreshToken.for_user(self.user)
+        access_token = refresh.access_token
+        access = str(access_token)
+        self.assertEqual(self.client.get(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {access}'
+        ).status_code, 200)
+        store.revoke_token(refresh)
+        store.revoke_token(access_token)
+        self.assertEqual(self.client.post(
+            '/api/v1/jwt/refresh/', {'refresh': str(refresh)}
+        ).status_code, 401)
+        self.assertEqual(self.client.get(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {access}'
+        ).status_code, 401)
+
+    def test_other_worker_syncs_incrementally(self):
+        writer, reader = RevocationStore(), RevocationStore()
+        self.assertFalse(reader.is_revoked('first'))
+        bloom = reader._bloom
+        with self.assertNumQueries(0):
+            self.assertFalse(reader.is_revoked('unknown'))
+        expires_at = timezone.now() + timedelta(hours=1)
+        writer.revoke('first', expires_at)
+        self.assertTrue(reader.is_revoked('first'))
+        writer.revoke('second', expires_at)
+        self.assertTrue(reader.is_revoked('second'))
+        # Новые записи добавлены в прежний фильтр без перестроения
+        self.assertIs(reader._bloom, bloom)
+        self.assertIn('first', bloom)
+        self.assertIn('second', bloom)
+
+    @rbac_settings(REVOCATION_COMPACT_EVERY=2)
+    def test_compaction_removes_expired_entries(self):
+        worker = RevocationStore()
+        now = timezone.now()
+        worker.revoke('expired', now - timedelta(seconds=1))
+        self.assertFalse(worker.is_revoked('expired'))
+        bloom = worker._bloom
+        worker.revoke('active', now + timedelta(hours=1))
+        self.assertEqual(
+            list(RevokedToken.objects.values_list('jti', flat=True)),
+            ['active'])
+        self.assertTrue(worker.is_revoked('active'))
+        # После сжатия фильтр перестроен без истекших записей
+        self.assertIsNot(worker._bloom, bloom)
+        self.assertNotIn('expired', worker._bloom)
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.db.models.signals import post_delete, pre_delete
+
+from ..models import (Action, EffectivePermission, Permission, Resource, Role,
+                      UserRole)
+from .base import RBACTestCase, client_for, make_user
+
+
+class BulkRolesTests(RBACTestCase):
+    """Пакетное назначение и снятие ролей возвращает статус каждой пары"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.role = Role.objects.create(name='bulk-role')
+            cls.other_role = Role.objects.create(name='bulk-other-role')
+            Permission.objects.create(
+                role=cls.role, resource=Resource.objects.create(name='bulk'),
+                action=Action.objects.create(name='read'))
+            cls.admin = make_user('bulk-admin', is_staff=True)
+            cls.first = make_user('bulk-first')
+            cls.second = make_user('bulk-second')
+
+    def bulk(self, method, name, pairs):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(client_for(self.admin), method)(
+                f'/api/users/{name}/', {'pairs': pairs}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.json()['results']]
+
+    def assign(self, pairs):
+        return self.bulk('post', 'bulk_assign_roles', pairs)
+
+    def remove(self, pairs):
+        return self.bulk('delete', 'bulk_remove_roles', pairs)
+
+    def granted(self, user):
+        return EffectivePermission.objects.filter(
+            user=user, resource_name='bulk', action_name='read').exists()
+
+    def test_assign_outcomes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(user=self.second, role=self.role)
+        pair = [self.first.pk, self.role.pk]
+        self.assertEqual(
+            self.assign([pair, pair, [self.second.pk, self.role.pk],
+                         [0, self.role.pk], [self.first.pk, 0]]),
+            ['created', 'exists', 'exists', 'user_not_found',
+             'role_not_found'])
+        self.assertEqual(
+            UserRole.objects.filter(user=self.first, role=self.role).count(),
+            1)
+        self.assertTrue(self.granted(self.first))
+
+    def test_remove_outcomes(self):
+        self.assign([[self.first.pk, self.role.pk],
+                     [self.second.pk, self.role.pk]])
+        pair = [self.first.pk, self.role.pk]
+        self.assertEqual(
+            self.remove([pair, pair, [self.second.pk, self.other_role.pk],
+                         [0, self.role.pk]]),
+            ['removed', 'not_found', 'not_found', 'not_found'])
+        self.assertFalse(
+            UserRole.objects.filter(user=self.first, role=self.role).exists())
+        self.assertFalse(self.granted(self.first))
+        self.assertTrue(self.granted(self.second))
+
+    def test_remove_skips_per_row_signals(self):
+        self.assign([[self.first.pk, self.role.pk],
+                     [self.second.pk, self.role.pk]])
+        receiver = mock.Mock()
+        pre_delete.connect(receiver, sender=UserRole)
+        post_delete.connect(receiver, sender=UserRole)
+        try:
+            self.assertEqual(
+                self.remove([[self.first.pk, self.role.pk],
+                             [self.second.pk, self.role.pk]]),
+                ['removed', 'removed'])
+        finally:
+            pre_delete.disconnect(receiver, sender=UserRole)
+            post_delete.disconnect(receiver, sender=UserRole)
+        receiver.assert_not_called()
+        self.assertFalse(UserRole.objects.filter(role=self.role).exists())
+
+    def test_removed_role_is_denied(self):
+        self.assign([[self.first.pk, self.role.pk]])
+        client = client_for(self.first)
+
+        def allowed():
+            response = client.post('/api/permissions/check/',
+                                   {'pairs': [['bulk', 'read']]},
+                                   format='json')
+            return response.json()['results'][0]['allowed']
+        self.assertTrue(allowed())
+        self.remove([[self.first.pk, self.role.pk]])
+        self.assertFalse(allowed())
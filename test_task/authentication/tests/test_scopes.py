@@ -0,0 +1,104 @@
+from ..models import (SCOPE_ALL, Action, Permission, Post, Resource, Role,
+                      UserRole)
+from .base import RBACTestCase, client_for, make_user
+
+
+class PostScopeTests(RBACTestCase):
+    """
+    Область разрешения ограничивает список, изменение и удаление постов;
+    администратор без области «все объекты» читает все посты, но меняет
+    только свои
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            resource = Resource.objects.create(name='posts')
+            author_role = Role.objects.create(name='scope-author')
+            moderator_role = Role.objects.create(name='scope-moderator')
+            for name in ('read', 'update', 'delete'):
+                action = Action.objects.create(name=name)
+                Permission.objects.create(
+                    role=author_role, resource=resource, action=action)
+                Permission.objects.create(
+                    role=moderator_role, resource=resource, action=action,
+                    scope=SCOPE_ALL)
+            cls.author = make_user('scope-author')
+            cls.other = make_user('scope-other')
+            cls.staff = make_user('scope-staff', is_staff=True)
+            cls.moderator = make_user('scope-moderator')
+            cls.nobody = make_user('scope-nobody')
+            for user in (cls.author, cls.other, cls.staff):
+                UserRole.objects.create(user=user, role=author_role)
+            UserRole.objects.create(user=cls.moderator, role=moderator_role)
+            cls.posts = {
+                user.pk: Post.objects.create(text=f'post of {user.username}',
+                                             author=user)
+                for user in (cls.author, cls.other, cls.staff, cls.nobody)}
+
+    def post_url(self, owner):
+        return f'/api/posts/{self.posts[owner.pk].pk}/'
+
+    def visible(self, user):
+        response = client_for(user).get('/api/posts/', {'limit': 50})
+        self.assertEqual(response.status_code, 200)
+        return {post['id'] for post in response.json()['results']}
+
+    def update(self, user, owner):
+        return client_for(user).patch(
+            self.post_url(owner), {'text': 'edited'}, format='json')
+
+    def delete(self, user, owner):
+        return client_for(user).delete(self.post_url(owner))
+
+    def test_list(self):
+        everything = {post.pk for post in self.posts.values()}
+        self.assertEqual(self.visible(self.author),
+                         {self.posts[self.author.pk].pk})
+        self.assertEqual(self.visible(self.moderator), everything)
+        self.assertEqual(self.visible(self.staff), everything)
+
+    def test_update_own_scope(self):
+        self.assertEqual(self.update(self.author, self.other).status_code,
+                         404)
+        self.assertEqual(self.update(self.author, self.author).status_code,
+                         200)
+
+    def test_update_all_scope(self):
+        self.assertEqual(
+            self.update(self.moderator, self.other).status_code, 200)
+        self.posts[self.other.pk].refresh_from_db()
+        self.assertEqual(self.posts[self.other.pk].text, 'edited')
+
+    def test_update_staff(self):
+        self.assertEqual(self.update(self.staff, self.other).status_code,
+                         404)
+        self.posts[self.other.pk].refresh_from_db()
+        self.assertEqual(self.posts[self.other.pk].text,
+                         'post of scope-other')
+        self.assertEqual(self.update(self.staff, self.staff).status_code,
+                         200)
+
+    def test_destroy_own_scope(self):
+        self.assertEqual(self.delete(self.author, self.other).status_code,
+                         404)
+        self.assertEqual(self.delete(self.author, self.author).status_code,
+                         204)
+
+    def test_destroy_all_scope(self):
+        self.assertEqual(self.delete(self.moderator, self.other).status_code,
+                         204)
+        self.assertFalse(
+            Post.objects.filter(pk=self.posts[self.other.pk].pk).exists())
+
+    def test_destroy_staff(self):
+        self.assertEqual(self.delete(self.staff, self.other).status_code,
+                         404)
+        self.assertTrue(
+            Post.objects.filter(pk=self.posts[self.other.pk].pk).exists())
+
+    def test_mutation_requires_permission(self):
+        self.assertEqual(self.update(self.nobody, self.nobody).status_code,
+                         403)
+        self.assertEqual(self.delete(self.nobody, self.nobody).status_code,
+                         403)
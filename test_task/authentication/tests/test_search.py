@@ -0,0 +1,100 @@
+from urllib.parse import parse_qs, urlparse
+
+from ..models import (SCOPE_ALL, Action, Permission, Post, PostSearch,
+                      Resource, Role, UserRole)
+from ..search import search_posts
+from .base import RBACTestCase, client_for, make_user
+
+
+class PostSearchTests(RBACTestCase):
+    """
+    Полнотекстовый поиск: триггеры FTS5 поддерживают индекс, результаты
+    фильтруются по области разрешения и отдаются keyset-страницами
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            resource = Resource.objects.create(name='posts')
+            read = Action.objects.create(name='read')
+            author_role = Role.objects.create(name='search-author')
+            moderator_role = Role.objects.create(name='search-moderator')
+            Permission.objects.create(role=author_role, resource=resource,
+                                      action=read)
+            Permission.objects.create(role=moderator_role, resource=resource,
+                                      action=read, scope=SCOPE_ALL)
+            cls.author = make_user('search-author')
+            cls.other = make_user('search-other')
+            cls.moderator = make_user('search-moderator')
+            UserRole.objects.create(user=cls.author, role=author_role)
+            UserRole.objects.create(user=cls.moderator, role=moderator_role)
+            cls.own = {
+                Post.objects.create(text=text, author=cls.author).pk
+                for text in ('комета над городом', 'комета комета',
+                             'яркая комета и звезды', 'комета')}
+            cls.foreign = {
+                Post.objects.create(text=text, author=cls.other).pk
+                for text in ('хвост кометы: комета', 'комета',
+                             'снова комета')}
+            Post.objects.create(text='без совпадений', author=cls.other)
+
+    def found(self, query):
+        return set(search_posts(Post.objects.all(), query)
+                   .values_list('pk', flat=True))
+
+    def pages(self, user, query, limit=2):
+        ids = []
+        params = {'search': query, 'limit': limit}
+        while True:
+            response = client_for(user).get('/api/posts/', params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), limit)
+            ids.extend(post['id'] for post in body['results'])
+            if body['next'] is None:
+                return ids
+            query_params = parse_qs(urlparse(body['next']).query)
+            self.assertEqual(query_params['search'], [query])
+            params = {key: values[0] for key, values in query_params.items()}
+
+    def test_triggers_follow_post_changes(self):
+        post = Post.objects.create(text='первая версия', author=self.author)
+        self.assertEqual(PostSearch.objects.get(pk=post.pk).text,
+                         'первая версия')
+        self.assertEqual(self.found('первая'), {post.pk})
+
+        post.text = 'вторая редакция'
+        post.save()
+        self.assertEqual(PostSearch.objects.get(pk=post.pk).text,
+                         'вторая редакция')
+        self.assertEqual(self.found('первая'), set())
+        self.assertEqual(self.found('редакция'), {post.pk})
+
+        Post.objects.filter(pk=post.pk).update(text='третья правка')
+        self.assertEqual(self.found('вторая'), set())
+        self.assertEqual(self.found('правка'), {post.pk})
+
+        post.delete()
+        self.assertFalse(PostSearch.objects.filter(pk=post.pk).exists())
+        self.assertEqual(self.found('правка'), set())
+
+    def test_search_respects_scope(self):
+        self.assertEqual(set(self.pages(self.author, 'комета')), self.own)
+        self.assertEqual(set(self.pages(self.moderator, 'комета')),
+                         self.own | self.foreign)
+        self.assertEqual(self.pages(self.moderator, 'совпадений'),
+                         [Post.objects.get(text='без совпадений').pk])
+        self.assertEqual(self.pages(self.author, 'совпадений'), [])
+
+    def test_pages_follow_rank(self):
+        ids = self.pages(self.moderator, 'комета')
+        self.assertEqual(len(ids), len(set(ids)))
+        expected = list(search_posts(Post.objects.all(), 'комета').order_by(
+            'search_rank', '-id').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_empty_query_terms(self):
+        response = client_for(self.moderator).get(
+            '/api/posts/', {'search': '"*:', 'limit': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
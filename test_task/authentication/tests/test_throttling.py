@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..conf import rbac_setting
+from ..throttling import (LoginRateThrottle, RegistrationRateThrottle,
+                          TokenBucketStore, parse_rate)
+from .base import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ThrottleTests(SimpleTestCase):
+    """Лимит частоты общий для воркеров и не сбрасывается вытеснением"""
+
+    def test_limit_is_shared_between_workers(self):
+        factory = APIRequestFactory()
+        attacker = factory.post('/api/v1/auth/users/', REMOTE_ADDR='10.3.0.1')
+        other = factory.post('/api/v1/auth/users/', REMOTE_ADDR='10.3.0.2')
+        # Три воркера, в каждом помещается только одна корзина
+        workers = []
+        for _ in range(3):
+            throttle = RegistrationRateThrottle()
+            throttle.store = TokenBucketStore(max_keys=1)
+            workers.append(throttle)
+        allowed = 0
+        for i in range(30):
+            throttle = workers[i % len(workers)]
+            allowed += throttle.allow_request(attacker, None)
+            throttle.allow_request(other, None)
+        capacity, _ = parse_rate(rbac_setting('THROTTLE_RATES')['register'])
+        self.assertEqual(allowed, capacity)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LoginThrottleTests(SimpleTestCase):
+    """Лимит входа ведется по паре адрес и логин и по адресу в целом"""
+
+    def login(self, address, email):
+        request = APIRequestFactory().post(
+            '/api/v1/jwt/create/', {'email': email, 'password': 'x'},
+            format='json', REMOTE_ADDR=address)
+        return Request(request, parsers=[JSONParser()])
+
+    def allowed(self, throttle, requests):
+        return sum(throttle.allow_request(request, None)
+                   for request in requests)
+
+    def capacity(self, scope):
+        return parse_rate(rbac_setting('THROTTLE_RATES')[scope])[0]
+
+    def test_attacker_cannot_lock_out_victim(self):
+        throttle = LoginRateThrottle()
+        throttle.store = TokenBucketStore()
+        attack = self.login('10.4.0.1', 'victim@example.com')
+        self.assertEqual(self.allowed(throttle, [attack] * 30),
+                         self.capacity('login'))
+        self.assertTrue(throttle.allow_request(
+            self.login('10.4.0.2', 'Victim@example.com'), None))
+
+    def test_address_limit_covers_all_logins(self):
+        throttle = LoginRateThrottle()
+        throttle.store = TokenBucketStore()
+        requests = [self.login('10.4.1.1', f'user-{i}@example.com')
+                    for i in range(self.capacity('login_ip') + 10)]
+        self.assertEqual(self.allowed(throttle, requests),
+                         self.capacity('login_ip'))
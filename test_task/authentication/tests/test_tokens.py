@@ -0,0 +1,66 @@
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..models import Action, Permission, Resource, Role, UserRole
+from ..tokens import (PERMISSIONS_CLAIM, POLICY_ID_CLAIM, POLICY_VERSION_CLAIM,
+                      RBACRefreshToken, check_token_permission, decode_mask,
+                      encode_mask)
+from .base import RBACTestCase, make_user, rbac_settings
+
+
+@rbac_settings(TOKEN_PERMISSIONS=True)
+class TokenPermissionsTests(RBACTestCase):
+    """Права в access-токене: компактная маска, отпечаток и версия"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='token-role')
+            reports = Resource.objects.create(name='reports.*')
+            posts = Resource.objects.create(name='posts')
+            read = Action.objects.create(name='read')
+            cls.delete = Action.objects.create(name='delete')
+            Permission.objects.create(role=role, resource=reports,
+                                      action=read)
+            Permission.objects.create(role=role, resource=posts, action=read)
+            Permission.objects.create(role=Role.objects.create(name='other'),
+                                      resource=posts, action=cls.delete)
+            cls.user = make_user('token-user')
+            UserRole.objects.create(user=cls.user, role=role)
+
+    def issue(self):
+        """Выпускает access-токен и разбирает его, как при запросе"""
+        access = RBACRefreshToken.for_user(self.user).access_token
+        return AccessToken(str(access))
+
+    def test_mask_round_trip(self):
+        for mask in (0, 1, 0b1011, 1 << 200 | 5):
+            self.assertEqual(decode_mask(encode_mask(mask)), mask)
+
+    def test_token_round_trip(self):
+        token = self.issue()
+        self.assertIsInstance(token[PERMISSIONS_CLAIM], str)
+        self.assertIn(POLICY_ID_CLAIM, token)
+        self.assertIn(POLICY_VERSION_CLAIM, token)
+        with self.assertNumQueries(0):
+            self.assertTrue(check_token_permission(token, 'posts', 'read'))
+            self.assertTrue(
+                check_token_permission(token, 'reports.daily', 'read'))
+            self.assertFalse(
+                check_token_permission(token, 'posts', 'delete'))
+
+    def test_stale_version_falls_back(self):
+        token = self.issue()
+        with self.captureOnCommitCallbacks(execute=True):
+            Permission.objects.filter(action=self.delete).delete()
+        self.assertIsNone(check_token_permission(token, 'posts', 'read'))
+
+    def test_foreign_layout_falls_back(self):
+        token = self.issue()
+        token[POLICY_ID_CLAIM] = 'another-layout'
+        self.assertIsNone(check_token_permission(token, 'posts', 'read'))
+
+    @rbac_settings(TOKEN_PERMISSIONS=True, TOKEN_PERMISSIONS_MAX_LENGTH=0)
+    def test_large_mask_is_omitted(self):
+        token = self.issue()
+        self.assertNotIn(PERMISSIONS_CLAIM, token)
+        self.assertIsNone(check_token_permission(token, 'posts', 'read'))
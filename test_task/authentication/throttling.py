@@ -0,0 +1,236 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from rest_framework.throttling import BaseThrottle
+
+from .cache import (aget_counter, aincrement_counter, get_counter,
+                    increment_counter)
+from .conf import rbac_setting
+from .metrics import registry
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Разбирает строку вида '10/min' в пару (емкость, токенов в секунду)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+class TokenBucketStore:
+    """
+    Корзины маркеров в памяти процесса - быстрый фильтр перед общими
+    счетчиками: отказ здесь - одна операция со словарем под блокировкой,
+    без обращений к кэшу или базе. Число корзин ограничено: давно не
+    использованные вытесняются и начинают с полной корзины, но лимит
+    при этом по-прежнему соблюдается общим счетчиком.
+    """
+
+    def __init__(self, max_keys=None):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.max_keys = max_keys
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        """
+        Забирает маркер из корзины key. Возвращает 0, если запрос
+        разрешен, иначе число секунд до появления маркера.
+        """
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                max_keys = self.max_keys or rbac_setting('THROTTLE_MAX_KEYS')
+                if len(buckets) >= max_keys:
+                    buckets.popitem(last=False)
+                buckets[key] = [capacity - 1.0, now]
+                return 0
+            buckets.move_to_end(key)
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            bucket[1] = now
+            if tokens >= 1.0:
+                bucket[0] = tokens - 1.0
+                return 0
+            bucket[0] = tokens
+            return (1.0 - tokens) / refill_rate
+
+    def drain(self, key, now=None):
+        """Опустошает корзину key, например после отказа общего счетчика"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] = [0.0, now]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+store = TokenBucketStore()
+
+
+class SharedWindowStore:
+    """
+    Счетчики запросов в общем кэше RBAC['CACHE_ALIAS'], одни для всех
+    воркеров. Оценка числа запросов за период - скользящее окно по
+    счетчикам текущего и предыдущего интервала; счетчик увеличивается
+    через add/incr и живет два периода.
+    """
+    prefix = 'throttle'
+
+    def _keys(self, key, period, now):
+        window = int(now // period)
+        return (f'{self.prefix}:{key}:{window}',
+                f'{self.prefix}:{key}:{window - 1}',
+                now / period - window)
+
+    @staticmethod
+    def _wait(count, previous, capacity, elapsed, period):
+        """0, если оценка укладывается в лимит, иначе секунды ожидания"""
+        if previous * (1 - elapsed) + count <= capacity:
+            return 0
+        if count <= capacity:
+            # Лимит освободится, когда вклад прошлого интервала убудет
+            return (1 - (capacity - count) / previous - elapsed) * period
+        # Текущий интервал исчерпан: ждать его конца и части следующего
+        return (2 - elapsed - (capacity - 1) / count) * period
+
+    def hit(self, key, capacity, period, now=None):
+        """Учитывает запрос; возвращает 0 или число секунд до разрешения"""
+        current, previous, elapsed = self._keys(
+            key, period, time.time() if now is None else now)
+        count = increment_counter(current, int(period * 2) + 1)
+        return self._wait(count, get_counter(previous), capacity, elapsed,
+                          period)
+
+    async def ahit(self, key, capacity, period, now=None):
+        current, previous, elapsed = self._keys(
+            key, period, time.time() if now is None else now)
+        count = await aincrement_counter(current, int(period * 2) + 1)
+        return self._wait(count, await aget_counter(previous), capacity,
+                          elapsed, period)
+
+
+shared_store = SharedWindowStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты. Скорость для scope задается в
+    RBAC['THROTTLE_RATES'], например '10/min': не больше 10 запросов
+    за минуту на ключ во всех воркерах вместе. Сначала запрос проходит
+    корзины маркеров процесса, затем общие счетчики в кэше; отказ
+    общего счетчика опустошает локальную корзину, и следующие запросы
+    отклоняются без обращения к кэшу.
+    Асинхронные представления вызывают aallow_request.
+    """
+    scope = None
+    store = store
+    shared_store = shared_store
+
+    def get_buckets(self, request, view):
+        """
+        Пары (scope скорости, ключ) корзин, из каждой из которых запрос
+        забирает маркер
+        """
+        return [(self.scope, self.get_ident(request))]
+
+    def _limits(self, scope):
+        """Пара (емкость, период в секундах) для scope или None"""
+        rate = rbac_setting('THROTTLE_RATES').get(scope)
+        if rate is None:
+            return None
+        capacity, refill_rate = parse_rate(rate)
+        return capacity, capacity / refill_rate
+
+    def _buckets(self, request, view):
+        """Тройки (ключ, емкость, период) корзин с заданной скоростью"""
+        if not rbac_setting('THROTTLE_ENABLED'):
+            return []
+        buckets = []
+        for scope, ident in self.get_buckets(request, view):
+            limits = self._limits(scope)
+            if limits is not None:
+                buckets.append((f'{scope}:{ident}', *limits))
+        return buckets
+
+    def _allow_local(self, buckets):
+        now = time.monotonic()
+        self.wait_time = 0
+        for key, capacity, period in buckets:
+            wait = self.store.consume(key, capacity, capacity / period, now)
+            if wait:
+                return self._reject(wait)
+        return True
+
+    def _reject(self, wait, key=None):
+        if key is not None:
+            self.store.drain(key)
+        self.wait_time = wait
+        registry.increment(f'throttle_{self.scope}_rejected_total')
+        return False
+
+    def allow_request(self, request, view):
+        buckets = self._buckets(request, view)
+        if not self._allow_local(buckets):
+            return False
+        for key, capacity, period in buckets:
+            wait = self.shared_store.hit(key, capacity, period)
+            if wait:
+                return self._reject(wait, key)
+        return True
+
+    async def aallow_request(self, request, view):
+        buckets = self._buckets(request, view)
+        if not self._allow_local(buckets):
+            return False
+        for key, capacity, period in buckets:
+            wait = await self.shared_store.ahit(key, capacity, period)
+            if wait:
+                return self._reject(wait, key)
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """
+    Вход по паролю: строгий лимит на пару адрес клиента и логин
+    (scope login) и более свободный общий лимит адреса (scope login_ip),
+    рассчитанный на пользователей за одним NAT. Ключа только по логину
+    нет, поэтому чужой адрес не может заблокировать вход владельцу
+    аккаунта. Отказ происходит до хеширования пароля и обращения к базе.
+    """
+    scope = 'login'
+    ip_scope = 'login_ip'
+    username_fields = ('email', 'username')
+
+    def get_buckets(self, request, view):
+        ident = self.get_ident(request)
+        buckets = [(self.ip_scope, f'ip:{ident}')]
+        data = request.data
+        if hasattr(data, 'get'):
+            for field in self.username_fields:
+                value = data.get(field)
+                if isinstance(value, str) and value:
+                    buckets.append(
+                        (self.scope,
+                         f'ip-user:{ident}:{value.strip().lower()}'))
+                    break
+        return buckets
+
+
+class RegistrationRateThrottle(TokenBucketThrottle):
+    """Регистрация пользователей: корзина на адрес клиента"""
+    scope = 'register'
@@ -0,0 +1,140 @@
+import base64
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
+                                                  TokenRefreshSerializer,
+                                                  TokenVerifySerializer)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from .cache import aget_generation, get_generation
+from .conf import rbac_setting
+from .models import UserRole
+from .policy import aget_policy, get_policy
+from .revocation import store as revocation_store
+from .signals import PERMISSIONS_GENERATION
+
+PERMISSIONS_CLAIM = 'rbac'
+POLICY_ID_CLAIM = 'rbac_p'
+POLICY_VERSION_CLAIM = 'rbac_v'
+
+
+def encode_mask(mask):
+    """Битовая маска в base64url без выравнивания"""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_mask(value):
+    """Обратное преобразование encode_mask"""
+    data = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    return int.from_bytes(data, 'big')
+
+
+def embed_permissions(token, user_id):
+    """
+    Добавляет в токен маску прав пользователя, отпечаток раскладки
+    битов политики и версию разрешений. Если маска длиннее
+    RBAC['TOKEN_PERMISSIONS_MAX_LENGTH'], права в токен не попадают
+    и проверяются обычным путем.
+    """
+    version = get_generation(PERMISSIONS_GENERATION)
+    role_ids = UserRole.objects.filter(
+        user_id=user_id).values_list('role_id', flat=True)
+    policy = get_policy()
+    encoded = encode_mask(policy.user_mask(role_ids))
+    if len(encoded) > rbac_setting('TOKEN_PERMISSIONS_MAX_LENGTH'):
+        return
+    token[PERMISSIONS_CLAIM] = encoded
+    token[POLICY_ID_CLAIM] = policy.layout_id()
+    token[POLICY_VERSION_CLAIM] = version
+
+
+def _claims_allow(policy, payload, resource_name, action_name):
+    # Маска другой раскладки битов не читается этой политикой
+    if payload.get(POLICY_ID_CLAIM) != policy.layout_id():
+        return None
+    try:
+        mask = decode_mask(payload[PERMISSIONS_CLAIM])
+    except (TypeError, ValueError):
+        return None
+    return policy.allows(mask, resource_name, action_name)
+
+
+def check_token_permission(token, resource_name, action_name):
+    """
+    Проверяет разрешение по правам, записанным в access-токене.
+    Возвращает None, если права в токене отсутствуют или устарели.
+    """
+    payload = _permissions_payload(token)
+    if payload is None:
+        return None
+    if payload.get(POLICY_VERSION_CLAIM) != get_generation(
+            PERMISSIONS_GENERATION):
+        return None
+    return _claims_allow(get_policy(), payload, resource_name, action_name)
+
+
+async def acheck_token_permission(token, resource_name, action_name):
+    """Асинхронный вариант check_token_permission"""
+    payload = _permissions_payload(token)
+    if payload is None:
+        return None
+    if payload.get(POLICY_VERSION_CLAIM) != await aget_generation(
+            PERMISSIONS_GENERATION):
+        return None
+    return _claims_allow(await aget_policy(), payload, resource_name,
+                         action_name)
+
+
+def _permissions_payload(token):
+    payload = getattr(token, 'payload', None)
+    if not payload or PERMISSIONS_CLAIM not in payload:
+        return None
+    return payload
+
+
+class RBACRefreshToken(RefreshToken):
+    """Refresh-токен, встраивающий права в выпускаемые access-токены"""
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        if rbac_setting('TOKEN_PERMISSIONS'):
+            embed_permissions(access, self[api_settings.USER_ID_CLAIM])
+        return access
+
+
+class RBACTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RBACRefreshToken
+
+
+class RBACTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление токенов с проверкой отзыва. При ротации старый
+    refresh-токен отзывается.
+    """
+    token_class = RBACRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken(_('Token is blacklisted'))
+        data = super().validate(attrs)
+        if (api_settings.ROTATE_REFRESH_TOKENS
+                and api_settings.BLACKLIST_AFTER_ROTATION):
+            revocation_store.revoke_token(refresh)
+        return data
+
+
+class RevocationAwareTokenVerifySerializer(TokenVerifySerializer):
+    """Проверка токена с учетом хранилища отозванных токенов"""
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti is not None and revocation_store.is_revoked(jti):
+            raise serializers.ValidationError(_('Token is blacklisted'))
+        return {}
@@ -1,11 +1,16 @@
-from django.urls import include, path
-from rest_framework.authtoken import views
+from django.urls import include, path, re_path
+from djoser.views import UserViewSet as DjoserUserViewSet
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView, TokenVerifyView)
 
-from .views import (ActionViewSet, PermissionViewSet, PostViewSet,
-                    ResourceViewSet, RoleViewSet, UserRoleViewSet, UserViewSet)
+from .async_views import (AsyncMeView, AsyncPostDetailView, AsyncPostListView,
+                          AsyncTokenObtainView)
+from .throttling import LoginRateThrottle, RegistrationRateThrottle
+from .views import (ActionViewSet, AuditEntryViewSet, PermissionViewSet,
+                    PostViewSet, ResourceViewSet, RoleViewSet, UserRoleViewSet,
+                    UserViewSet)
 
 router = DefaultRouter()
 router.register('users', UserViewSet, basename='user')
@@ -15,14 +20,29 @@ router.register('actions', ActionViewSet, basename='action')
 router.register('roles', RoleViewSet, basename='role')
 router.register('permissions', PermissionViewSet, basename='permission')
 router.register('user-roles', UserRoleViewSet, basename='userrole')
+router.register('audit', AuditEntryViewSet, basename='audit')
 
 urlpatterns = [
+    # Регистрация и вход djoser с ограничением частоты; остальные маршруты
+    # djoser подключаются ниже без изменений
+    path('v1/auth/users/', DjoserUserViewSet.as_view(
+        {'get': 'list', 'post': 'create'},
+        throttle_classes=[RegistrationRateThrottle])),
+    re_path(r'^v1/auth/jwt/create/?', TokenObtainPairView.as_view(
+        throttle_classes=[LoginRateThrottle])),
     path('v1/auth/', include('djoser.urls')),
     path('v1/auth/', include('djoser.urls.jwt')),
-    path('v1/api-token-auth/', views.obtain_auth_token),
-    path('v1/jwt/create/',
-         TokenObtainPairView.as_view(), name='jwt_create'),
+    path('v1/api-token-auth/', ObtainAuthToken.as_view(
+        throttle_classes=[LoginRateThrottle])),
+    path('v1/jwt/create/', TokenObtainPairView.as_view(
+        throttle_classes=[LoginRateThrottle]), name='jwt_create'),
     path('v1/jwt/refresh/',
          TokenRefreshView.as_view(), name='jwt_refresh'),
     path('v1/jwt/verify/', TokenVerifyView.as_view(), name='jwt_verify'),
+    path('async/jwt/create/', AsyncTokenObtainView.as_view(),
+         name='async-jwt-create'),
+    path('async/users/me/', AsyncMeView.as_view(), name='async-user-me'),
+    path('async/posts/', AsyncPostListView.as_view(), name='async-post-list'),
+    path('async/posts/<int:pk>/', AsyncPostDetailView.as_view(),
+         name='async-post-detail'),
 ] + router.urls
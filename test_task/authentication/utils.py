@@ -0,0 +1,46 @@
+import threading
+from itertools import islice
+
+from django.db import transaction
+
+CHUNK_SIZE = 500
+
+_batches = threading.local()
+
+
+def chunks(items, size=CHUNK_SIZE):
+    """Разбивает итерируемое на списки не длиннее size, например для IN"""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def on_commit_batch(name, items, callback):
+    """
+    Откладывает callback до коммита текущей транзакции, объединяя
+    items всех вызовов с тем же name в одно множество.
+    Вне транзакции callback вызывается сразу.
+    """
+    if not items:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        callback(set(items))
+        return
+
+    states = _batches.__dict__.setdefault('states', {})
+    state = states.get(name)
+    registered = state is not None and any(
+        entry[1] is state['flush'] for entry in connection.run_on_commit)
+    if not registered:
+        state = {'items': set()}
+
+        def flush():
+            if states.get(name) is state:
+                del states[name]
+            callback(state['items'])
+
+        state['flush'] = flush
+        states[name] = state
+        transaction.on_commit(flush)
+    state['items'].update(items)
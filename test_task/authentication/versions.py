@@ -0,0 +1,28 @@
+from .cache import bump_generation, get_generations
+from .utils import on_commit_batch
+
+
+def table_generation(model):
+    """Имя счетчика версий таблицы модели"""
+    return f'table:{model._meta.label_lower}'
+
+
+def get_table_versions(models):
+    """Возвращает текущие версии таблиц моделей"""
+    return get_generations([table_generation(model) for model in models])
+
+
+def bump_table_versions(*models):
+    """
+    Меняет версии таблиц сразу и повторно после коммита, чтобы
+    ответ, прочитанный до фиксации транзакции, не получил новую версию
+    """
+    names = [table_generation(model) for model in models]
+
+    def bump(names):
+        for name in names:
+            bump_generation(name)
+
+    bump(names)
+    # Повторные изменения внутри транзакции дают один сброс после коммита
+    on_commit_batch('table_versions', names, bump)
@@ -1,29 +1,59 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from .models import Action, Permission, Post, Resource, Role, UserRole
-from .permissions import (HasResourcePermission, IsAdminOrReadOnly,
-                          IsOwnerOrReadOnly)
-from .serializers import (ActionSerializer, PermissionSerializer,
-                          PostSerializer, ResourceSerializer, RoleSerializer,
-                          UserCreateSerializer, UserRoleSerializer,
-                          UserSerializer, UserUpdateSerializer)
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+
+from .audit import log as audit_log
+from .conditional import ConditionalGetMixin
+from .export import ExportMixin
+from .fastpath import FastListMixin
+from .imports import (IMPORT_FORMATS, ImportFileError, detect_format,
+                      import_users, open_upload)
+from .metrics import TimedPermissionsMixin
+from .models import (Action, AuditEntry, Permission, Post, Resource, Role,
+                     RoleAncestor, RoleParent, UserRole)
+from .pagination import (AuditKeysetPagination, KeysetPaginationMixin,
+                         PostKeysetPagination, SearchKeysetPagination,
+                         UserKeysetPagination)
+from .permissions import HasResourcePermission, IsAdminOrReadOnly
+from .revocation import store as revocation_store
+from .roles import assign_roles, remove_roles
+from .scopes import ScopedQuerysetMixin
+from .search import search_posts
+from .serializers import (ActionSerializer, AuditEntrySerializer,
+                          AuditQuerySerializer, PermissionCheckSerializer,
+                          PermissionSerializer, PostSerializer,
+                          ResourceSerializer, RoleAssignmentBulkSerializer,
+                          RoleSerializer, UserCreateSerializer,
+                          UserRoleSerializer, UserSerializer,
+                          UserUpdateSerializer)
+from .throttling import RegistrationRateThrottle
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TimedPermissionsMixin, FastListMixin, KeysetPaginationMixin,
+                  ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления пользователями"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    fast_list_serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = LimitOffsetPagination
+    keyset_pagination_class = UserKeysetPagination
+    export_fields = (
+        ('id', 'id'), ('username', 'username'), ('email', 'email'),
+        ('first_name', 'first_name'), ('last_name', 'last_name'),
+        ('middle_name', 'middle_name'), ('is_active', 'is_active'),
+        ('created_at', 'created_at'),
+    )
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -39,9 +69,14 @@ class UserViewSet(viewsets.ModelViewSet):
         if self.action == 'create':
             permission_classes = [AllowAny]
         else:
-            permission_classes = [IsAuthenticated]
+            permission_classes = self.permission_classes
         return [permission() for permission in permission_classes]
 
+    def get_throttles(self):
+        if self.action == 'create':
+            return [RegistrationRateThrottle()]
+        return super().get_throttles()
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """Получить информацию о текущем пользователе"""
@@ -62,9 +97,24 @@ class UserViewSet(viewsets.ModelViewSet):
     def delete_me(self, request):
         """Мягкое удаление текущего пользователя"""
         user = request.user
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                refresh = RefreshToken(refresh)
+            except TokenError:
+                refresh = None
+        # Отозвать можно только собственный refresh-токен
+        if refresh and str(refresh.get(api_settings.USER_ID_CLAIM)) != str(
+                getattr(user, api_settings.USER_ID_FIELD)):
+            return Response(
+                {'error': 'refresh-токен принадлежит другому пользователю'},
+                status=status.HTTP_400_BAD_REQUEST)
         user.is_active = False
         user.save()
-        RefreshToken.for_user(user)
+        if isinstance(request.auth, Token):
+            revocation_store.revoke_token(request.auth)
+        if refresh:
+            revocation_store.revoke_token(refresh)
 
         return Response({'message': 'Аккаунт успешно удален'}, status=status.HTTP_200_OK)
 
@@ -86,6 +136,8 @@ class UserViewSet(viewsets.ModelViewSet):
             )
 
             if created:
+                audit_log.record_role_changes(
+                    [(user.pk, role.pk)], True, request.user)
                 return Response({'message': f'Роль {role.name} назначена пользователю'}, status=status.HTTP_201_CREATED)
             else:
                 return Response({'message': 'Пользователь уже имеет эту роль'}, status=status.HTTP_200_OK)
@@ -105,20 +157,103 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             user_role = UserRole.objects.get(user=user, role_id=role_id)
             user_role.delete()
+            audit_log.record_role_changes(
+                [(user.pk, user_role.role_id)], False, request.user)
             return Response({'message': 'Роль удалена'}, status=status.HTTP_200_OK)
         except UserRole.DoesNotExist:
             return Response({'error': 'Роль не найдена'}, status=status.HTTP_404_NOT_FOUND)
 
-
-class PostViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_assign_roles(self, request):
+        """Назначить роли по списку пар (user_id, role_id)"""
+        serializer = RoleAssignmentBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pairs = serializer.validated_data['pairs']
+        outcomes = assign_roles(pairs, request.user)
+        return Response({'results': self._bulk_results(pairs, outcomes)})
+
+    @action(detail=False, methods=['delete'], permission_classes=[IsAdminUser])
+    def bulk_remove_roles(self, request):
+        """Снять роли по списку пар (user_id, role_id)"""
+        serializer = RoleAssignmentBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pairs = serializer.validated_data['pairs']
+        outcomes = remove_roles(pairs, request.user)
+        return Response({'results': self._bulk_results(pairs, outcomes)})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser],
+            url_path='import')
+    def import_users(self, request):
+        """Импорт пользователей из файла CSV или NDJSON (поле file)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Файл file обязателен'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get('input') or detect_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({'error': 'Поддерживаются форматы csv и ndjson'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = import_users(open_upload(upload), fmt)
+        except ImportFileError as exc:
+            return Response({'error': str(exc), **exc.report.as_dict()},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict())
+
+    def _bulk_results(self, pairs, outcomes):
+        return [
+            {'user_id': user_id, 'role_id': role_id, 'status': outcome}
+            for (user_id, role_id), outcome in zip(pairs, outcomes)
+        ]
+
+
+class PostViewSet(TimedPermissionsMixin, ConditionalGetMixin, FastListMixin,
+                  KeysetPaginationMixin, ExportMixin, ScopedQuerysetMixin,
+                  viewsets.ModelViewSet):
     """ViewSet для управления постами"""
     queryset = Post.objects.all()
     serializer_class = PostSerializer
-    permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    fast_list_serializer_class = PostSerializer
+    # Разрешение проверяется на действие RBAC из get_action_name, а чужие
+    # посты при изменении и удалении отсекает фильтр get_queryset по
+    # области разрешения
+    permission_classes = [IsAuthenticated, HasResourcePermission]
     pagination_class = LimitOffsetPagination
+    keyset_pagination_class = PostKeysetPagination
+    # Видимость постов зависит от ролей и разрешений пользователя
+    etag_models = (Post, User, Permission, UserRole, RoleAncestor, Resource,
+                   Action)
+    etag_vary_on_user = True
+    search_pagination_class = SearchKeysetPagination
+    search_query_param = 'search'
+    export_fields = (
+        ('id', 'id'), ('author', 'author__email'), ('text', 'text'),
+        ('pub_date', 'pub_date'),
+    )
     resource_name = 'posts'
     action_name = 'read'
 
+    def get_search_query(self):
+        if (getattr(self, 'request', None) is None
+                or getattr(self, 'action', None) not in ('list', 'export')):
+            return ''
+        return self.request.query_params.get(
+            self.search_query_param, '').strip()
+
+    @property
+    def paginator(self):
+        """Результаты поиска всегда отдаются keyset-страницами по рангу"""
+        if not hasattr(self, '_paginator') and self.get_search_query():
+            self._paginator = self.search_pagination_class()
+        return super().paginator
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.get_search_query()
+        if query:
+            queryset = search_posts(queryset, query)
+        return queryset
+
     def get_action_name(self):
         """Возвращает название действия для системы разрешений"""
         action_mapping = {
@@ -131,63 +266,200 @@ class PostViewSet(viewsets.ModelViewSet):
         }
         return action_mapping.get(self.action, 'read')
 
-    def get_permissions(self):
-        """
-        Устанавливает разрешения в зависимости от действия
-        """
-        if self.action in ['list', 'retrieve']:
-            permission_classes = [IsAuthenticated, HasResourcePermission]
-        elif self.action == 'create':
-            permission_classes = [IsAuthenticated, HasResourcePermission]
-        else:
-            permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
-        return [permission() for permission in permission_classes]
-
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        """Фильтрует посты по автору для не-администраторов"""
-        if self.request.user.is_staff:
-            return Post.objects.all()
-        return Post.objects.filter(author=self.request.user)
+        """
+        Фильтрует посты по области разрешения на текущее действие:
+        свои посты или все
+        """
+        return self.filter_by_scope(Post.objects.select_related('author'))
 
 
-class ResourceViewSet(viewsets.ModelViewSet):
+class ResourceViewSet(TimedPermissionsMixin, ConditionalGetMixin,
+                      ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления ресурсами"""
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
+    etag_models = (Resource,)
+    cache_responses = True
+    export_fields = (
+        ('id', 'id'), ('name', 'name'), ('description', 'description'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    )
 
 
-class ActionViewSet(viewsets.ModelViewSet):
+class ActionViewSet(TimedPermissionsMixin, ConditionalGetMixin,
+                    ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления действиями"""
     queryset = Action.objects.all()
     serializer_class = ActionSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
+    etag_models = (Action,)
+    cache_responses = True
+    export_fields = (
+        ('id', 'id'), ('name', 'name'), ('description', 'description'),
+    )
 
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(TimedPermissionsMixin, ConditionalGetMixin,
+                  ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления ролями"""
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
+    etag_models = (Role,)
+    cache_responses = True
+    export_fields = (
+        ('id', 'id'), ('name', 'name'), ('description', 'description'),
+        ('created_at', 'created_at'),
+    )
+
+    @action(detail=True, methods=['get', 'post', 'delete'])
+    def parents(self, request, pk=None):
+        """
+        Родительские роли: GET - список, POST - добавить родителя,
+        DELETE - убрать родителя. Роль наследует разрешения родителей.
+        """
+        role = self.get_object()
+        if request.method == 'GET':
+            parents = Role.objects.filter(child_links__role=role)
+            return Response(RoleSerializer(parents, many=True).data)
+
+        parent_id = request.data.get('parent_id')
+        if not parent_id:
+            return Response({'error': 'parent_id обязателен'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            parent = Role.objects.get(id=parent_id)
+        except (Role.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Роль не найдена'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        links = RoleParent.objects.filter(role=role, parent=parent)
+        if request.method == 'DELETE':
+            deleted, _ = links.delete()
+            if deleted:
+                return Response(
+                    {'message': f'Роль {role.name} больше не наследует '
+                                f'{parent.name}'},
+                    status=status.HTTP_200_OK)
+            return Response({'error': 'Роль не наследует указанную роль'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        if links.exists():
+            return Response({'message': 'Роль уже наследует указанную роль'},
+                            status=status.HTTP_200_OK)
+        try:
+            RoleParent.objects.create(role=role, parent=parent)
+        except ValidationError as exc:
+            return Response({'error': exc.messages[0]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'message': f'Роль {role.name} наследует {parent.name}'},
+            status=status.HTTP_201_CREATED)
 
 
-class PermissionViewSet(viewsets.ModelViewSet):
+class PermissionViewSet(TimedPermissionsMixin, ConditionalGetMixin,
+                        ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления разрешениями"""
-    queryset = Permission.objects.all()
+    queryset = Permission.objects.select_related('role', 'resource', 'action')
     serializer_class = PermissionSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
-
-
-class UserRoleViewSet(viewsets.ModelViewSet):
+    etag_models = (Permission, Role, Resource, Action)
+    cache_responses = True
+    export_fields = (
+        ('id', 'id'), ('role', 'role_id'), ('role_name', 'role__name'),
+        ('resource', 'resource_id'), ('resource_name', 'resource__name'),
+        ('action', 'action_id'), ('action_name', 'action__name'),
+        ('scope', 'scope'), ('created_at', 'created_at'),
+    )
+
+    @action(detail=False, methods=['post'], url_path='check',
+            permission_classes=[IsAuthenticated])
+    def check(self, request):
+        """Пакетная проверка пар (ресурс, действие) для пользователя"""
+        serializer = PermissionCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        user_id = serializer.validated_data.get('user_id')
+        if user_id is not None and user_id != user.pk:
+            if not user.is_staff:
+                return Response({'error': 'Недостаточно прав'},
+                                status=status.HTTP_403_FORBIDDEN)
+            user = get_object_or_404(User, pk=user_id)
+
+        pairs = serializer.validated_data['pairs']
+        allowed = HasResourcePermission().check_many(user, pairs)
+        results = [
+            {'resource': resource_name, 'action': action_name,
+             'allowed': decision}
+            for (resource_name, action_name), decision in zip(pairs, allowed)
+        ]
+        return Response({'results': results})
+
+
+class UserRoleViewSet(TimedPermissionsMixin, ConditionalGetMixin,
+                      ExportMixin, viewsets.ModelViewSet):
     """ViewSet для управления ролями пользователей"""
-    queryset = UserRole.objects.all()
+    queryset = UserRole.objects.select_related('role', 'user')
     serializer_class = UserRoleSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
+    etag_models = (UserRole, Role, User)
+    export_fields = (
+        ('id', 'id'), ('user', 'user_id'), ('user_email', 'user__email'),
+        ('role', 'role_id'), ('role_name', 'role__name'),
+        ('assigned_at', 'assigned_at'), ('assigned_by', 'assigned_by_id'),
+    )
+
+    def perform_create(self, serializer):
+        user_role = serializer.save()
+        audit_log.record_role_changes(
+            [(user_role.user_id, user_role.role_id)], True, self.request.user)
+
+    def perform_update(self, serializer):
+        previous = (serializer.instance.user_id, serializer.instance.role_id)
+        user_role = serializer.save()
+        current = (user_role.user_id, user_role.role_id)
+        if current != previous:
+            audit_log.record_role_changes([previous], False, self.request.user)
+            audit_log.record_role_changes([current], True, self.request.user)
+
+    def perform_destroy(self, instance):
+        pair = (instance.user_id, instance.role_id)
+        instance.delete()
+        audit_log.record_role_changes([pair], False, self.request.user)
+
+
+class AuditEntryViewSet(TimedPermissionsMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Журнал аудита: решения о доступе и изменения ролей.
+    Фильтры user_id, actor_id, event, resource, action, since, until;
+    страницы всегда keyset по (created_at, id).
+    """
+    queryset = AuditEntry.objects.all()
+    serializer_class = AuditEntrySerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = AuditKeysetPagination
+    query_filters = {
+        'user_id': 'user_id', 'actor_id': 'actor_id', 'event': 'event',
+        'resource': 'resource_name', 'action': 'action_name',
+        'since': 'created_at__gte', 'until': 'created_at__lt',
+    }
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        serializer = AuditQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.filter(**{
+            self.query_filters[name]: value
+            for name, value in serializer.validated_data.items()})
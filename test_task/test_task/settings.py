@@ -24,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authentication.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +60,30 @@ DATABASES = {
     }
 }
 
+# Общий кэш воркеров: в нем хранятся счетчики поколений RBAC, журнал
+# политики, версии таблиц и счетчики ограничения частоты, поэтому при
+# нескольких воркерах он должен быть общим и поддерживать атомарные
+# add/incr (Redis или Memcached). Без REDIS_URL используется кэш в памяти
+# процесса, пригодный только для разработки в одном процессе;
+# manage.py check --deploy сообщает об этом ошибкой authentication.E001
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.PooledPasswordBackend',
+]
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,7 +112,7 @@ USE_TZ = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -100,6 +125,59 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER':
+        'authentication.tokens.RBACTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER':
+        'authentication.tokens.RBACTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER':
+        'authentication.tokens.RevocationAwareTokenVerifySerializer',
+}
+
+RBAC = {
+    'CACHE_ALIAS': 'default',
+    'PERMISSION_CACHE_SIZE': 10000,
+    # Наибольшее число пар в POST /api/permissions/check/
+    'PERMISSION_CHECK_MAX_PAIRS': 5000,
+    'TOKEN_PERMISSIONS': False,
+    # Длина маски прав в токене, выше которой права не встраиваются
+    'TOKEN_PERMISSIONS_MAX_LENGTH': 512,
+    'USER_CACHE_SIZE': 10000,
+    'REVOCATION_BLOOM_CAPACITY': 100000,
+    'REVOCATION_BLOOM_ERROR_RATE': 0.001,
+    'REVOCATION_REBUILD_INTERVAL': 3600,
+    'REVOCATION_COMPACT_EVERY': 1000,
+    # Число процессов для хеширования паролей; None - по числу ядер,
+    # 0 - хеширование в потоке запроса
+    'HASH_WORKERS': None,
+    'HASH_QUEUE_SIZE': 64,
+    'HASH_QUEUE_TIMEOUT': 5,
+    # Кэш ответов справочников: ключ включает версии таблиц, поэтому
+    # подходит и локальный кэш процесса (locmem), и файловый, и Redis
+    'RESPONSE_CACHE_ALIAS': 'default',
+    'RESPONSE_CACHE_TIMEOUT': 3600,
+    # Списки пользователей и постов через values() без моделей
+    'FAST_LIST': True,
+    # Журнал аудита: очередь процесса и фоновая пакетная запись;
+    # разрешающие решения записываются выборочно
+    'AUDIT_ENABLED': True,
+    'AUDIT_QUEUE_SIZE': 10000,
+    'AUDIT_BATCH_SIZE': 500,
+    'AUDIT_FLUSH_INTERVAL': 1.0,
+    'AUDIT_ALLOW_SAMPLE_RATE': 0.1,
+    # Таблица действующих разрешений пересчитывается фоновым потоком
+    # пакетами пользователей; False - сразу после коммита
+    'EFFECTIVE_REFRESH_BACKGROUND': True,
+    'EFFECTIVE_REFRESH_BATCH_SIZE': 500,
+    # Ограничение частоты входа и регистрации: общие счетчики в кэше
+    # CACHE_ALIAS и корзины маркеров воркера как быстрый фильтр перед
+    # ними; для входа - лимит на пару адрес и логин и общий лимит адреса
+    'THROTTLE_ENABLED': True,
+    'THROTTLE_RATES': {'login': '10/min', 'login_ip': '100/min',
+                       'register': '5/min'},
+    'THROTTLE_MAX_KEYS': 100000,
+    # Bearer-токен сборщика метрик для /metrics; без него доступ только
+    # у администраторов
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
 }
 
 DJOSER = {
@@ -108,6 +186,8 @@ DJOSER = {
         'user_create': 'authentication.serializers.UserCreateSerializer',
         'user': 'authentication.serializers.UserSerializer',
         'current_user': 'authentication.serializers.UserSerializer',
+        'user_create_password_retype':
+            'authentication.serializers.UserCreatePasswordRetypeSerializer',
     },
     'PERMISSIONS': {
         'user_create': ['rest_framework.permissions.AllowAny'],
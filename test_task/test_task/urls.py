@@ -1,5 +1,8 @@
 from django.urls import include, path
 
+from authentication.metrics import metrics_view
+
 urlpatterns = [
     path('api/', include('authentication.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]